@@ -25,19 +25,21 @@
 
 
 # save as ner_crawl_spacy.py
-import requests
-from bs4 import BeautifulSoup
 import re
 import csv
-import time
 import spacy
-from urllib.parse import urlparse
 from tqdm import tqdm
 import pandas as pd
+from ner_crawl_spacy import crawl, iter_paragraphs, load_ner_pipeline, extract_entities_stream, NerStats, IncrementalNER
+from crawl_cache import PageCache
 
 # Choose model: en_core_web_sm (fast) or en_core_web_trf (better, heavy)
 MODEL_NAME = "en_core_web_sm"
-nlp = spacy.load(MODEL_NAME)
+# NER-only pipeline; True = dependency parser for context sentences, False = rule-based sentencizer
+NER_USE_PARSER = False
+NER_BATCH_SIZE = 64
+NER_N_PROCESS = 1   # >1 forks worker processes for nlp.pipe
+nlp = load_ner_pipeline(MODEL_NAME, use_parser=NER_USE_PARSER)
 
 # List of source URLs (the curated list above)
 URLS = [
@@ -121,78 +123,60 @@ URLS = [
 # Which entity labels to keep/save (spaCy labels)
 KEEP_LABELS = {"PERSON","ORG","GPE","LOC","DATE","MONEY","NORP","LANGUAGE"}
 
-def fetch_text_from_url(url, timeout=12):
-    """Fetch visible text from a URL. Return (text, content_type). Skips PDFs for now."""
-    try:
-        head = requests.head(url, allow_redirects=True, timeout=8)
-        ctype = head.headers.get("content-type","")
-        if "pdf" in ctype.lower() or url.lower().endswith(".pdf"):
-            return None, "pdf"
-    except Exception:
-        # fallback to GET if HEAD fails
-        pass
-
-    try:
-        resp = requests.get(url, timeout=12, headers={"User-Agent":"Mozilla/5.0 (compatible; NER-bot/1.0)"})
-        if resp.status_code != 200:
-            return None, f"error:{resp.status_code}"
-        ctype = resp.headers.get("content-type","")
-        if "pdf" in ctype.lower():
-            return None, "pdf"
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # remove scripts/styles and nav/footer potential noise
-        for s in soup(["script","style","header","footer","nav","aside","form","noscript"]):
-            s.extract()
-        texts = []
-        # Prefer article/body tags
-        article = soup.find("article")
-        if article:
-            texts.append(article.get_text(separator=" ", strip=True))
-        body = soup.find("body")
-        if body:
-            texts.append(body.get_text(separator=" ", strip=True))
-        full = " ".join(t for t in texts if t)
-        # shorten repeating whitespace
-        full = re.sub(r"\s+", " ", full).strip()
-        return full[:500000], ctype
-    except Exception as e:
-        return None, f"exception:{e}"
-
-def extract_entities(text, url):
-    doc = nlp(text)
-    rows = []
-    for ent in doc.ents:
-        if ent.label_ in KEEP_LABELS:
-            # capture sentence for context
-            sent = ent.sent.text.strip() if ent.sent else ""
-            rows.append({
-                "source_url": url,
-                "entity_text": ent.text,
-                "label": ent.label_,
-                "start_char": ent.start_char,
-                "end_char": ent.end_char,
-                "context_sentence": sent
-            })
-    return rows
-
-# Main loop
+# Crawler: total parallel requests, parallel requests per host, seconds between requests to one host
+CRAWL_CONCURRENCY = 8
+CRAWL_PER_HOST = 2
+CRAWL_DELAY = 0.8
+# Page cache: conditional re-fetches; OFFLINE = True re-runs NER over cached pages only
+PAGE_CACHE_DIR = ".crawl_cache"
+OFFLINE = False
+page_cache = PageCache(PAGE_CACHE_DIR)
+# Incremental NER: spaCy only runs on paragraphs whose hash is not in NER_STATE yet;
+# the entity delta goes to entities_delta.csv and entity_updates.rq (SPARQL UPDATE)
+INCREMENTAL_NER = True
+NER_STATE = "ner_state.json"
+
+# Main loop: pages are fetched concurrently (politeness delay is per host), yielded in URL order,
+# split into paragraphs and streamed straight into nlp.pipe
 all_rows = []
 errors = []
-for url in tqdm(URLS, desc="Processing URLs"):
-    text, ctype = fetch_text_from_url(url)
-    if text is None:
-        errors.append((url, ctype))
-        time.sleep(0.5)
-        continue
-    # Optional: chunk long text into paragraphs to avoid spaCy memory spikes
-    paragraphs = [p.strip() for p in re.split(r"\n{1,}|\.\s{2,}", text) if len(p.strip())>30]
-    for para in paragraphs:
-        try:
-            rows = extract_entities(para, url)
-            all_rows.extend(rows)
-        except Exception as e:
-            errors.append((url, f"ner_error:{e}"))
-    time.sleep(0.8)  # polite delay
+ner_stats = NerStats()
+if OFFLINE:
+    # local blobs only: no crawler, no per-host politeness delays
+    pages = page_cache.iter_pages(URLS)
+else:
+    pages = crawl(URLS, fetch=page_cache.fetcher(), concurrency=CRAWL_CONCURRENCY,
+                  per_host=CRAWL_PER_HOST, delay=CRAWL_DELAY, ordered=True)
+pages = tqdm(pages, total=len(URLS), desc="Processing URLs")
+try:
+    if INCREMENTAL_NER:
+        ner_state = IncrementalNER(NER_STATE)
+        all_rows = ner_state.run(nlp, pages, KEEP_LABELS, batch_size=NER_BATCH_SIZE,
+                                 n_process=NER_N_PROCESS, stats=ner_stats, errors=errors)
+        ner_state.save()
+        print(f"Incremental NER: {ner_state.processed} new/changed paragraphs, {ner_state.reused} reused")
+        pd.DataFrame(ner_state.delta, columns=["op","source_url","entity_text","label","count"]).to_csv(
+            "entities_delta.csv", index=False, encoding="utf-8")
+        with open("entity_updates.rq", "w", encoding="utf-8") as f:
+            f.write(ner_state.sparql_updates())
+        print(f"Delta: +{len(ner_state.added_entities)} / -{len(ner_state.removed_entities)} entities "
+              "(entities_delta.csv, entity_updates.rq)")
+    else:
+        paragraphs = iter_paragraphs(pages, errors)
+        # a paragraph spaCy fails on is recorded in errors with its URL; the stream keeps going
+        all_rows.extend(extract_entities_stream(nlp, paragraphs, KEEP_LABELS, batch_size=NER_BATCH_SIZE,
+                                                n_process=NER_N_PROCESS, stats=ner_stats, errors=errors))
+except Exception as e:
+    # per-page and per-paragraph failures are already in errors; anything reaching here
+    # (model, cache I/O, a bug) fails the run, so entities.csv and the page cache are left as they were
+    errors.append(("", f"ner_error:{e}"))
+    pd.DataFrame(errors, columns=["url","issue"]).to_csv("fetch_errors.csv", index=False)
+    print(f"NER run failed, nothing saved (errors in fetch_errors.csv): {e}")
+    raise
+print(ner_stats)
+page_cache.evict()
+page_cache.save()
+print(f"Page cache: {page_cache.hits} unchanged/cached, {page_cache.downloads} downloaded")
 
 # Save to CSV
 df = pd.DataFrame(all_rows)
@@ -225,15 +209,21 @@ import os, re, csv, pandas as pd
 import re
 import csv
 import spacy
+from triples_builder import (build_triples, build_resolved_triples, resolve_entities,
+                             resolution_report, write_term_ids, write_triples_csv, write_triples_ttl,
+                             PROVENANCE_COLUMNS)
 
 INPUT_PATH = "entities.csv"            # change as needed
 OUT_ENTITIES = "entities_extracted.csv"
 OUT_TRIPLES_CSV = "triples.csv"
 OUT_RDF = "triples.ttl"
-
-def make_uri(s):
-    slug = re.sub(r'[^a-zA-Z0-9_]', '_', s.strip())[:120]
-    return f"http://example.org/resource/{slug}"
+OUT_MENTIONS = "mentions.csv"
+OUT_TERMS = "triples.terms"            # term dictionary (kg_terms), also read by app.py
+OUT_TRIPLE_IDS = "triple_ids.npy"      # triples as (s, p, o) ids into OUT_TERMS
+# one subject per resolved entity instead of one per mention row
+RESOLVE_ENTITIES = True
+# e.g. 95: also merge near-identical spellings within a label (kg_dedup); None = normalization only
+RESOLVE_FUZZY_THRESHOLD = None
 
 df = pd.read_csv(INPUT_PATH)
 print("Loaded", INPUT_PATH, "columns:", list(df.columns))
@@ -242,11 +232,10 @@ print("Loaded", INPUT_PATH, "columns:", list(df.columns))
 entities_df = None
 if 'text' in df.columns:
     try:
-        nlp = spacy.load("en_core_web_sm")
+        nlp = spacy.load("en_core_web_sm", exclude=["tagger", "parser", "attribute_ruler", "lemmatizer"])
         rows = []
-        for idx, row in df.iterrows():
-            text = str(row['text'])
-            doc = nlp(text)
+        texts = df['text'].map(str)
+        for idx, text, doc in zip(df.index, texts, nlp.pipe(texts, batch_size=64)):
             for ent in doc.ents:
                 rows.append({"source_row": idx, "text": text,
                              "entity_text": ent.text, "entity_label": ent.label_})
@@ -257,7 +246,9 @@ if 'text' in df.columns:
 # If spaCy not run, try to infer entity columns
 if entities_df is None:
     if {'entity_text','label'}.issubset(df.columns):
-        entities_df = df.rename(columns={'label':'entity_label'})[['entity_text','entity_label']].copy()
+        # keep mention provenance for the resolution stage
+        cols = ['entity_text','entity_label'] + [c for c in PROVENANCE_COLUMNS if c in df.columns]
+        entities_df = df.rename(columns={'label':'entity_label'})[cols].copy()
     else:
         # fallback: first column as entity_text
         entities_df = pd.DataFrame({
@@ -268,48 +259,27 @@ if entities_df is None:
 entities_df.to_csv(OUT_ENTITIES, index=False)
 print("Entities saved to", OUT_ENTITIES)
 
-# Build simple triples
-triples = []
-for i, r in entities_df.reset_index().iterrows():
-    ent = str(r['entity_text']).strip()
-    label = str(r.get('entity_label','UNKNOWN')).strip()
-    subj = make_uri(ent + "_" + str(i))
-    triples.append((subj, "rdf:type", f"http://example.org/ontology/{label}"))
-    triples.append((subj, "rdfs:label", f"\"{ent}\""))
-    triples.append((subj, "ex:hasText", f"\"{ent}\""))
-    triples.append((subj, "ex:canonicalURI", make_uri(ent)))
+if RESOLVE_ENTITIES:
+    # cluster mentions per label -> one canonical subject each; provenance -> mentions.csv
+    resolved, mentions = resolve_entities(entities_df, RESOLVE_FUZZY_THRESHOLD)
+    triples = build_resolved_triples(resolved, mentions)
+    mentions.to_csv(OUT_MENTIONS, index=False, encoding="utf-8")
+    print("Mentions saved to", OUT_MENTIONS)
+    print(resolution_report(len(entities_df), resolved, triples))
+else:
+    # Build simple triples (vectorized: subject/predicate/object columns, 4 per entity)
+    triples = build_triples(entities_df)
 
 # save triples CSV
-with open(OUT_TRIPLES_CSV, 'w', newline='', encoding='utf-8') as fh:
-    writer = csv.writer(fh)
-    writer.writerow(['subject','predicate','object'])
-    for s,p,o in triples:
-        writer.writerow([s,p,o])
+write_triples_csv(triples, OUT_TRIPLES_CSV)
 print("Triples CSV saved to", OUT_TRIPLES_CSV)
 
+# integer-encoded triples over the shared term dictionary
+n_terms = write_term_ids(triples, OUT_TERMS, OUT_TRIPLE_IDS)
+print(f"{n_terms} terms saved to", OUT_TERMS, "and id triples to", OUT_TRIPLE_IDS)
+
 # write Turtle (basic)
-with open(OUT_RDF, 'w', encoding='utf-8') as f:
-    f.write('@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .\n')
-    f.write('@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n')
-    f.write('@prefix ex: <http://example.org/ontology/> .\n\n')
-    for s,p,o in triples:
-        subj = f"<{s}>"
-        if p == "rdf:type":
-            pred = "rdf:type"
-            obj = f"<{o}>"
-        elif p == "rdfs:label":
-            pred = "rdfs:label"
-            obj = o  # already quoted
-        elif p == "ex:hasText":
-            pred = "ex:hasText"
-            obj = o
-        elif p == "ex:canonicalURI":
-            pred = "ex:canonicalURI"
-            obj = f"<{o}>"
-        else:
-            pred = p
-            obj = f"<{o}>"
-        f.write(f"{subj} {pred} {obj} .\n")
+write_triples_ttl(triples, OUT_RDF)
 print("Turtle saved to", OUT_RDF)
 
 
@@ -5,31 +5,86 @@ Final Cultural Knowledge Graph Workbench (polished)
 - Theme toggle (Auto / Light / Dark)
 - Sidebar search + menu
 - Dataset Overview, Add Entity, Add Relationships, SPARQL Explorer
-- Analyze Entity (table + predicate counts + PyVis graph + similar-entities)
+- Analyze Entity (table + predicate counts + k-hop PyVis graph + similar-entities)
+- Graph Analytics (PageRank, components, communities, shortest paths)
 - Fuzzy reasoning demo
-- Admin (login on main page) with Purge / Export / Import / Activity log
+- Admin (login on main page) with Purge / Export / Import / Activity log + query profile
 - Activity logging to 'activity.log'
 - Uses ontology IRI provided by user
 """
 
 import os
+import re
 import time
 import json
-import requests
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
-from SPARQLWrapper import SPARQLWrapper, JSON
-import networkx as nx
-from pyvis.network import Network
 import streamlit.components.v1 as components
 from fuzzywuzzy import fuzz
 from PIL import Image
+from kg_store import make_backend
+from kg_cache import QueryCache
+from kg_profiler import QueryProfiler
+from kg_stats import DatasetStats, RDF_TYPE, novel_triples
+from kg_search import EntitySearchIndex, local_name
+from kg_dedup import FuzzyIndex
+from kg_paging import PagedQuery, export_csv, is_select
+from kg_reasoner import OPTIONAL_AXIOMS, Reasoner, iri_value, nt_line, read_ntriples
+from kg_similarity import SimilarityIndex
+from kg_graph import MAX_HOPS, neighborhood
+from kg_analytics import GraphAnalytics
+from kg_terms import TermDictionary, TermIndex, short_name
+from kg_transfer import EXPORT_FORMATS, SPLITTABLE, export_to_file, import_batches, open_upload
 
 # ---------------- CONFIG ----------------
 FUSEKI_BASE = os.environ.get("FUSEKI_BASE", "http://localhost:3030/culture_difference")
 FUSEKI_QUERY = f"{FUSEKI_BASE}/query"
 FUSEKI_UPDATE = f"{FUSEKI_BASE}/update"
 FUSEKI_DATA = f"{FUSEKI_BASE}/data"
+# "fuseki" (default) or "embedded" = load KG_DATA_FILES into an in-process indexed store
+KG_BACKEND = os.environ.get("KG_BACKEND", "fuseki")
+KG_DATA_FILES = os.environ.get(
+    "KG_DATA_FILES", "cultural_difference_properties.ttl,culturaldifference_enriched.ttl"
+).split(",")
+# Fuseki connection pool: keep-alive connections shared by all sessions, retries for reads
+KG_POOL_SIZE = int(os.environ.get("KG_POOL_SIZE", "10"))
+KG_HTTP_RETRIES = int(os.environ.get("KG_HTTP_RETRIES", "3"))
+# worker threads for independent page queries (overview rebuild, Analyze Entity)
+KG_QUERY_WORKERS = int(os.environ.get("KG_QUERY_WORKERS", "4"))
+# shared result cache for run_query (entries, seconds)
+KG_CACHE_SIZE = int(os.environ.get("KG_CACHE_SIZE", "256"))
+KG_CACHE_TTL = int(os.environ.get("KG_CACHE_TTL", "300"))
+# triples per INSERT DATA block in bulk inserts
+KG_BULK_CHUNK = int(os.environ.get("KG_BULK_CHUNK", "500"))
+# Phase 1 NER mentions searched by "Find similar entities"
+KG_ENTITIES_CSV = os.environ.get("KG_ENTITIES_CSV", "entities_extracted.csv")
+# SPARQL Explorer: rows per page, hard cap on rows shown, cap on CSV export rows
+KG_PAGE_SIZE = int(os.environ.get("KG_PAGE_SIZE", "500"))
+KG_MAX_ROWS = int(os.environ.get("KG_MAX_ROWS", "10000"))
+KG_EXPORT_MAX_ROWS = int(os.environ.get("KG_EXPORT_MAX_ROWS", "1000000"))
+# Admin import: statements per request when splitting N-Triples / Turtle uploads
+KG_IMPORT_BATCH = int(os.environ.get("KG_IMPORT_BATCH", "50000"))
+# Admin import: server-side files are only read from this directory
+KG_IMPORT_DIR = os.environ.get("KG_IMPORT_DIR", "imports")
+# prefix-compressed term dictionary from the Phase 1 builder (python kg_terms.py triples.csv); optional
+KG_TERMS_FILE = os.environ.get("KG_TERMS_FILE", "triples.terms")
+# Analyze Entity similarity index: neighbours kept per entity, features shared by more entities skip pairing
+KG_SIM_TOP_K = int(os.environ.get("KG_SIM_TOP_K", "25"))
+KG_SIM_MAX_DF = int(os.environ.get("KG_SIM_MAX_DF", "200"))
+# Analyze Entity graph: default hops, edges kept per node, cached neighbourhood layouts
+KG_GRAPH_HOPS = int(os.environ.get("KG_GRAPH_HOPS", "2"))
+KG_GRAPH_MAX_DEGREE = int(os.environ.get("KG_GRAPH_MAX_DEGREE", "25"))
+KG_GRAPH_CACHE_SIZE = int(os.environ.get("KG_GRAPH_CACHE_SIZE", "64"))
+# reasoner: 1 = also assume kg_reasoner.OPTIONAL_AXIOMS (symmetric / inverse properties not in the ontology)
+KG_REASONER_AXIOMS = os.environ.get("KG_REASONER_AXIOMS", "0") == "1"
+# query profiler: one JSON line per SELECT / UPDATE, slow ones (>= KG_SLOW_QUERY_MS) also to the slow log
+KG_QUERY_LOG = os.environ.get("KG_QUERY_LOG", "query_log.jsonl")
+KG_SLOW_QUERY_LOG = os.environ.get("KG_SLOW_QUERY_LOG", "slow_queries.jsonl")
+KG_SLOW_QUERY_MS = float(os.environ.get("KG_SLOW_QUERY_MS", "1000"))
 
 # Ontology IRI provided by you (append '#')
 ONTOLOGY_BASE = ONTOLOGY_BASE = "http://example.org/culturaldifference#"
@@ -54,8 +109,89 @@ def log_action(user, action, details=None):
         pass
 
 # SPARQL helpers (robust with debug)
-sparql_q = SPARQLWrapper(FUSEKI_QUERY)
-sparql_u = SPARQLWrapper(FUSEKI_UPDATE)
+# one backend per server process, shared by all Streamlit sessions
+@st.cache_resource(show_spinner="Loading knowledge graph...")
+def get_backend():
+    return make_backend(KG_BACKEND, FUSEKI_BASE, KG_DATA_FILES,
+                        pool_size=KG_POOL_SIZE, retries=KG_HTTP_RETRIES)
+
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(maxsize=KG_CACHE_SIZE, ttl=KG_CACHE_TTL)
+
+@st.cache_resource
+def get_profiler():
+    return QueryProfiler(KG_QUERY_LOG, KG_SLOW_QUERY_LOG, KG_SLOW_QUERY_MS)
+
+@st.cache_resource
+def get_terms():
+    """Shared term <-> id map; seeded from the Phase 1 dictionary file when present."""
+    base = TermDictionary.open(KG_TERMS_FILE) if KG_TERMS_FILE and os.path.exists(KG_TERMS_FILE) else None
+    return TermIndex(base)
+
+def short_names(col):
+    """IRIs -> local names, computed once per distinct term for all sessions."""
+    return get_terms().short_names(col)
+
+@st.cache_resource
+def get_query_pool():
+    return ThreadPoolExecutor(max_workers=KG_QUERY_WORKERS, thread_name_prefix="kg-query")
+
+def submit_task(fn, *args, **kwargs):
+    """Run fn on the shared query pool -> Future; workers keep this run's script context.
+
+    Runs inline (already completed Future) when the backend serializes queries anyway.
+    """
+    if not getattr(get_backend(), "concurrent_reads", False):
+        fut = Future()
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+    ctx = get_script_run_ctx()
+    def task():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    return get_query_pool().submit(task)
+
+def timed(fn, *args, **kwargs):
+    """(fn(*args, **kwargs), seconds)"""
+    t = time.perf_counter()
+    return fn(*args, **kwargs), time.perf_counter() - t
+
+def query_df(sparql_text, prefix=True, timeout=60, cache=True, typed=False, numeric=()):
+    """Cached SELECT -> DataFrame. Raises on errors and never touches the UI.
+
+    Columns follow the projected variables, so unbound ones still appear.
+    cache=False skips the result cache (one-off bulk reads such as exports).
+    typed=True returns numeric literal columns as numbers; the columns named
+    in `numeric` are also converted when they hold plain "123" literals.
+    """
+    q = (PREFIX + sparql_text) if prefix else sparql_text
+    numeric = tuple(sorted(set(numeric)))
+    key = q + ("\n#typed" if typed else "") + ("\n#numeric " + " ".join(numeric) if numeric else "")
+    t = time.perf_counter()
+    qcache = get_query_cache()
+    cached = qcache.get(key) if cache else None
+    if cached is not None:
+        get_profiler().record("select", q, time.perf_counter() - t, rows=len(cached), nbytes=0, cache="hit")
+        # callers add helper columns, never hand out the cached frame itself
+        return cached.copy()
+    generation = qcache.generation
+    backend = get_backend()
+    try:
+        # decoded straight into columns (TSV from Fuseki, rdflib rows when embedded)
+        df = backend.select(q, timeout=timeout, typed=typed, numeric=numeric)
+    except Exception as e:
+        get_profiler().record("select", q, time.perf_counter() - t, cache="miss" if cache else "off", error=e)
+        raise
+    get_profiler().record("select", q, time.perf_counter() - t, rows=len(df),
+                          nbytes=backend.last_response_bytes(), cache="miss" if cache else "off")
+    if not cache:
+        return df
+    qcache.put(key, df, generation=generation)
+    return df.copy()
 
 def run_query(sparql_text, prefix=True, timeout=60, debug=False):
     q = (PREFIX + sparql_text) if prefix else sparql_text
@@ -63,12 +199,7 @@ def run_query(sparql_text, prefix=True, timeout=60, debug=False):
         st.info("DEBUG: Running SPARQL SELECT/ASK/CONSTRUCT")
         st.code(q)
     try:
-        sparql_q.setQuery(q)
-        sparql_q.setReturnFormat(JSON)
-        sparql_q.setTimeout(timeout)
-        res = sparql_q.query().convert()
-        rows = [{k: v["value"] for k, v in b.items()} for b in res["results"]["bindings"]]
-        return pd.DataFrame(rows)
+        return query_df(q, prefix=False, timeout=timeout)
     except Exception as e:
         # show the request/response hint in UI so user can debug
         st.error(f"SPARQL query failed: {e}")
@@ -84,17 +215,201 @@ def run_update(sparql_update_text, prefix=True, debug=False):
     if debug:
         st.info("DEBUG: Running SPARQL UPDATE")
         st.code(q)
+    t = time.perf_counter()
     try:
-        sparql_u.setMethod("POST")
-        sparql_u.setQuery(q)
-        sparql_u.query()
+        get_backend().update(q)
+        get_profiler().record("update", q, time.perf_counter() - t, nbytes=len(q.encode("utf-8")))
         return True
     except Exception as e:
+        get_profiler().record("update", q, time.perf_counter() - t, nbytes=len(q.encode("utf-8")), error=e)
         st.error(f"SPARQL update failed: {e}")
         print("---- DEBUG: failed update ----")
         print(q)
         print("---- END DEBUG ----")
         return False
+    finally:
+        # even a failed update may have been partially applied
+        get_query_cache().bump()
+
+@st.cache_resource
+def get_dataset_stats():
+    return DatasetStats()
+
+def dataset_stats(force=False):
+    """Statistics index, rebuilt only when the dataset generation moved on."""
+    stats = get_dataset_stats()
+    generation = get_query_cache().generation
+    if force or not stats.is_fresh(generation):
+        stats.build(lambda q: query_df(q, prefix=False), generation, submit=submit_task)
+    return stats
+
+def stats_novelty(triples, terms=None):
+    """Run before an insert: (new triples, new subjects) for DatasetStats.add_triples.
+
+    terms: SPARQL syntax of `triples` (default <value> for each IRI).
+    None when the statistics are stale anyway; the next read rebuilds them.
+    """
+    if not get_dataset_stats().is_fresh(get_query_cache().generation):
+        return None
+    terms = terms or [tuple(f"<{x}>" for x in t) for t in triples]
+    try:
+        new, subjects = novel_triples(lambda q: query_df(q, prefix=False, cache=False), terms)
+    except Exception:
+        return None
+    return [triples[i] for i in new], subjects
+
+def stats_add(novelty, generation_before, generation_after):
+    if novelty is not None:
+        get_dataset_stats().add_triples(*novelty, generation_before, generation_after)
+
+def import_stats_hook(generation):
+    """import_batches on_batch hook keeping the statistics current per N-Triples batch.
+
+    Returns (hook, state); state["ok"] is False once a batch could not be accounted for.
+    """
+    state = {"ok": get_dataset_stats().is_fresh(generation)}
+
+    def on_batch(data, media_type):
+        if not state["ok"] or media_type != "application/n-triples":
+            state["ok"] = False
+            return None
+        try:
+            terms = list(read_ntriples(data.splitlines()))
+            # blank nodes are scoped to their batch: always new, and not expressible in VALUES
+            is_blank = [any(x.startswith("_:") for x in t) for t in terms]
+            blank = [t for t, b in zip(terms, is_blank) if b]
+            named = [t for t, b in zip(terms, is_blank) if not b]
+            novelty = stats_novelty([tuple(iri_value(x) for x in t) for t in named], named)
+        except Exception:
+            novelty = None
+        if novelty is None:
+            state["ok"] = False
+            return None
+        new, subjects = novelty
+        new += [tuple(iri_value(x) for x in t) for t in dict.fromkeys(blank)]
+        subjects += len({t[0] for t in blank})
+        return lambda: stats_add((new, subjects), generation, generation)
+
+    return on_batch, state
+
+@st.cache_resource
+def get_search_index():
+    return EntitySearchIndex()
+
+def search_index():
+    """Quick Search index, rebuilt only when the dataset generation moved on."""
+    idx = get_search_index()
+    generation = get_query_cache().generation
+    if not idx.is_fresh(generation):
+        idx.build(query_df, generation)
+    return idx
+
+@st.cache_resource
+def get_similarity_index():
+    return SimilarityIndex(top_k=KG_SIM_TOP_K, max_df=KG_SIM_MAX_DF)
+
+def similarity_index():
+    """Entity similarity index, rebuilt only when the dataset generation moved on."""
+    idx = get_similarity_index()
+    generation = get_query_cache().generation
+    if not idx.is_fresh(generation):
+        idx.build(lambda q: query_df(q, prefix=False, cache=False), generation)
+    return idx
+
+@st.cache_resource
+def get_layout_cache():
+    return QueryCache(maxsize=KG_GRAPH_CACHE_SIZE, ttl=KG_CACHE_TTL)
+
+def entity_neighborhood(entity, hops=KG_GRAPH_HOPS, max_degree=KG_GRAPH_MAX_DEGREE):
+    """Sampled k-hop neighbourhood with its layout, shared by all sessions until the dataset changes."""
+    iri = sparql_term(entity)[1]
+    generation = get_query_cache().generation
+    key = f"{iri} {hops} {max_degree} @{generation}"
+    layouts = get_layout_cache()
+    nb = layouts.get(key)
+    if nb is None:
+        # class membership links (rdf:type and the KG's own :type) are not walked through
+        nb = neighborhood(lambda q: query_df(q, prefix=False), iri, hops, max_degree,
+                          skip=(RDF_TYPE, ONTOLOGY_BASE + "type"))
+        nb.layout()
+        layouts.put(key, nb)
+    return nb
+
+@st.cache_resource
+def get_graph_analytics():
+    # class membership links become node labels, not edges
+    return GraphAnalytics(skip=(RDF_TYPE, ONTOLOGY_BASE + "type"))
+
+def graph_analytics():
+    """CSR graph + analytics results, rebuilt only when the dataset generation moved on."""
+    ga = get_graph_analytics()
+    generation = get_query_cache().generation
+    if not ga.is_fresh(generation):
+        ga.build(lambda q: query_df(q, prefix=False, cache=False), generation)
+    return ga
+
+@st.cache_resource
+def get_reasoner():
+    # the optional axioms would be written into the store as inferences: opt-in only
+    return Reasoner(OPTIONAL_AXIOMS if KG_REASONER_AXIOMS else ())
+
+def write_inferred(triples, generation):
+    """INSERT DATA the reasoner's output and keep the indexes in step."""
+    # blank nodes in INSERT DATA would be fresh nodes: keep those in the reasoner only
+    triples = [t for t in triples if not any(x.startswith("_:") for x in t)]
+    if not triples:
+        get_reasoner().advance(generation, generation)
+        return True
+    blocks = []
+    for i in range(0, len(triples), KG_BULK_CHUNK):
+        body = "\n".join("  " + nt_line(t) for t in triples[i:i + KG_BULK_CHUNK])
+        blocks.append(f"INSERT DATA {{\n{body}\n}}")
+    full = [tuple(iri_value(x) for x in t) for t in triples]
+    novelty = stats_novelty(full, triples)
+    ok = run_update(" ;\n".join(blocks), prefix=False)
+    after = get_query_cache().generation
+    if ok:
+        stats_add(novelty, generation, after)
+        get_search_index().add([(s, o, ()) for s, p, o in full if p == RDF_TYPE], generation, after)
+        get_similarity_index().add(full, generation, after)
+        get_reasoner().advance(generation, after)
+    return ok
+
+def infer_after_insert(full_triples, generation_before, generation_after):
+    """Incremental reasoning over IRIs just inserted; no-op until materialized for this dataset."""
+    new = get_reasoner().add([tuple(f"<{x}>" for x in t) for t in full_triples],
+                             generation_before, generation_after)
+    if new:
+        write_inferred(new, generation_after)
+
+def materialize_inferences(user="admin"):
+    """Full fixpoint over an N-Triples dump of the store; inferred triples are written back."""
+    generation = get_query_cache().generation
+    with tempfile.TemporaryFile() as f:
+        get_backend().export_to(f, "application/n-triples")
+        f.seek(0)
+        inferred = get_reasoner().build(read_ntriples(f), generation)
+    ok = write_inferred(inferred, generation)
+    log_action(user, "materialize_inferences", {"inferred": len(inferred), "ok": ok})
+    return inferred if ok else None
+
+@st.cache_resource
+def get_fuzzy_index():
+    return FuzzyIndex()
+
+def fuzzy_index():
+    """Blocking index over KG entity names, rebuilt along with the search index."""
+    idx = get_fuzzy_index()
+    search = search_index()
+    if not idx.is_fresh(search.generation):
+        idx.build([(name, local_name(t)) for _, t, name, _ in search.docs], search.generation)
+    return idx
+
+@st.cache_resource
+def mention_index(path, mtime):
+    """Blocking index over the NER mentions CSV (cached per file version)."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return FuzzyIndex().build(zip(df["entity_text"], df["entity_label"]))
 
 # fuzzy similarity
 def fuzzy_similarity(a, b):
@@ -242,16 +557,12 @@ search_term = st.sidebar.text_input("Entity name (partial)")
 
 if search_term:
     try:
-        q = f"""
-        SELECT ?entity ?type WHERE {{
-          ?entity a ?type .
-          FILTER(CONTAINS(LCASE(STR(?entity)), LCASE("{search_term}")))
-        }} LIMIT 20
-        """
-        df_search = run_query(q)
-        if not df_search.empty:
-            df_search["entity_short"] = df_search["entity"].apply(lambda x: x.split("#")[-1])
-            df_search["type_short"] = df_search["type"].apply(lambda x: x.split("#")[-1])
+        # prebuilt trigram/token index over local names and labels (no per-keystroke scan)
+        hits = search_index().search(search_term, limit=20)
+        if hits:
+            df_search = pd.DataFrame(hits, columns=["entity", "type", "rank"])
+            df_search["entity_short"] = short_names(df_search["entity"])
+            df_search["type_short"] = short_names(df_search["type"])
             st.sidebar.dataframe(df_search[["entity_short", "type_short"]].rename(columns={"entity_short":"Entity","type_short":"Class"}))
         else:
             st.sidebar.write("No matches.")
@@ -261,7 +572,7 @@ if search_term:
 st.sidebar.markdown("---")
 menu = st.sidebar.radio("Menu", [
     "Dataset Overview", "Add Entity", "Add Relationships", "SPARQL Explorer",
-    "Analyze Entity", "Fuzzy Reasoning", "Admin"
+    "Analyze Entity", "Graph Analytics", "Fuzzy Reasoning", "Admin"
 ], index=0)
 
 # ---------------- Helper functions for app ----------------
@@ -271,95 +582,187 @@ def safe_name(s):
 def insert_entity(entity_type, entity_name, user="anon"):
     ent = safe_name(entity_name)
     q = f"INSERT DATA {{ :{ent} a :{entity_type} . }}"
+    generation = get_query_cache().generation
+    novelty = stats_novelty([(ONTOLOGY_BASE + ent, RDF_TYPE, ONTOLOGY_BASE + entity_type)])
     ok = run_update(q)
     if ok:
         log_action(user, "add_entity", {"type": entity_type, "name": ent})
+        stats_add(novelty, generation, get_query_cache().generation)
+        # only the local name: no label triple is written, so a rebuild would not index one either
+        get_search_index().add(
+            [(ONTOLOGY_BASE + ent, ONTOLOGY_BASE + entity_type, ())],
+            generation, get_query_cache().generation)
+        get_similarity_index().add(
+            [(ONTOLOGY_BASE + ent, RDF_TYPE, ONTOLOGY_BASE + entity_type)],
+            generation, get_query_cache().generation)
+        infer_after_insert([(ONTOLOGY_BASE + ent, RDF_TYPE, ONTOLOGY_BASE + entity_type)],
+                           generation, get_query_cache().generation)
     return ok
 
 def insert_relationship(subject, predicate, object_, user="anon"):
     s = safe_name(subject); o = safe_name(object_)
     q = f"INSERT DATA {{ :{s} :{predicate} :{o} . }}"
+    generation = get_query_cache().generation
+    novelty = stats_novelty([(ONTOLOGY_BASE + s, ONTOLOGY_BASE + predicate, ONTOLOGY_BASE + o)])
     ok = run_update(q)
     if ok:
         log_action(user, "add_relationship", {"s": s, "p": predicate, "o": o})
+        stats_add(novelty, generation, get_query_cache().generation)
+        # object links do not change entity names or classes: index stays valid
+        get_search_index().add([], generation, get_query_cache().generation)
+        get_similarity_index().add(
+            [(ONTOLOGY_BASE + s, ONTOLOGY_BASE + predicate, ONTOLOGY_BASE + o)],
+            generation, get_query_cache().generation)
+        infer_after_insert([(ONTOLOGY_BASE + s, ONTOLOGY_BASE + predicate, ONTOLOGY_BASE + o)],
+                           generation, get_query_cache().generation)
     return ok
 
+def sparql_term(x):
+    """(SPARQL syntax, full IRI) for a name; full IRIs are kept as-is."""
+    x = str(x).strip()
+    if x.startswith(("http://", "https://", "urn:")):
+        return f"<{x}>", x
+    x = safe_name(x)
+    return f":{x}", ONTOLOGY_BASE + x
+
+# a relationship cell is a local name (SPARQL PN_LOCAL once spaces become _) or an absolute IRI
+_PN_LOCAL = re.compile(r"[\w\u00C0-\uFFFF](?:[\w.\-\u00B7\u00C0-\uFFFF]*[\w\-\u00B7\u00C0-\uFFFF])?")
+_IRIREF = re.compile(r'(?:https?://|urn:)[^\x00-\x20<>"{}|^`\\]+')
+
+def relationship_terms(triples):
+    """Rows -> (sparql_term triples, [(row number, cell)] for cells that are neither)."""
+    terms, bad = [], []
+    for i, t in enumerate(triples, 1):
+        cells = [str(x).strip() for x in t]
+        wrong = [x for x in cells if not (_IRIREF.fullmatch(x) or _PN_LOCAL.fullmatch(safe_name(x)))]
+        if wrong:
+            bad.extend((i, x) for x in wrong)
+        else:
+            terms.append(tuple(sparql_term(x) for x in cells))
+    return terms, bad
+
+def insert_relationships(triples, user="anon", chunk_size=KG_BULK_CHUNK):
+    """Insert many (subject, predicate, object) in a single update request.
+
+    Triples are split into INSERT DATA blocks of chunk_size joined with ';',
+    which Fuseki applies as one transaction; one activity log entry per batch.
+    Returns the number of triples inserted (0 on failure). Raises ValueError,
+    inserting nothing, if any cell is not a local name or an absolute IRI.
+    """
+    terms, bad = relationship_terms(triples)
+    if bad:
+        shown = "; ".join(f"row {i}: {x!r}" for i, x in bad[:5])
+        raise ValueError(f"{len(bad)} invalid name(s) or IRI(s) - {shown}" + (" ..." if len(bad) > 5 else ""))
+    if not terms:
+        return 0
+    chunk_size = max(1, int(chunk_size))
+    blocks = []
+    for i in range(0, len(terms), chunk_size):
+        body = "\n".join(f"  {s[0]} {p[0]} {o[0]} ." for s, p, o in terms[i:i + chunk_size])
+        blocks.append(f"INSERT DATA {{\n{body}\n}}")
+    full = [(s[1], p[1], o[1]) for s, p, o in terms]
+    generation = get_query_cache().generation
+    novelty = stats_novelty(full)
+    ok = run_update(" ;\n".join(blocks))
+    if not ok:
+        return 0
+    log_action(user, "add_relationships_bulk", {"count": len(terms), "chunks": len(blocks)})
+    stats_add(novelty, generation, get_query_cache().generation)
+    get_search_index().add([(s, o, ()) for s, p, o in full if p == RDF_TYPE],
+                           generation, get_query_cache().generation)
+    get_similarity_index().add(full, generation, get_query_cache().generation)
+    infer_after_insert(full, generation, get_query_cache().generation)
+    return len(terms)
+
+def import_path(name):
+    """Server-side import file -> real path inside KG_IMPORT_DIR; ValueError for anything else."""
+    root = os.path.realpath(KG_IMPORT_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ValueError(f"{name}: not a file in the import directory {KG_IMPORT_DIR}")
+    return path
+
 def delete_all_triples(user="admin"):
     ok = run_update("DELETE WHERE { ?s ?p ?o }", prefix=False)
     if ok:
         log_action(user, "purge_dataset")
+        get_dataset_stats().clear(get_query_cache().generation)
+        get_search_index().clear(get_query_cache().generation)
+        get_similarity_index().clear(get_query_cache().generation)
+        get_graph_analytics().clear(get_query_cache().generation)
+        get_reasoner().clear(get_query_cache().generation)
     return ok
 
-def get_entity_rels(entity, limit=500):
+def entity_rels_query(entity, limit=500):
     e = safe_name(entity)
-    q = f"SELECT ?predicate ?object WHERE {{ :{e} ?predicate ?object }} LIMIT {limit}"
-    return run_query(q)
+    return f"SELECT ?predicate ?object WHERE {{ :{e} ?predicate ?object }} LIMIT {limit}"
+
+def similar_entities(entity, limit=10):
+    """Ranked similar entities -> DataFrame(other, score, shared, example_p, example_o).
+
+    Served from the precomputed similarity index instead of a self-join over
+    every (predicate, object) the entity has.
+    """
+    rows = [(other, score, len(shared), shared[0][0], shared[0][1])
+            for other, score, shared in similarity_index().similar(sparql_term(entity)[1], limit)]
+    return pd.DataFrame(rows, columns=["other", "score", "shared", "example_p", "example_o"])
+
+def get_entity_rels(entity, limit=500):
+    return run_query(entity_rels_query(entity, limit))
 
 def get_top_predicates(limit=10):
-    q = f"SELECT ?p (COUNT(?p) as ?count) WHERE {{ ?s ?p ?o }} GROUP BY ?p ORDER BY DESC(?count) LIMIT {limit}"
-    return run_query(q)
+    return pd.DataFrame(dataset_stats().top_predicates(limit), columns=["p", "count"])
 
-def visualize_df_pyvis(df, center_label, theme_dark=False):
-    if df.empty:
+def show_neighborhood(nb, theme_dark=False):
+    if len(nb.edges) == 0:
         st.info("No relationships to visualize.")
         return
-    G = nx.DiGraph()
-    center = safe_name(center_label)
-    G.add_node(center, title=center)
-    for _, row in df.iterrows():
-        pred = row["predicate"].split("#")[-1] if "#" in row["predicate"] else row["predicate"]
-        obj = row["object"].split("#")[-1] if "#" in row["object"] else row["object"]
-        G.add_node(obj, title=obj)
-        G.add_edge(center, obj, title=pred)
-    net = Network(height="600px", width="100%", directed=True,
-                  bgcolor="#0b1220" if theme_dark else "#ffffff",
-                  font_color="white" if theme_dark else "black")
-    net.from_nx(G)
-    net.barnes_hut()
-    tmp_file = "kg_graph.html"
-    net.save_graph(tmp_file)
-    html = open(tmp_file, "r", encoding="utf-8").read()
-    components.html(html, height=650)
+    # rendered in memory: no shared HTML file for concurrent sessions to overwrite
+    components.html(nb.html(dark=theme_dark), height=650)
 
 # ---------------- PAGES ----------------
 if menu == "Dataset Overview":
     st.header("📊 Dataset Overview")
     c1, c2, c3 = st.columns(3)
+    stats = None
     try:
-        triples = run_query("SELECT (COUNT(*) AS ?cnt) WHERE { ?s ?p ?o }")
-        classes = run_query("SELECT (COUNT(DISTINCT ?c) AS ?cnt) WHERE { ?s a ?c }")
-        entities = run_query("SELECT (COUNT(DISTINCT ?s) AS ?cnt) WHERE { ?s ?p ?o }")
-        if not triples.empty:
-            c1.metric("Triples", int(triples.loc[0]["cnt"]))
-        if not classes.empty:
-            c2.metric("Distinct Classes", int(classes.loc[0]["cnt"]))
-        if not entities.empty:
-            c3.metric("Unique Entities", int(entities.loc[0]["cnt"]))
+        stats = dataset_stats(force=st.button("🔄 Rebuild statistics"))
+        c1.metric("Triples", stats.triple_count)
+        c2.metric("Distinct Classes", stats.distinct_classes)
+        c3.metric("Unique Entities", stats.distinct_subjects)
+        built = f"Statistics index built {time.strftime('%H:%M:%S', time.localtime(stats.built_at))}"
+        if stats.timings:
+            # the three GROUP BY queries run concurrently: wall time vs their sum
+            built += (f" in {stats.build_seconds * 1000:.0f} ms "
+                      f"({sum(stats.timings.values()) * 1000:.0f} ms of queries; "
+                      f"subjects {stats.timings['subjects'] * 1000:.0f} ms)")
+        st.caption(built + ", kept current by inserts and purges")
     except Exception:
         st.warning("Could not fetch dataset stats (Fuseki offline?)")
 
+    def panel_timing(name):
+        if stats is not None and name in stats.timings:
+            st.caption(f"⏱ {stats.timings[name] * 1000:.0f} ms (last rebuild)")
+
     st.subheader("🔝 Top Predicates")
     try:
         preds = get_top_predicates(10)
         if not preds.empty:
-            preds["p_short"] = preds["p"].apply(lambda x: x.split("#")[-1])
+            preds["p_short"] = short_names(preds["p"])
             preds = preds.set_index("p_short")
             st.bar_chart(preds["count"])
+            panel_timing("predicates")
     except Exception:
         st.info("Top predicates not available.")
 
     st.subheader("📚 Ontology Classes (sample counts)")
     try:
-        cls_q = """
-        SELECT ?cls (COUNT(?s) AS ?count)
-        WHERE { ?s a ?cls . }
-        GROUP BY ?cls ORDER BY DESC(?count) LIMIT 12
-        """
-        cls_df = run_query(cls_q)
+        cls_df = pd.DataFrame(dataset_stats().top_classes(12), columns=["cls", "count"])
         if not cls_df.empty:
-            cls_df["cls_short"] = cls_df["cls"].apply(lambda x: x.split("#")[-1])
+            cls_df["cls_short"] = short_names(cls_df["cls"])
             cls_df = cls_df.set_index("cls_short")
             st.bar_chart(cls_df["count"])
+            panel_timing("classes")
     except Exception:
         st.info("Could not fetch class counts.")
 
@@ -388,23 +791,120 @@ elif menu == "Add Relationships":
         if subj.strip() == "" or len(preds) == 0 or len(preds) != len(objs):
             st.error("Please supply subject and matching lists of predicates & objects")
         else:
-            succeeded = 0
-            for p, o in zip(preds, objs):
-                ok = insert_relationship(subj, p, o, user=st.session_state.get("user", "anon"))
-                if ok:
-                    succeeded += 1
-            st.success(f"Inserted {succeeded} relationships for {subj}")
+            try:
+                succeeded = insert_relationships([(subj, p, o) for p, o in zip(preds, objs)],
+                                                 user=st.session_state.get("user", "anon"))
+                st.success(f"Inserted {succeeded} relationships for {subj}")
+            except ValueError as e:
+                st.error(f"Nothing inserted: {e}")
+
+    st.markdown("---")
+    st.subheader("📄 Bulk upload (CSV)")
+    st.caption("Columns: subject, predicate, object — local names (Sindhi_Culture) or full IRIs")
+    rel_csv = st.file_uploader("Relationships CSV", type=["csv"])
+    chunk = st.number_input("Triples per INSERT DATA block", 50, 10000, KG_BULK_CHUNK, step=50)
+    if rel_csv is not None:
+        try:
+            rel_df = pd.read_csv(rel_csv, dtype=str).dropna()
+            rel_df.columns = [c.strip().lower() for c in rel_df.columns]
+        except Exception as e:
+            rel_df = None
+            st.error(f"Could not read CSV: {e}")
+        if rel_df is not None and not {"subject", "predicate", "object"}.issubset(rel_df.columns):
+            st.error("CSV needs subject, predicate and object columns")
+        elif rel_df is not None:
+            rows = list(zip(rel_df["subject"], rel_df["predicate"], rel_df["object"]))
+            _, bad = relationship_terms(rows)
+            st.write(f"{len(rel_df)} relationships ready")
+            st.dataframe(rel_df.head(20))
+            if bad:
+                # rejected before any update is built: fix the CSV and upload it again
+                st.error(f"{len(bad)} cell(s) are neither a local name nor an absolute IRI; nothing will be inserted")
+                st.dataframe(pd.DataFrame(bad, columns=["row", "cell"]).head(50))
+            elif st.button("Insert CSV relationships"):
+                n = insert_relationships(rows, user=st.session_state.get("user", "anon"), chunk_size=chunk)
+                if n:
+                    st.success(f"Inserted {n} relationships from {rel_csv.name}")
+                else:
+                    st.error("Bulk insert failed")
 
 elif menu == "SPARQL Explorer":
     st.header("🔎 SPARQL Explorer (SELECT/ASK/CONSTRUCT)")
     default_q = "SELECT ?s ?p ?o WHERE { ?s ?p ?o } LIMIT 50"
     q = st.text_area("SPARQL SELECT query", value=default_q, height=220)
+    typed = st.checkbox("Numeric literals as numbers (xsd:integer, xsd:decimal, ...)", value=False)
+    # plain literals such as hasPopulation "12344000" carry no datatype: opt in per column
+    numeric = tuple(v.strip().lstrip("?$") for v in st.text_input(
+        "Plain-literal columns to read as numbers (comma-separated, e.g. population)", value="").split(",") if v.strip())
+
+    def explorer_drop_export():
+        old = st.session_state.pop("explorer_export", None)
+        if old and os.path.exists(old[0]):
+            os.remove(old[0])
+
+    def explorer_load_more():
+        ex = st.session_state.explorer
+        try:
+            page = ex["cursor"].fetch_page()
+        except Exception as e:
+            ex["error"] = str(e)
+            return
+        if page is not None:
+            ex["pages"].append(page)
+
     if st.button("Run Query"):
-        df = run_query(q)
+        if is_select(q):
+            # fetched page by page (LIMIT/OFFSET), never the whole result at once
+            cursor = PagedQuery(PREFIX + q, lambda x: query_df(x, prefix=False, typed=typed, numeric=numeric),
+                                KG_PAGE_SIZE, KG_MAX_ROWS)
+            st.session_state.explorer = {"query": q, "cursor": cursor, "pages": [], "error": None, "typed": typed,
+                                         "numeric": numeric}
+            explorer_load_more()
+        else:
+            st.session_state.explorer = {"query": q, "cursor": None, "pages": [run_query(q)], "error": None,
+                                         "typed": typed, "numeric": numeric}
+        explorer_drop_export()
+
+    ex = st.session_state.get("explorer")
+    if ex:
+        if ex["error"]:
+            st.error(f"SPARQL query failed: {ex['error']}")
+        df = pd.concat(ex["pages"], ignore_index=True) if ex["pages"] else pd.DataFrame()
+        cursor = ex["cursor"]
         if df.empty:
             st.warning("No results or query failed.")
         else:
             st.dataframe(df)
+        if cursor is not None and not df.empty:
+            st.caption(f"{len(df)} rows shown" + (" (more available)" if cursor.has_more else ""))
+            if not cursor.ordered and (cursor.has_more or len(ex["pages"]) > 1):
+                st.warning("This query has no ORDER BY, so LIMIT / OFFSET pages (and the CSV export) "
+                           "may repeat or skip rows; add ORDER BY for stable paging.")
+            if cursor.capped:
+                st.info(f"Display limit of {KG_MAX_ROWS} rows reached; use the CSV export for the full result.")
+            elif cursor.has_more:
+                st.button(f"⏬ Load more ({KG_PAGE_SIZE} rows)", on_click=explorer_load_more)
+            if st.button("📦 Export full result as CSV"):
+                # pages are written to a temp file one at a time (uncached)
+                explorer_drop_export()
+                with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8", newline="") as f:
+                    try:
+                        select = lambda x: query_df(x, prefix=False, cache=False, typed=ex["typed"], numeric=ex["numeric"])
+                        n, capped = export_csv(PREFIX + ex["query"], select, f, max_rows=KG_EXPORT_MAX_ROWS)
+                    except Exception as e:
+                        st.error(f"Export failed: {e}")
+                        n, capped = None, False
+                if n is None:
+                    os.remove(f.name)
+                else:
+                    st.session_state.explorer_export = (f.name, n, capped)
+            export = st.session_state.get("explorer_export")
+            if export and os.path.exists(export[0]):
+                path, n, capped = export
+                st.caption(f"{n} rows exported" + (f" (capped at {KG_EXPORT_MAX_ROWS})" if capped else ""))
+                with open(path, "rb") as f:
+                    st.download_button("📥 Download CSV", data=f, file_name="query_results.csv", mime="text/csv")
+        elif not df.empty:
             csv = df.to_csv(index=False).encode("utf-8")
             st.download_button("📥 Download CSV", data=csv, file_name="query_results.csv")
 
@@ -412,38 +912,135 @@ elif menu == "Analyze Entity":
     st.header("📈 Analyze Entity")
     ent = st.text_input("Entity name (exact individual name, e.g., Maira_Masood)")
     max_rows = st.slider("Max relationships to fetch", 10, 500, 200)
+    hops = st.slider("Graph hops", 1, MAX_HOPS, min(KG_GRAPH_HOPS, MAX_HOPS))
     if st.button("Analyze"):
         if not ent:
             st.warning("Enter entity name")
         else:
-            df = get_entity_rels(ent, limit=max_rows)
-            if df.empty:
-                st.warning("No relationships found for this entity")
-            else:
-                st.subheader("Relationships")
-                st.dataframe(df)
-                st.subheader("Predicate counts")
-                counts = df["predicate"].value_counts().reset_index()
-                counts.columns = ["Predicate", "Count"]
-                counts["Predicate"] = counts["Predicate"].apply(lambda x: x.split("#")[-1])
-                st.bar_chart(counts.set_index("Predicate"))
-                st.subheader("Visual Graph")
-                visualize_df_pyvis(df, ent, theme_dark=(theme_choice == "Dark"))
-                st.subheader("Similar Entities (share same object/value)")
-                sim_q = f"""
-                SELECT ?other ?p WHERE {{
-                  :{safe_name(ent)} ?p ?obj .
-                  ?other ?p ?obj .
-                  FILTER(?other != :{safe_name(ent)})
-                }} LIMIT 50
-                """
-                sim_df = run_query(sim_q)
-                if not sim_df.empty:
-                    sim_df["other_short"] = sim_df["other"].apply(lambda x: x.split("#")[-1])
-                    sim_df["p_short"] = sim_df["p"].apply(lambda x: x.split("#")[-1])
-                    st.dataframe(sim_df[["other_short", "p_short"]].rename(columns={"other_short":"Entity","p_short":"Predicate"}))
+            # the queries are independent: dispatch together, render each panel as it arrives
+            rels_f = submit_task(timed, query_df, entity_rels_query(ent, limit=max_rows))
+            graph_f = submit_task(timed, entity_neighborhood, ent, hops)
+            sim_f = submit_task(timed, similar_entities, ent)
+            futures = [rels_f, graph_f, sim_f]
+            panels = {f: st.container() for f in futures}
+            for fut in as_completed(futures):
+                with panels[fut]:
+                    try:
+                        df, secs = fut.result()
+                    except Exception as e:
+                        st.error(f"SPARQL query failed: {e}")
+                        continue
+                    if fut is graph_f:
+                        nb = df
+                        st.subheader("Visual Graph")
+                        st.caption(f"⏱ {secs * 1000:.0f} ms · {hops} hop(s), {len(nb)} nodes, "
+                                   f"{len(nb.edges)} edges (at most {KG_GRAPH_MAX_DEGREE} per node)")
+                        show_neighborhood(nb, theme_dark=(theme_choice == "Dark"))
+                    elif fut is rels_f:
+                        if df.empty:
+                            st.warning("No relationships found for this entity")
+                            continue
+                        st.subheader("Relationships")
+                        st.caption(f"⏱ {secs * 1000:.0f} ms")
+                        st.dataframe(df)
+                        st.subheader("Predicate counts")
+                        counts = df["predicate"].value_counts().reset_index()
+                        counts.columns = ["Predicate", "Count"]
+                        counts["Predicate"] = short_names(counts["Predicate"])
+                        st.bar_chart(counts.set_index("Predicate"))
+                    else:
+                        st.subheader("Similar Entities (weighted overlap of predicate/object pairs)")
+                        st.caption(f"⏱ {secs * 1000:.0f} ms")
+                        sim_df = df
+                        if not sim_df.empty:
+                            st.dataframe(pd.DataFrame({
+                                "Entity": short_names(sim_df["other"]),
+                                "Score": sim_df["score"].round(3),
+                                "Shared": sim_df["shared"],
+                                "e.g.": short_names(sim_df["example_p"]) + " " + short_names(sim_df["example_o"]),
+                            }))
+                        else:
+                            st.info("No similar entities found.")
+            timings = [f.result()[1] for f in futures if not f.exception()]
+            if len(timings) == len(futures) and get_backend().concurrent_reads:
+                st.caption(f"Page queries: {max(timings) * 1000:.0f} ms concurrently, "
+                           f"{sum(timings) * 1000:.0f} ms one after another")
+
+elif menu == "Graph Analytics":
+    st.header("🕸️ Graph Analytics")
+    ga = None
+    try:
+        with st.spinner("Building the graph..."):
+            ga = graph_analytics()
+    except Exception as e:
+        st.error(f"SPARQL query failed: {e}")
+    if ga is not None and not len(ga):
+        st.info("No links between entities to analyse yet.")
+    elif ga is not None:
+        components_, communities = ga.components(), ga.communities()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Nodes", f"{len(ga):,}")
+        c2.metric("Links", f"{ga.edge_count:,}")
+        c3.metric("Components", f"{len(pd.unique(components_)):,}")
+        c4.metric("Communities", f"{len(pd.unique(communities)):,}")
+        st.caption(f"Entity-to-entity links only (literals and class membership excluded); "
+                   f"cached for dataset generation {ga.generation}, CSR built in {ga.build_seconds * 1000:.0f} ms")
+        tab1, tab2, tab3 = st.tabs(["⭐ Centrality", "🧩 Communities", "🧭 Shortest path"])
+
+        with tab1:
+            classes = ga.classes()
+            options = ["All"] + classes.index[:50].tolist()
+            cls = st.selectbox("Class", options, format_func=lambda c: c if c == "All" else
+                               f"{short_name(c)} ({classes[c]:,})")
+            k = st.slider("Show top", 5, 100, 20)
+            top = ga.top_central(k, None if cls == "All" else cls)
+            st.dataframe(pd.DataFrame({
+                "Entity": short_names(top["node"]),
+                "Class": short_names(top["class"]),
+                "PageRank": top["pagerank"].map("{:.5f}".format),
+                "Degree": top["degree"],
+            }), hide_index=True)
+
+        with tab2:
+            kind = st.radio("Grouping", ["Communities (label propagation)", "Connected components"], horizontal=True)
+            labels = communities if kind.startswith("Communities") else components_
+            groups = ga.groups(labels, top=50)
+            st.dataframe(pd.DataFrame({
+                "Size": groups["size"],
+                "Most central member": short_names(groups["top"]),
+            }), hide_index=True)
+            pick = st.selectbox("Members of", groups.index,
+                                format_func=lambda i: f"{short_name(groups['top'][i])} ({groups['size'][i]:,})")
+            members = ga.members(labels, groups["label"][pick])
+            st.dataframe(pd.DataFrame({
+                "Entity": short_names(members["node"]),
+                "Class": short_names(members["class"]),
+                "PageRank": members["pagerank"].map("{:.5f}".format),
+                "Degree": members["degree"],
+            }), hide_index=True)
+
+        with tab3:
+            c1, c2 = st.columns(2)
+            src = c1.text_input("From (IRI or name)", "Sindhi_Culture")
+            dst = c2.text_input("To (IRI or name)", "Punjab")
+            if st.button("Find path"):
+                a, b = ga.resolve(src, ONTOLOGY_BASE), ga.resolve(dst, ONTOLOGY_BASE)
+                if a is None or b is None:
+                    st.warning(f"Unknown or ambiguous entity: {src if a is None else dst}")
                 else:
-                    st.info("No similar entities found.")
+                    t = time.perf_counter()
+                    path = ga.shortest_path(a, b)
+                    secs = time.perf_counter() - t
+                    if path is None:
+                        st.info("No path between these entities (links followed in either direction).")
+                    else:
+                        st.caption(f"{len(path) - 1} hop(s) · ⏱ {secs * 1000:.1f} ms")
+                        edges = ga.path_edges(path)
+                        st.dataframe(pd.DataFrame({
+                            "From": short_names(edges["from"]),
+                            "Predicate": short_names(edges["predicate"]),
+                            "To": short_names(edges["to"]),
+                        }), hide_index=True)
 
 elif menu == "Fuzzy Reasoning":
     st.header("🧠 Fuzzy Similarity / Reasoning Demo")
@@ -459,6 +1056,30 @@ elif menu == "Fuzzy Reasoning":
         else:
             st.info("Low similarity")
 
+    st.markdown("---")
+    st.subheader("🔍 Find similar entities")
+    source = st.radio("Search in", ["Knowledge graph entities", "Extracted mentions (CSV)"], horizontal=True)
+    sim_name = st.text_input("Entity name", "Maira Masood")
+    min_sim = st.slider("Minimum similarity", 0.5, 1.0, 0.7, 0.05)
+    if st.button("Find similar"):
+        try:
+            if source == "Knowledge graph entities":
+                idx = fuzzy_index()
+            else:
+                idx = mention_index(KG_ENTITIES_CSV, os.path.getmtime(KG_ENTITIES_CSV))
+            hits = idx.similar(sim_name, threshold=int(min_sim * 100), limit=25)
+        except Exception as e:
+            st.error(f"Similarity search failed: {e}")
+            hits = None
+        if hits:
+            df_sim = pd.DataFrame(hits, columns=["Entity", "Class", "Similarity"])
+            df_sim["Similarity"] = df_sim["Similarity"] / 100.0
+            st.dataframe(df_sim)
+            st.caption(f"{len(idx)} names indexed in {len(idx.blocks)} blocks; "
+                       f"offline duplicate clusters: `python kg_dedup.py {KG_ENTITIES_CSV}`")
+        elif hits is not None:
+            st.info("No similar entities found.")
+
 elif menu == "Admin":
     # Admin: show login on main page (not sidebar)
     if "auth" not in st.session_state or not st.session_state.auth:
@@ -490,7 +1111,8 @@ elif menu == "Admin":
         st.success("Logged out")
         st.rerun()
 
-    tab1, tab2, tab3, tab4 = st.tabs(["🧹 Purge", "📤 Export RDF", "📥 Import RDF", "📜 Activity Log"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🧹 Purge", "📤 Export RDF", "📥 Import RDF", "📜 Activity Log",
+                                                  "⚡ Query Cache", "🧠 Reasoner"])
 
     with tab1:
         st.write("**Danger zone** — delete all triples from dataset")
@@ -502,34 +1124,107 @@ elif menu == "Admin":
                 st.error("Purge failed")
 
     with tab2:
-        st.write("Export full RDF dump from Fuseki (graph store)")
-        if st.button("Fetch RDF (.rdf/.trig)"):
+        st.write(f"Export full RDF dump from the {get_backend().name} store (graph store)")
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            export_fmt = st.selectbox("Format", list(EXPORT_FORMATS))
+        with c2:
+            export_gz = st.checkbox("gzip", value=True)
+        if st.button("Fetch RDF"):
+            # streamed into a temp file; the dump is never held as one string
+            old = st.session_state.pop("admin_export", None)
+            if old and os.path.exists(old[0]):
+                os.remove(old[0])
             try:
-                r = requests.get(FUSEKI_DATA)
-                if r.status_code == 200:
-                    st.download_button("Download RDF", r.text, file_name="culture_dump.rdf")
-                    log_action(st.session_state.get("user","admin"), "export_rdf")
-                else:
-                    st.error(f"Failed to fetch RDF: {r.status_code}")
+                t0 = time.perf_counter()
+                with st.spinner("Exporting..."):
+                    path, size = export_to_file(get_backend(), export_fmt, compress=export_gz)
+                st.session_state.admin_export = (path, size, export_fmt, export_gz, time.perf_counter() - t0)
+                log_action(st.session_state.get("user","admin"), "export_rdf",
+                           {"format": export_fmt, "gzip": export_gz, "bytes": size})
             except Exception as e:
                 st.error(f"Error fetching RDF: {e}")
+        export = st.session_state.get("admin_export")
+        if export and os.path.exists(export[0]):
+            path, size, fmt, gz, secs = export
+            ext = EXPORT_FORMATS[fmt][1] + (".gz" if gz else "")
+            st.caption(f"{fmt}{' (gzip)' if gz else ''}: {size / 1e6:.1f} MB in {secs:.1f}s")
+            with open(path, "rb") as f:
+                st.download_button("Download RDF", data=f, file_name=f"culture_dump.{ext}",
+                                   mime="application/gzip" if gz else EXPORT_FORMATS[fmt][0])
 
     with tab3:
         st.write("Upload RDF/OWL/Turtle file (it will be appended)")
-        upload = st.file_uploader("Choose file", type=["rdf","owl","ttl","nt","trig"])
-        content_type = st.selectbox("Content-Type header", ["application/rdf+xml","text/turtle","application/trig","text/plain"])
-        if upload and st.button("Upload file"):
+        upload = st.file_uploader("Choose file", type=["rdf","owl","ttl","nt","trig","gz"])
+        server_path = st.text_input(f"...or a file in the server import directory '{KG_IMPORT_DIR}' (large dumps)", "")
+        content_type = st.selectbox("Content-Type header", ["application/rdf+xml","text/turtle","application/trig",
+                                                            "application/n-triples","text/plain"])
+        batch_size = st.number_input("Statements per batch", 1000, 1000000, KG_IMPORT_BATCH, 1000)
+        if content_type in SPLITTABLE:
+            st.caption(f"Sent in batches of {batch_size:,} statements; a failed batch can be resumed.")
+        else:
+            st.caption("RDF/XML and TriG are sent in one request.")
+
+        source = None
+        if server_path.strip():
             try:
-                data = upload.read()
-                headers = {"Content-Type": content_type}
-                r = requests.post(FUSEKI_DATA, data=data, headers=headers)
-                if r.status_code in (200,201,204):
-                    st.success("Upload succeeded")
-                    log_action(st.session_state.get("user","admin"), "import_rdf", {"filename": upload.name})
-                else:
-                    st.error(f"Upload failed: {r.status_code} - {r.text}")
+                path = import_path(server_path.strip())
+                source = (path, os.path.getsize(path))
+            except ValueError as e:
+                st.error(str(e))
+        elif upload:
+            source = (upload.name, upload.size)
+        state = st.session_state.get("admin_import")
+        resumable = (state and state["failed"] and source and state["source"] == source
+                     and state["content_type"] == content_type and state["batch_size"] == batch_size)
+        start = state["next_batch"] if resumable else 0
+        label = f"Resume from batch {start + 1}" if resumable else "Upload file"
+
+        if source and st.button(label):
+            name, size = source
+            bar = st.progress(0.0, text="Starting import...")
+
+            def report(frac, msg):
+                bar.progress(frac if frac is not None else 0.0, text=msg)
+
+            raw = None
+            generation = get_query_cache().generation
+            # statistics follow the import batch by batch (N-Triples); otherwise rebuilt after it
+            on_batch, stats_state = import_stats_hook(generation)
+            try:
+                raw = open(name, "rb") if server_path.strip() else upload
+                raw.seek(0)
+                res = import_batches(get_backend(), open_upload(raw, name), content_type,
+                                     batch_size=batch_size, start_batch=start, total_bytes=size,
+                                     progress=report, on_batch=on_batch)
             except Exception as e:
-                st.error(f"Upload error: {e}")
+                res = {"batches": 0, "statements": 0, "next_batch": start, "failed": str(e), "seconds": 0.0}
+            finally:
+                if raw is not None and raw is not upload:
+                    raw.close()
+                # even a failed import may have stored some batches
+                get_query_cache().bump()
+            if not res["failed"] and stats_state["ok"] and res["batches"]:
+                get_dataset_stats().advance(generation, get_query_cache().generation)
+            elif not res["failed"]:
+                try:
+                    dataset_stats(force=True)
+                except Exception as e:
+                    st.warning(f"Statistics not refreshed: {e}")
+            st.session_state.admin_import = {"source": source, "content_type": content_type,
+                                             "batch_size": batch_size, **res}
+            done = f"{res['batches']} batches, {res['statements']:,} statements in {res['seconds']:.1f}s"
+            if res["failed"]:
+                st.error(f"Upload error: {res['failed']} ({done} loaded before it)")
+                if content_type in SPLITTABLE and res["next_batch"]:
+                    st.info(f"Batches 1-{res['next_batch']} are stored; press "
+                            f"'Resume from batch {res['next_batch'] + 1}' to continue.")
+            else:
+                bar.progress(1.0, text="Done")
+                st.success(f"Upload succeeded ({done})")
+            log_action(st.session_state.get("user","admin"), "import_rdf",
+                       {"filename": name, "start_batch": start, "batches": res["batches"],
+                        "statements": res["statements"], "failed": res["failed"]})
 
     with tab4:
         st.write("Recent activity log")
@@ -544,6 +1239,109 @@ elif menu == "Admin":
         else:
             st.info("No activity log yet")
 
+        st.subheader("Query profile")
+        prof = get_profiler()
+        summary = prof.summary()
+        slow = prof.slow()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Queries", f"{int(summary['calls'].sum()):,}")
+        m2.metric("Shapes", len(summary))
+        m3.metric(f"Slow (≥ {KG_SLOW_QUERY_MS:.0f} ms)", len(slow))
+        st.caption(f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(prof.started))} · "
+                   f"latest {prof.window} calls per shape · log: {KG_QUERY_LOG}, slow log: {KG_SLOW_QUERY_LOG}")
+        if summary.empty:
+            st.info("No queries recorded yet.")
+        else:
+            st.dataframe(summary.assign(hit_rate=summary["hit_rate"].map("{:.0%}".format))
+                         .round({"p50_ms": 1, "p95_ms": 1, "p99_ms": 1, "max_ms": 1,
+                                 "rows_per_call": 1, "bytes_per_call": 0}), hide_index=True)
+        if slow:
+            st.write("Slow queries (newest first)")
+            st.dataframe(pd.DataFrame(slow)[["ts", "kind", "ms", "rows", "bytes", "cache", "ok", "query"]],
+                         hide_index=True)
+        c1, c2 = st.columns(2)
+        if KG_QUERY_LOG:
+            # deferred: the log is only read when the button is clicked
+            c1.download_button("Download query log (JSONL)", data=prof.read_log, file_name="query_log.jsonl",
+                               mime="application/jsonl")
+        if c2.button("Reset query profile"):
+            prof.reset()
+            log_action(st.session_state.get("user","admin"), "reset_query_profile")
+            st.rerun()
+
+    with tab5:
+        st.write("Shared SPARQL result cache (all sessions)")
+        cstats = get_query_cache().stats()
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Hits", cstats["hits"])
+        m2.metric("Misses", cstats["misses"])
+        m3.metric("Hit rate", f"{cstats['hit_rate']:.0%}")
+        m4.metric("Entries", f"{cstats['entries']} / {KG_CACHE_SIZE}")
+        st.caption(f"Dataset generation {cstats['generation']} · {cstats['evictions']} LRU evictions · TTL {KG_CACHE_TTL}s")
+        if st.button("Clear query cache"):
+            get_query_cache().clear()
+            log_action(st.session_state.get("user","admin"), "clear_query_cache")
+            st.rerun()
+
+        client = getattr(get_backend(), "client", None)
+        if client is not None:
+            st.subheader("Fuseki connection pool")
+            st.caption(f"{client.base} · pool of {client.pool_size} keep-alive connections · "
+                       f"up to {client.retries} retries for reads")
+            calls = client.metrics()
+            if calls:
+                df_calls = pd.DataFrame(calls).round({"avg_ms": 1, "max_ms": 1, "last_ms": 1})
+                st.dataframe(df_calls.set_index("op"))
+            else:
+                st.info("No Fuseki calls yet.")
+            if st.button("Reset call metrics"):
+                client.reset_metrics()
+                st.rerun()
+
+    with tab6:
+        st.write("Forward-chaining materialization: rdfs:domain / range, subClassOf, subPropertyOf, "
+                 "and the symmetric / inverse properties the ontology declares")
+        if KG_REASONER_AXIOMS:
+            st.caption("KG_REASONER_AXIOMS=1: also assuming borderWith / sharesLanguageWith are symmetric and "
+                       "spokenBy / hasLanguage are inverses; these axioms are written to the store.")
+        reasoner = get_reasoner()
+        if st.button("Materialize inferences"):
+            with st.spinner("Running the fixpoint..."):
+                try:
+                    inferred = materialize_inferences(st.session_state.get("user","admin"))
+                except Exception as e:
+                    st.error(f"Materialization failed: {e}")
+                    inferred = None
+            if inferred is not None:
+                st.success(f"{len(inferred):,} triples inferred in {reasoner.seconds:.2f}s and written to the store")
+        rstats = reasoner.stats()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Asserted", f"{rstats['asserted']:,}")
+        m2.metric("Inferred", f"{rstats['inferred']:,}")
+        m3.metric("Last run", f"{rstats['seconds'] * 1000:.1f} ms")
+        if rstats["rules"]:
+            st.dataframe(pd.DataFrame(sorted(rstats["rules"].items()), columns=["Rule", "Triples"]).set_index("Rule"))
+        if reasoner.is_fresh(get_query_cache().generation):
+            st.caption("Up to date: inserted entities and relationships are reasoned over incrementally.")
+        else:
+            st.caption("Not materialized for the current dataset; inserts are not reasoned over until you run it.")
+
+        st.subheader("Explain a triple")
+        e1, e2, e3 = st.columns(3)
+        with e1:
+            ex_s = st.text_input("Subject", "Punjab")
+        with e2:
+            ex_p = st.text_input("Predicate", "hasLanguage" if KG_REASONER_AXIOMS else "rdf:type")
+        with e3:
+            ex_o = st.text_input("Object", "Punjabi" if KG_REASONER_AXIOMS else "Location")
+        if st.button("Explain"):
+            if ex_p.strip() in ("a", "rdf:type"):
+                p_iri = RDF_TYPE
+            else:
+                p_iri = sparql_term(ex_p)[1]
+            triple = (f"<{sparql_term(ex_s)[1]}>", f"<{p_iri}>", f"<{sparql_term(ex_o)[1]}>")
+            st.json(reasoner.explain(triple))
+
 # Footer
 st.markdown("---")
 st.caption("Made with ❤️ using Streamlit — FAST NUCES, KRR Project 2025")
\ No newline at end of file
@@ -0,0 +1,208 @@
+# crawl_cache.py
+"""
+On-disk cache of crawled pages for the Phase 1 crawler
+
+    .crawl_cache/index.json         url -> ETag / Last-Modified / blob hashes
+    .crawl_cache/objects/ab/abcd..  content-addressed blobs (raw HTML, extracted text)
+
+- re-runs send conditional GETs (If-None-Match / If-Modified-Since); a 304,
+  or a 200 whose HTML hash is unchanged, reuses the cached text and skips
+  both the download and BeautifulSoup
+- offline=True never touches the network, so NER can be re-run over the
+  cached corpus; iter_pages() serves it without the crawler's per-host
+  politeness delays
+- evict() drops entries not revalidated within max_age (a 304 counts as a
+  fresh fetch), then least recently used ones until the blobs fit in max_bytes
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from ner_crawl_spacy import html_to_text
+
+
+def _sha(data):
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    def __init__(self, root=".crawl_cache", max_bytes=512 * 1024 * 1024, max_age=30 * 24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0          # served from cache (304 / unchanged / offline)
+        self.downloads = 0     # full 200 responses that had to be parsed
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    # ---- blobs ----
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _write_blob(self, data):
+        digest = _sha(data)
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def _read_blob(self, digest):
+        with open(self._blob_path(digest), "r", encoding="utf-8") as f:
+            return f.read()
+
+    # ---- entries ----
+    def get(self, url):
+        with self._lock:
+            return self.index.get(url)
+
+    def text(self, url):
+        entry = self.get(url)
+        if entry is None:
+            return None
+        try:
+            return self._read_blob(entry["text"])
+        except OSError:
+            return None
+
+    def put(self, url, html, text, ctype, etag=None, last_modified=None):
+        html_sha = self._write_blob(html)
+        text_sha = self._write_blob(text)
+        now = time.time()
+        with self._lock:
+            self.index[url] = {
+                "etag": etag, "last_modified": last_modified, "ctype": ctype,
+                "html": html_sha, "text": text_sha,
+                "size": len(html.encode("utf-8")) + len(text.encode("utf-8")),
+                "fetched_at": now, "used_at": now,
+            }
+
+    def touch(self, url, revalidated=False):
+        """Mark an entry used; revalidated=True (a 304) also restarts its max_age."""
+        with self._lock:
+            if url in self.index:
+                now = time.time()
+                self.index[url]["used_at"] = now
+                if revalidated:
+                    self.index[url]["fetched_at"] = now
+
+    def _count(self, counter):
+        # fetchers run on the crawler's worker threads
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def save(self):
+        with self._lock:
+            tmp = self._index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.index, f)
+            os.replace(tmp, self._index_path)
+
+    def evict(self):
+        """Age- then size-based eviction; unreferenced blobs are deleted."""
+        now = time.time()
+        with self._lock:
+            for url in [u for u, e in self.index.items() if now - e["fetched_at"] > self.max_age]:
+                del self.index[url]
+            total = sum(e["size"] for e in self.index.values())
+            for url, entry in sorted(self.index.items(), key=lambda kv: kv[1]["used_at"]):
+                if total <= self.max_bytes:
+                    break
+                total -= entry["size"]
+                del self.index[url]
+            live = {e[k] for e in self.index.values() for k in ("html", "text")}
+        removed = 0
+        objects = os.path.join(self.root, "objects")
+        for sub in os.listdir(objects):
+            for name in os.listdir(os.path.join(objects, sub)):
+                if name not in live:
+                    os.remove(os.path.join(objects, sub, name))
+                    removed += 1
+        return removed
+
+    def iter_pages(self, urls=None):
+        """Offline corpus: (url, text, ctype) for cached pages, like crawl() yields.
+
+        Reads local blobs only, so there is no reason to go through crawl()
+        and its per-host throttle.
+        """
+        for url in (urls if urls is not None else list(self.index)):
+            text = self.text(url)
+            if text is None:
+                yield url, None, "offline:not_cached"
+            else:
+                self.touch(url)
+                self._count("hits")
+                yield url, text, self.index[url]["ctype"]
+
+    # ---- crawler integration ----
+    def fetcher(self, offline=False, timeout=12):
+        """fetch(url, session) for ner_crawl_spacy.crawl, backed by this cache."""
+
+        def fetch(url, session):
+            entry = self.get(url)
+            if offline:
+                text = self.text(url)
+                if text is None:
+                    return None, "offline:not_cached"
+                self.touch(url)
+                self._count("hits")
+                return text, entry["ctype"]
+            if url.lower().endswith(".pdf"):
+                return None, "pdf"
+            headers = {}
+            if entry:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+            try:
+                with session.get(url, timeout=timeout, stream=True, headers=headers) as resp:
+                    if resp.status_code == 304 and entry:
+                        text = self.text(url)
+                        if text is not None:
+                            self.touch(url, revalidated=True)
+                            self._count("hits")
+                            return text, entry["ctype"]
+                        # blob lost: fall through to a plain download
+                        return fetch_plain(url, session)
+                    if resp.status_code != 200:
+                        return None, f"error:{resp.status_code}"
+                    ctype = resp.headers.get("content-type","")
+                    if "pdf" in ctype.lower():
+                        return None, "pdf"
+                    html = resp.text
+                    etag = resp.headers.get("ETag")
+                    last_modified = resp.headers.get("Last-Modified")
+            except Exception as e:
+                return None, f"exception:{e}"
+            if entry and entry["html"] == _sha(html):
+                # server ignored the validators but nothing changed: skip parsing
+                text = self.text(url)
+                if text is not None:
+                    self.put(url, html, text, ctype, etag, last_modified)
+                    self._count("hits")
+                    return text, ctype
+            text = html_to_text(html)
+            self.put(url, html, text, ctype, etag, last_modified)
+            self._count("downloads")
+            return text, ctype
+
+        def fetch_plain(url, session):
+            with self._lock:
+                self.index.pop(url, None)
+            return fetch(url, session)
+
+        return fetch
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# kg_analytics.py
+"""
+Structural analytics over the whole KG for the Graph Analytics page
+
+    python kg_analytics.py cultural_difference_properties.ttl culturaldifference_enriched.ttl --path Sindhi_Culture Punjab
+
+- the store's IRI -> IRI triples become a CSR adjacency over integer node
+  ids (out-edges with predicate ids, plus an undirected copy); literals are
+  values, not nodes; class membership links (skip=...) are kept aside as
+  node -> class labels instead of edges, or every class would be a hub
+- PageRank (power iteration, dangling mass spread uniformly), weakly
+  connected components (min-label propagation + pointer jumping), label
+  propagation communities (synchronous, seeded tie-breaks) and bidirectional
+  BFS shortest paths; every step is numpy over the CSR arrays
+- results are computed on first use and kept until the dataset generation
+  moves on (same is_fresh/build contract as the other app indexes)
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from kg_terms import short_name
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+EDGES_Q = "SELECT ?s ?p ?o WHERE { ?s ?p ?o FILTER(isIRI(?s) && isIRI(?o)) }"
+
+
+def _csr(src, dst, n, data=None):
+    """(indptr, indices[, data]) of the rows src -> dst, rows sorted by source."""
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    out = (indptr, dst[order].astype(np.int32))
+    return out + (data[order],) if data is not None else out
+
+
+def _gather(indptr, indices, nodes):
+    """Neighbours of every node in `nodes` -> (owner, neighbour) arrays."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    owner = np.repeat(nodes, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, indices[np.repeat(starts, counts) + offsets]
+
+
+class GraphAnalytics:
+    def __init__(self, skip=(RDF_TYPE,)):
+        self.skip = tuple(skip)
+        self.generation = None
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.nodes = np.empty(0, dtype=object)        # id -> IRI
+        self.predicates = np.empty(0, dtype=object)
+        self._ids = pd.Index([], dtype=object)
+        self._by_short = None
+        self.out_ptr = np.zeros(1, dtype=np.int64)
+        self.out_idx = np.empty(0, dtype=np.int32)
+        self.out_pred = np.empty(0, dtype=np.int32)
+        self.und_ptr = np.zeros(1, dtype=np.int64)
+        self.und_idx = np.empty(0, dtype=np.int32)
+        self.node_class = np.empty(0, dtype=object)   # class IRI or None
+        self._results = {}
+        self.build_seconds = 0.0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def edge_count(self):
+        return len(self.out_idx)
+
+    def is_fresh(self, generation):
+        return self.generation == generation
+
+    # ---- building ----
+    def build(self, select, generation=None):
+        """select(query) -> DataFrame(s, p, o); raises on backend errors."""
+        df = select(EDGES_Q)
+        with self._lock:
+            self._build_frame(df)
+            self.generation = generation
+        return self
+
+    def _build_frame(self, df):
+        t0 = time.perf_counter()
+        self._clear()
+        if df.empty:
+            return
+        is_class = df["p"].isin(self.skip).to_numpy()
+        links, members = df[~is_class], df[is_class]
+        codes, nodes = pd.factorize(pd.concat([links["s"], links["o"], members["s"]], ignore_index=True))
+        n, m = len(nodes), len(links)
+        src, dst = codes[:m].astype(np.int64), codes[m:2 * m].astype(np.int64)
+        # one edge per (s, p, o); parallel predicates between two nodes stay separate
+        pred_codes, preds = pd.factorize(links["p"])
+        key = np.unique(np.stack([src, dst, pred_codes]), axis=1)
+        src, dst, pred = key[0], key[1], key[2].astype(np.int32)
+
+        self.nodes = np.asarray(nodes, dtype=object)
+        self.predicates = np.asarray(preds, dtype=object)
+        self._ids = pd.Index(self.nodes)
+        self.out_ptr, self.out_idx, self.out_pred = _csr(src, dst, n, pred)
+        self_loop = src == dst
+        both_src = np.concatenate([src, dst[~self_loop]])
+        both_dst = np.concatenate([dst, src[~self_loop]])
+        pair = np.unique(both_src * n + both_dst)
+        self.und_ptr, self.und_idx = _csr(pair // n, pair % n, n)
+        # several classes per node: keep the rarest (NamedIndividual loses to GPE)
+        freq = members["o"].map(members["o"].value_counts()).to_numpy()
+        order = np.argsort(-freq, kind="stable")
+        classes = np.full(n, None, dtype=object)
+        classes[codes[2 * m:][order]] = members["o"].to_numpy(dtype=object)[order]
+        self.node_class = classes
+        self.build_seconds = time.perf_counter() - t0
+
+    def clear(self, generation):
+        with self._lock:
+            self._clear()
+            self.generation = generation
+
+    # ---- lookups ----
+    def resolve(self, name, base=None):
+        """IRI, base + name, or a unique short name -> node id (None if unknown / ambiguous)."""
+        name = str(name).strip()
+        for iri in (name, (base or "") + name.replace(" ", "_")):
+            loc = self._ids.get_indexer([iri])[0]
+            if loc >= 0:
+                return int(loc)
+        if self._by_short is None:
+            shorts = pd.Series([short_name(t) for t in self.nodes])
+            self._by_short = shorts.groupby(shorts).indices
+        hits = self._by_short.get(name.replace(" ", "_"), ())
+        return int(hits[0]) if len(hits) == 1 else None
+
+    def degree(self):
+        return np.diff(self.und_ptr)
+
+    def _memo(self, key, fn):
+        with self._lock:
+            value = self._results.get(key)
+        if value is None:
+            value = fn()
+            with self._lock:
+                self._results[key] = value
+        return value
+
+    # ---- centrality ----
+    def pagerank(self, damping=0.85, tol=1e-9, max_iter=100):
+        """PageRank over the directed edges -> float array summing to 1."""
+        return self._memo(("pagerank", damping), lambda: self._pagerank(damping, tol, max_iter))
+
+    def _pagerank(self, damping, tol, max_iter):
+        n = len(self.nodes)
+        if not n:
+            return np.empty(0)
+        out_deg = np.diff(self.out_ptr)
+        src = np.repeat(np.arange(n), out_deg)
+        dangling = out_deg == 0
+        inv = np.where(dangling, 0.0, 1.0 / np.maximum(out_deg, 1))
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            spread = np.bincount(self.out_idx, weights=(rank * inv)[src], minlength=n)
+            new = damping * (spread + rank[dangling].sum() / n) + (1 - damping) / n
+            done = np.abs(new - rank).sum() < tol
+            rank = new
+            if done:
+                break
+        return rank / rank.sum()
+
+    # ---- components / communities ----
+    def components(self):
+        """Weakly connected component label per node (label = smallest node id in it)."""
+        return self._memo("components", self._components)
+
+    def _components(self):
+        n = len(self.nodes)
+        label = np.arange(n)
+        u = np.repeat(np.arange(n), np.diff(self.und_ptr))
+        v = self.und_idx
+        while True:
+            prev = label.copy()
+            np.minimum.at(label, u, label[v])
+            while True:  # pointer jumping
+                jumped = label[label]
+                if np.array_equal(jumped, label):
+                    break
+                label = jumped
+            if np.array_equal(label, prev):
+                return label
+
+    def communities(self, max_iter=30, seed=0):
+        """Label propagation over the undirected graph -> community label per node."""
+        return self._memo(("communities", seed), lambda: self._communities(max_iter, seed))
+
+    def _communities(self, max_iter, seed):
+        n = len(self.nodes)
+        rng = np.random.default_rng(seed)
+        label = np.arange(n)
+        u = np.repeat(np.arange(n), np.diff(self.und_ptr)).astype(np.int64)
+        v = self.und_idx
+        # own label counts too, which damps the two-colour oscillation of synchronous updates
+        u = np.concatenate([u, np.arange(n)])
+        for _ in range(max_iter):
+            cand = np.concatenate([label[v], label])
+            key, votes = np.unique(u * n + cand, return_counts=True)
+            owner, lab = key // n, key % n
+            # most votes wins; random (seeded) tie-break
+            order = np.lexsort((rng.random(len(key)), -votes, owner))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = owner[order][1:] != owner[order][:-1]
+            new = label.copy()
+            new[owner[order][first]] = lab[order][first]
+            changed = int((new != label).sum())
+            label = new
+            if changed <= n // 1000:
+                break
+        return label
+
+    def groups(self, labels, top=None):
+        """DataFrame(label, size, top member) of a component / community labelling, largest first."""
+        sizes = np.bincount(labels, minlength=len(labels))
+        ids = np.nonzero(sizes)[0]
+        rank = self.pagerank()
+        best = pd.Series(rank).groupby(labels).idxmax().reindex(ids).to_numpy()
+        df = pd.DataFrame({"label": ids, "size": sizes[ids], "top": self.nodes[best]})
+        df = df.sort_values(["size", "label"], ascending=[False, True], ignore_index=True)
+        return df.head(top) if top else df
+
+    def members(self, labels, label, top=50):
+        """Members of one group, most central first -> DataFrame(node, pagerank, degree, class)."""
+        idx = np.nonzero(labels == label)[0]
+        rank = self.pagerank()[idx]
+        order = np.argsort(-rank, kind="stable")[:top]
+        idx = idx[order]
+        return pd.DataFrame({"node": self.nodes[idx], "pagerank": rank[order],
+                             "degree": self.degree()[idx], "class": self.node_class[idx]})
+
+    def top_central(self, k=20, cls=None):
+        """Top-k nodes by PageRank, optionally only members of class IRI `cls`."""
+        rank = self.pagerank()
+        idx = np.arange(len(rank)) if cls is None else np.nonzero(self.node_class == cls)[0]
+        idx = idx[np.argsort(-rank[idx], kind="stable")[:k]]
+        return pd.DataFrame({"node": self.nodes[idx], "pagerank": rank[idx],
+                             "degree": self.degree()[idx], "class": self.node_class[idx]})
+
+    def classes(self):
+        """Class IRIs with member counts, most populated first."""
+        return pd.Series(self.node_class).dropna().value_counts()
+
+    # ---- shortest paths ----
+    def shortest_path(self, a, b, max_depth=12):
+        """Bidirectional BFS over undirected edges -> list of node ids (None if unreachable)."""
+        if a is None or b is None:
+            return None
+        if a == b:
+            return [a]
+        n = len(self.nodes)
+        parent = [np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)]
+        parent[0][a], parent[1][b] = a, b
+        frontier = [np.array([a]), np.array([b])]
+        for _ in range(max_depth):
+            # expand the side with less work
+            work = [int((self.und_ptr[f + 1] - self.und_ptr[f]).sum()) for f in frontier]
+            side = 0 if work[0] <= work[1] else 1
+            owner, nbr = _gather(self.und_ptr, self.und_idx, frontier[side])
+            fresh = parent[side][nbr] < 0
+            owner, nbr = owner[fresh], nbr[fresh]
+            nbr, first = np.unique(nbr, return_index=True)
+            parent[side][nbr] = owner[first]
+            meet = nbr[parent[1 - side][nbr] >= 0]
+            if len(meet):
+                return self._join_path(parent, int(meet[0]))
+            if not len(nbr):
+                return None
+            frontier[side] = nbr
+        return None
+
+    @staticmethod
+    def _join_path(parent, mid):
+        left, node = [], mid
+        while True:
+            left.append(node)
+            if parent[0][node] == node:
+                break
+            node = int(parent[0][node])
+        right, node = [], mid
+        while parent[1][node] != node:
+            node = int(parent[1][node])
+            right.append(node)
+        return left[::-1] + right
+
+    def path_edges(self, path):
+        """Node path -> DataFrame(from, predicate, to) with each edge in its stored direction."""
+        rows = []
+        for x, y in zip(path, path[1:]):
+            for s, o in ((x, y), (y, x)):
+                lo, hi = self.out_ptr[s], self.out_ptr[s + 1]
+                hit = np.nonzero(self.out_idx[lo:hi] == o)[0]
+                if len(hit):
+                    rows.append((self.nodes[s], self.predicates[self.out_pred[lo + hit[0]]], self.nodes[o]))
+                    break
+        return pd.DataFrame(rows, columns=["from", "predicate", "to"])
+
+
+# ---------------- offline check / benchmark ----------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Graph analytics over RDF files")
+    ap.add_argument("inputs", nargs="+")
+    ap.add_argument("--path", nargs=2, metavar=("FROM", "TO"))
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    from kg_store import EmbeddedBackend
+    base = "http://example.org/culturaldifference#"
+    backend = EmbeddedBackend(args.inputs)
+    t = time.perf_counter()
+    ga = GraphAnalytics(skip=(RDF_TYPE, base + "type")).build(backend.select)
+    print(f"{len(ga):,} nodes, {ga.edge_count:,} edges: CSR built in {time.perf_counter() - t:.2f}s "
+          f"({ga.build_seconds:.2f}s after the query)")
+    for name, fn in (("pagerank", ga.pagerank), ("components", ga.components), ("communities", ga.communities)):
+        t = time.perf_counter()
+        fn()
+        print(f"  {name:<12} {(time.perf_counter() - t) * 1000:7.0f} ms")
+    comps, comms = ga.groups(ga.components()), ga.groups(ga.communities())
+    print(f"{len(comps):,} components (largest {comps['size'].iloc[0]:,}), {len(comms):,} communities")
+    print("\nmost central:")
+    for row in ga.top_central(args.top).itertuples():
+        print(f"  {row.pagerank:.5f}  {short_name(row.node):<40} degree {row.degree}")
+    if args.path:
+        a, b = (ga.resolve(x, base) for x in args.path)
+        t = time.perf_counter()
+        path = ga.shortest_path(a, b)
+        print(f"\n{args.path[0]} -> {args.path[1]} ({(time.perf_counter() - t) * 1000:.1f} ms):")
+        if path is None:
+            print("  no path" + (" (unknown / ambiguous name)" if a is None or b is None else ""))
+        else:
+            for row in ga.path_edges(path).itertuples(index=False):
+                print(f"  {short_name(row[0])} --{short_name(row[1])}--> {short_name(row[2])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# kg_cache.py
+"""
+Process-wide SPARQL result cache for app.py
+- key: query text with whitespace collapsed outside string literals, IRIs
+  and comments (so "a  b" and "a b" stay different keys) + dataset generation
+- size-bounded LRU eviction and a per-entry TTL
+- any write to the dataset bumps the generation, so results computed
+  before the write can never be served again
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WS = re.compile(r"\s+")
+# kept verbatim: string literals (long and short forms), IRIs, comments (kg_paging scans with it too)
+VERBATIM = re.compile(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+                       r'|<[^<>"{}|^`\\\x00-\x20]*>|#[^\n]*')
+
+
+def normalize_query(q):
+    out, pos = [], 0
+    for m in VERBATIM.finditer(q):
+        out.append(_WS.sub(" ", q[pos:m.start()]))
+        token = m.group()
+        # a comment runs to the end of its line: keep the line break that ends it
+        out.append(token + "\n" if token.startswith("#") else token)
+        pos = m.end()
+    out.append(_WS.sub(" ", q[pos:]))
+    return "".join(out).strip()
+
+
+class QueryCache:
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (query, generation) -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, q):
+        key = (normalize_query(q), self.generation)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]  # expired
+            self.misses += 1
+            return None
+
+    def put(self, q, value, generation=None):
+        """Store a result; pass the generation read before running the query
+        so a write that landed meanwhile makes this entry unreachable."""
+        gen = self.generation if generation is None else generation
+        key = (normalize_query(q), gen)
+        with self._lock:
+            if gen != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self):
+        """Dataset changed: start a new generation and drop old entries."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            return self.generation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "generation": self.generation,
+        }
@@ -0,0 +1,171 @@
+# kg_client.py
+"""
+HTTP client for the Fuseki endpoints (/query, /update, /data)
+- one requests.Session per process with a keep-alive connection pool of
+  pool_size connections, shared by every Streamlit session and thread
+- idempotent reads (SPARQL queries, GET /data) are retried on connection
+  errors, connect timeouts and 502/503/504 with bounded exponential backoff
+  plus jitter; a read timeout means the server is already working on the
+  query, so it fails at once instead of piling up repeats; updates and
+  uploads are sent exactly once
+- every call is timed per operation (calls, errors, retries, avg / max ms)
+  for the Admin page; the size of the last query response is kept per
+  thread for the query profiler
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = (502, 503, 504)
+
+
+class CallStats:
+    __slots__ = ("calls", "errors", "retries", "total", "max", "last")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+
+class FusekiClient:
+    def __init__(self, base, pool_size=10, retries=3, backoff=0.25, max_backoff=4.0, timeout=60):
+        self.base = base.rstrip("/")
+        self.query_url = f"{self.base}/query"
+        self.update_url = f"{self.base}/update"
+        self.data_url = f"{self.base}/data"
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        # pool_block: threads wait for a free connection instead of opening extras
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ---- metrics ----
+    def _record(self, op, secs, ok, retries):
+        with self._lock:
+            st = self._stats.get(op)
+            if st is None:
+                st = self._stats[op] = CallStats()
+            st.calls += 1
+            st.errors += 0 if ok else 1
+            st.retries += retries
+            st.total += secs
+            st.max = max(st.max, secs)
+            st.last = secs
+
+    def metrics(self):
+        """[{op, calls, errors, retries, avg_ms, max_ms, last_ms}] per operation."""
+        with self._lock:
+            return [{"op": op, "calls": st.calls, "errors": st.errors, "retries": st.retries,
+                     "avg_ms": 1000 * st.total / st.calls if st.calls else 0.0,
+                     "max_ms": 1000 * st.max, "last_ms": 1000 * st.last}
+                    for op, st in sorted(self._stats.items())]
+
+    def reset_metrics(self):
+        with self._lock:
+            self._stats.clear()
+
+    def last_bytes(self):
+        """Body size of this thread's last query response (None before the first one)."""
+        return getattr(self._local, "last_bytes", None)
+
+    # ---- transport ----
+    def _sleep(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+    def request(self, op, method, url, idempotent=False, ok=(200,), **kw):
+        """Timed request; idempotent calls are retried. Raises RuntimeError on failure."""
+        kw.setdefault("timeout", self.timeout)
+        attempts = self.retries + 1 if idempotent else 1
+        t = time.perf_counter()
+        retried = 0
+        try:
+            for attempt in range(attempts):
+                last = attempt == attempts - 1
+                try:
+                    r = self.session.request(method, url, **kw)
+                except requests.ReadTimeout as e:
+                    raise RuntimeError(f"{op} failed: {e}") from e
+                except (requests.ConnectTimeout, requests.ConnectionError) as e:
+                    if last:
+                        raise RuntimeError(f"{op} failed: {e}") from e
+                else:
+                    if r.status_code in ok:
+                        self._record(op, time.perf_counter() - t, True, retried)
+                        return r
+                    if last or r.status_code not in RETRY_STATUS:
+                        raise RuntimeError(f"{op} failed: {r.status_code} - {r.text[:500]}")
+                retried += 1
+                self._sleep(attempt)
+        except RuntimeError:
+            self._record(op, time.perf_counter() - t, False, retried)
+            raise
+
+    # ---- endpoints ----
+    def query_json(self, q, timeout=None):
+        r = self.request("query", "POST", self.query_url, idempotent=True, data={"query": q},
+                         headers={"Accept": "application/sparql-results+json"},
+                         timeout=timeout or self.timeout)
+        self._local.last_bytes = len(r.content)
+        return r.json()
+
+    def query_tsv(self, q, timeout=None):
+        r = self.request("select", "POST", self.query_url, idempotent=True, data={"query": q},
+                         headers={"Accept": "text/tab-separated-values"},
+                         timeout=timeout or self.timeout)
+        self._local.last_bytes = len(r.content)
+        return r.content
+
+    def update(self, q, timeout=None):
+        self.request("update", "POST", self.update_url, data=q.encode("utf-8"),
+                     headers={"Content-Type": "application/sparql-update; charset=utf-8"},
+                     ok=(200, 204), timeout=timeout or self.timeout)
+
+    def get_data(self, accept=None, timeout=None):
+        """Default graph; the server's default syntax unless accept is given."""
+        r = self.request("data_get", "GET", self.data_url, idempotent=True,
+                         headers={"Accept": accept} if accept else None,
+                         timeout=timeout or self.timeout)
+        return r.text
+
+    def download_data(self, fileobj, accept=None, chunk_size=1 << 20, timeout=None):
+        """Stream GET /data into a binary file object -> bytes written.
+
+        Only the connect / first byte is retried; a dump cut off mid-stream raises.
+        """
+        r = self.request("data_get", "GET", self.data_url, idempotent=True, stream=True,
+                         headers={"Accept": accept} if accept else None,
+                         timeout=timeout or self.timeout)
+        written = 0
+        with r:
+            try:
+                for chunk in r.iter_content(chunk_size):
+                    fileobj.write(chunk)
+                    written += len(chunk)
+            except requests.RequestException as e:
+                raise RuntimeError(f"data_get interrupted after {written} bytes: {e}") from e
+        return written
+
+    def post_data(self, data, content_type, timeout=None):
+        self.request("data_post", "POST", self.data_url, data=data,
+                     headers={"Content-Type": content_type}, ok=(200, 201, 204),
+                     timeout=timeout or self.timeout)
+
+    def close(self):
+        self.session.close()
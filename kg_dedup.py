@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# kg_dedup.py
+"""
+Blocked fuzzy matching for entity names (near-duplicate search / dedup)
+
+    python kg_dedup.py entities_extracted.csv --threshold 90 --out sameas_candidates.csv
+    python kg_dedup.py entities_extracted.csv --ttl sameas_candidates.ttl --any-label
+
+- names are only compared inside shared blocks instead of all pairs:
+  one block per normalized token, plus the few rarest character trigrams
+  of each name so a typo in every token still lands in a common block
+- blocks bigger than max_block (stop-word tokens such as "the" or "pakistan")
+  do not generate pairs
+- candidates are scored in batches with token_sort_ratio (same 0-100
+  scale as the Fuzzy Reasoning demo) after a length filter that rejects
+  pairs which cannot reach the threshold
+- pairs above the threshold are merged into clusters (union-find) and
+  written as owl:sameAs candidates with their scores
+"""
+
+import argparse
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+OWL_SAME_AS = "http://www.w3.org/2002/07/owl#sameAs"
+
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    """'Maira_Masood' / 'MASOOD, Maira' -> 'maira masood' (tokens sorted)."""
+    words = _NON_WORD.split(_CAMEL.sub(" ", str(text)).lower())
+    return " ".join(sorted(w for w in words if w))
+
+
+def _trigrams(norm):
+    compact = norm.replace(" ", "")
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def _length_ok(a, b, threshold):
+    # token_sort_ratio <= 200 * shorter / (len_a + len_b)
+    la, lb = len(a), len(b)
+    return la + lb and 200 * min(la, lb) >= threshold * (la + lb)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        root = self.parent.setdefault(x, x)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class FuzzyIndex:
+    """Blocking index over (name, group) entries; group keeps e.g. PERSON apart from ORG."""
+
+    def __init__(self, max_block=200, rare_grams=3):
+        self.max_block = max_block
+        self.rare_grams = rare_grams
+        self.generation = None
+        self.names = []          # distinct (name, group)
+        self.norms = []
+        self.counts = []         # occurrences of each (name, group)
+        self._ids = {}
+        self.blocks = defaultdict(list)
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_fresh(self, generation):
+        return self.generation == generation
+
+    def _keys(self, norm, group, gram_freq):
+        keys = {(group, w) for w in norm.split() if len(w) > 1}
+        grams = sorted(_trigrams(norm), key=lambda g: (gram_freq.get((group, g), 0), g))
+        keys.update((group, "#" + g) for g in grams[:self.rare_grams])
+        return keys
+
+    def build(self, entries, generation=None):
+        """entries: iterable of name or (name, group); repeats are counted once."""
+        ids, names, norms, counts = {}, [], [], []
+        for entry in entries:
+            name, group = (entry, "") if isinstance(entry, str) else (str(entry[0]), entry[1])
+            name = name.strip()
+            if not name:
+                continue
+            i = ids.get((name, group))
+            if i is None:
+                i = ids[(name, group)] = len(names)
+                names.append((name, group))
+                norms.append(normalize(name))
+                counts.append(0)
+            counts[i] += 1
+        gram_freq = Counter((g, t) for (_, g), n in zip(names, norms) for t in _trigrams(n))
+        blocks = defaultdict(list)
+        for i, ((_, group), norm) in enumerate(zip(names, norms)):
+            for key in self._keys(norm, group, gram_freq):
+                blocks[key].append(i)
+        self._ids, self.names, self.norms, self.counts = ids, names, norms, counts
+        self._gram_freq = gram_freq
+        self.blocks = blocks
+        self.generation = generation
+        return self
+
+    # ---- scoring ----
+    def _score_batch(self, norm, candidates, threshold):
+        """[(id, score)] for candidates whose token_sort_ratio >= threshold."""
+        out = []
+        for i in candidates:
+            other = self.norms[i]
+            if other == norm:
+                out.append((i, 100))
+            elif _length_ok(norm, other, threshold):
+                # both sides are normalized and token-sorted once up front:
+                # ratio() here is token_sort_ratio() without per-pair re-processing
+                score = fuzz.ratio(norm, other)
+                if score >= threshold:
+                    out.append((i, score))
+        return out
+
+    # ---- queries ----
+    def similar(self, text, group=None, threshold=70, limit=20):
+        """Entries similar to `text` -> [(name, group, score)], best first.
+
+        group=None searches every group.
+        """
+        norm = normalize(text)
+        if not norm:
+            return []
+        groups = {g for _, g in self.names} if group is None else {group}
+        candidates = set()
+        oversized = []
+        for g in groups:
+            for key in self._keys(norm, g, self._gram_freq):
+                block = self.blocks.get(key, ())
+                if len(block) > self.max_block:
+                    oversized.append(block)
+                else:
+                    candidates.update(block)
+        if not candidates:
+            # only stop-word blocks matched: fall back to them
+            for block in oversized:
+                candidates.update(block)
+        hits = self._score_batch(norm, candidates, threshold)
+        hits.sort(key=lambda h: (-h[1], self.names[h[0]][0]))
+        return [(self.names[i][0], self.names[i][1], s) for i, s in hits[:limit]]
+
+    def pairs(self, threshold=90):
+        """All candidate pairs scoring >= threshold -> {(i, j): score} with i < j."""
+        scored = {}
+        seen = set()
+        for key, block in self.blocks.items():
+            if len(block) < 2 or len(block) > self.max_block:
+                continue
+            for n, i in enumerate(block):
+                todo = [j for j in block[n + 1:] if (i, j) not in seen]
+                seen.update((i, j) for j in todo)
+                for j, score in self._score_batch(self.norms[i], todo, threshold):
+                    scored[(i, j)] = score
+        self.compared = len(seen)
+        return scored
+
+    def clusters(self, threshold=90):
+        """Connected groups of matching names -> list of dicts, largest first.
+
+        Each cluster: members [(name, group, count)], the representative
+        (most frequent, then shortest name) and min/mean pair score.
+        """
+        scored = self.pairs(threshold)
+        uf = _UnionFind()
+        for i, j in scored:
+            uf.union(i, j)
+        members = defaultdict(list)
+        for i in list(uf.parent):
+            members[uf.find(i)].append(i)
+        edge_scores = defaultdict(list)
+        for (i, j), s in scored.items():
+            edge_scores[uf.find(i)].append(s)
+        out = []
+        for root, ids in members.items():
+            ids.sort(key=lambda i: (-self.counts[i], len(self.names[i][0]), self.names[i][0]))
+            scores = edge_scores[root]
+            out.append({
+                "representative": self.names[ids[0]][0],
+                "group": self.names[ids[0]][1],
+                "members": [(self.names[i][0], self.names[i][1], self.counts[i]) for i in ids],
+                "min_score": min(scores),
+                "mean_score": sum(scores) / len(scores),
+            })
+        out.sort(key=lambda c: (-len(c["members"]), c["representative"]))
+        return out
+
+
+# ---------------- offline job ----------------
+def cluster_rows(clusters):
+    """One row per cluster member; the representative links to itself."""
+    from triples_builder import make_uri  # triples_builder imports this module
+    rows = []
+    for cid, c in enumerate(clusters):
+        rep_uri = make_uri(c["representative"])
+        for name, group, count in c["members"]:
+            score = fuzz.ratio(normalize(c["representative"]), normalize(name))
+            rows.append({"cluster": cid, "canonical_uri": rep_uri, "uri": make_uri(name),
+                         "entity_text": name, "label": group, "mentions": count,
+                         "score": score, "cluster_min_score": c["min_score"]})
+    return pd.DataFrame(rows, columns=["cluster", "canonical_uri", "uri", "entity_text", "label",
+                                       "mentions", "score", "cluster_min_score"])
+
+
+def write_sameas_ttl(rows, path):
+    """owl:sameAs candidate per non-canonical member, score as a trailing comment."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("@prefix owl: <http://www.w3.org/2002/07/owl#> .\n\n")
+        for r in rows.itertuples(index=False):
+            if r.uri != r.canonical_uri:
+                f.write(f"<{r.uri}> owl:sameAs <{r.canonical_uri}> .  # score {r.score}\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Find owl:sameAs candidate clusters among entity names")
+    ap.add_argument("csv", help="entities_extracted.csv (entity_text, entity_label)")
+    ap.add_argument("--threshold", type=int, default=90, help="minimum token_sort_ratio (0-100)")
+    ap.add_argument("--max-block", type=int, default=200, help="skip blocks larger than this")
+    ap.add_argument("--any-label", action="store_true", help="also match across NER labels")
+    ap.add_argument("--out", default="sameas_candidates.csv")
+    ap.add_argument("--ttl", help="also write owl:sameAs candidates as Turtle")
+    args = ap.parse_args(argv)
+
+    df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    label_col = "entity_label" if "entity_label" in df else "label"
+    groups = [""] * len(df) if args.any_label else df[label_col]
+    t = time.perf_counter()
+    index = FuzzyIndex(max_block=args.max_block).build(zip(df["entity_text"], groups))
+    clusters = index.clusters(args.threshold)
+    secs = time.perf_counter() - t
+    rows = cluster_rows(clusters)
+    rows.to_csv(args.out, index=False)
+    if args.ttl:
+        write_sameas_ttl(rows, args.ttl)
+    n = len(index)
+    print(f"{len(df)} rows, {n} distinct names, {len(index.blocks)} blocks")
+    print(f"compared {index.compared:,} pairs instead of {n * (n - 1) // 2:,} "
+          f"({secs:.1f}s) -> {len(clusters)} clusters, {len(rows)} names -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
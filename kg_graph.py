@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# kg_graph.py
+"""
+k-hop entity neighbourhoods for the Analyze Entity graph view
+
+    python kg_graph.py cultural_difference_properties.ttl culturaldifference_enriched.ttl --entity Sindhi_Culture --hops 2
+
+- neighborhood(): expands one hop at a time; each hop is one SELECT over
+  the frontier kept so far, a UNION of one sub-SELECT per anchor sampled
+  server-side by a hash of the edge with its own LIMIT max_degree, so a hub
+  ships max_degree edges, not thousands, and cannot use up the other
+  anchors' share; a 3-hop view is three small queries instead of one long
+  path join; class membership links are shown but not walked through, so
+  class nodes end a path instead of exploding it; only ends the store
+  reports as IRIs (isIRI) are walked, never a literal that looks like a URL
+- sample_ring(): drops edges already kept at a nearer hop and re-applies
+  the per-anchor cap; ties broken by a stable hash, so the same entity
+  always shows the same sample (and layout) in every session; only nodes
+  kept at hop h are expanded at hop h + 1
+- Neighborhood: columnar nodes / edges frames -> networkx graph, a radial
+  layout (hop rings, each subtree in its own angular sector; no scipy needed)
+  and PyVis HTML generated in memory with fixed positions, physics off
+"""
+
+import argparse
+import math
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from kg_loader import nt_iri
+from kg_terms import short_name
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+MAX_HOPS = 3
+HOP_COLORS = ["#e4572e", "#4c78a8", "#72b7b2", "#b279a2"]
+RING_GAP = 220       # px between hop rings
+NODE_SPACING = 28    # px of arc per node on crowded rings
+
+
+def hop_query(anchors, max_degree=25):
+    """SELECT ?s ?p ?o ?anchor ?iri: a hash-ordered sample of the edges touching `anchors` (full IRIs).
+
+    One sub-SELECT per anchor with its own LIMIT, so every anchor gets up to
+    max_degree edges; ?iri says whether the far end is an IRI (walkable).
+    """
+    branches = []
+    for anchor in anchors:
+        a = nt_iri(anchor)
+        branches.append(f"  {{ SELECT ?s ?p ?o ?anchor ?iri WHERE {{\n"
+                        f"      {{ {a} ?p ?o BIND({a} AS ?s) BIND(isIRI(?o) AS ?iri) }}\n"
+                        f"      UNION {{ ?s ?p {a} BIND({a} AS ?o) BIND(isIRI(?s) AS ?iri) }}\n"
+                        f"      BIND({a} AS ?anchor)\n"
+                        f"    }} ORDER BY MD5(CONCAT(STR(?s), STR(?p), STR(?o))) LIMIT {max_degree} }}")
+    return "SELECT ?s ?p ?o ?anchor ?iri WHERE {\n" + "\n  UNION\n".join(branches) + "\n}"
+
+
+def sample_ring(df, hop, max_degree=25, seen=None):
+    """hop_query rows -> kept edges (s, p, o, hop, anchor, iri), at most max_degree per anchor.
+
+    Rows are expected as strings (IRIs unwrapped, as the backends return
+    them; ?iri as "true" / "false" or a bool). Edges already kept at a nearer
+    hop (keys in `seen`, updated in place) are dropped.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=["s", "p", "o", "hop", "anchor", "iri"])
+    df = df[["s", "p", "o", "anchor", "iri"]].drop_duplicates(["s", "p", "o"])
+    df = df.assign(iri=df["iri"].astype(str).str.lower().isin(("true", "1")))
+    if seen:
+        df = df[[k not in seen for k in zip(df["s"], df["p"], df["o"])]]
+    # stable pseudo-random order: the same edges win the cap every time
+    df = df.assign(hop=hop, _h=pd.util.hash_pandas_object(df[["s", "p", "o"]], index=False).to_numpy())
+    df = df.sort_values(["anchor", "_h"], kind="stable")
+    df = df[df.groupby("anchor").cumcount() < max_degree]
+    if seen is not None:
+        seen.update(zip(df["s"], df["p"], df["o"]))
+    out = df[["s", "p", "o", "hop", "anchor", "iri"]].reset_index(drop=True)
+    return out.astype({"s": object, "p": object, "o": object, "anchor": object, "iri": bool})
+
+
+class Neighborhood:
+    """Sampled k-hop neighbourhood; nodes carry hop distance, parent and layout position."""
+
+    def __init__(self, center, edges):
+        self.center = center
+        self.edges = edges
+        self.nodes = self._nodes()
+        self.pos = None
+
+    def _nodes(self):
+        e = self.edges
+        if e.empty:
+            return pd.DataFrame({"id": [self.center], "hop": [0], "parent": [None]})
+        # each node hangs off the anchor of the first (nearest) edge that reached it
+        other = np.where(e["s"].to_numpy() == e["anchor"].to_numpy(), e["o"].to_numpy(), e["s"].to_numpy())
+        found = pd.DataFrame({"id": other, "hop": e["hop"].to_numpy(), "parent": e["anchor"].to_numpy()})
+        found = found[found["id"] != self.center].drop_duplicates("id")
+        head = pd.DataFrame({"id": [self.center], "hop": [0], "parent": [None]})
+        return pd.concat([head, found], ignore_index=True)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def graph(self):
+        """nx.DiGraph; parallel predicates between two nodes become one edge titled 'p1, p2'."""
+        e = self.edges.assign(title=[short_name(p) for p in self.edges["p"]])
+        merged = e.groupby(["s", "o"], sort=False)["title"].agg(", ".join).reset_index()
+        G = nx.from_pandas_edgelist(merged, "s", "o", edge_attr="title", create_using=nx.DiGraph)
+        G.add_node(self.center)
+        nx.set_node_attributes(G, dict(zip(self.nodes["id"], self.nodes["hop"].astype(int))), "hop")
+        return G
+
+    def layout(self):
+        """{node: (x, y)}: hop rings, each node's subtree in a sector sized by its leaf count."""
+        if self.pos is not None:
+            return self.pos
+        ids = self.nodes["id"].tolist()
+        hop = dict(zip(ids, self.nodes["hop"].astype(int)))
+        children = {}
+        for node, parent in zip(ids[1:], self.nodes["parent"].tolist()[1:]):
+            children.setdefault(parent, []).append(node)
+        leaves = {}
+        for node in sorted(ids, key=lambda n: -hop[n]):  # deepest first
+            leaves[node] = sum(leaves[c] for c in children.get(node, ())) or 1
+        ring_sizes = self.nodes["hop"].value_counts().to_dict()
+        radius = [0.0]
+        for h in range(1, int(self.nodes["hop"].max()) + 1):
+            radius.append(max(radius[-1] + RING_GAP, ring_sizes.get(h, 0) * NODE_SPACING / (2 * math.pi)))
+        pos = {self.center: (0.0, 0.0)}
+        stack = [(self.center, 0.0, 2 * math.pi)]
+        while stack:
+            node, start, span = stack.pop()
+            kids = sorted(children.get(node, ()))
+            total = sum(leaves[c] for c in kids)
+            for c in kids:
+                width = span * leaves[c] / total
+                angle = start + width / 2
+                r = radius[hop[c]]
+                pos[c] = (r * math.cos(angle), r * math.sin(angle))
+                stack.append((c, start, width))
+                start += width
+        self.pos = pos
+        return pos
+
+    def html(self, dark=False, height="600px"):
+        """Self-contained PyVis page (vis-network from its CDN, as before); nothing written to disk."""
+        from pyvis.network import Network
+        font = "white" if dark else "black"
+        net = Network(height=height, width="100%", directed=True, cdn_resources="remote",
+                      bgcolor="#0b1220" if dark else "#ffffff", font_color=font)
+        pos = self.layout()
+        # nodes / edges appended as dicts: Network.add_node/add_edge scan lists per call
+        for node, h in zip(self.nodes["id"], self.nodes["hop"].astype(int)):
+            x, y = pos[node]
+            label = short_name(node)
+            net.nodes.append({"id": node, "label": label if len(label) <= 40 else label[:37] + "...",
+                              "title": node, "shape": "dot", "size": 22 if h == 0 else 14 - 2 * min(h, 3),
+                              "color": HOP_COLORS[min(h, len(HOP_COLORS) - 1)],
+                              "x": round(x, 1), "y": round(y, 1), "font": {"color": font}})
+            net.node_ids.append(node)
+        G = self.graph()
+        for s, o, title in G.edges(data="title"):
+            net.edges.append({"from": s, "to": o, "title": title, "arrows": "to"})
+        net.toggle_physics(False)
+        return net.generate_html()
+
+
+def neighborhood(select, center, hops=2, max_degree=25, skip=(RDF_TYPE,)):
+    """select(query) -> DataFrame; `center` is a full IRI. Returns a Neighborhood.
+
+    One hop_query per hop over the IRIs first reached at the previous hop;
+    edges with a predicate in `skip` (class membership) are kept but not
+    walked through.
+    """
+    hops = max(1, min(int(hops), MAX_HOPS))
+    frontier, reached, seen, rings = [center], {center}, set(), []
+    for h in range(1, hops + 1):
+        ring = sample_ring(select(hop_query(frontier, max_degree)), h, max_degree, seen)
+        rings.append(ring)
+        s, o, anchor = ring["s"].to_numpy(), ring["o"].to_numpy(), ring["anchor"].to_numpy()
+        other = np.where(s == anchor, o, s)
+        walk = other[ring["iri"].to_numpy(dtype=bool) & ~ring["p"].isin(skip).to_numpy()]
+        frontier = sorted({n for n in walk if n not in reached})
+        reached.update(other)
+        if not frontier:
+            break
+    edges = pd.concat(rings, ignore_index=True)
+    return Neighborhood(center, edges.astype({"hop": int}))
+
+
+# ---------------- benchmark ----------------
+def _old_view(select, center):
+    """What the page did before: one hop out, iterrows, force-directed PyVis page."""
+    from pyvis.network import Network
+    df = select(f"SELECT ?predicate ?object WHERE {{ <{center}> ?predicate ?object }} LIMIT 500")
+    G = nx.DiGraph()
+    G.add_node(short_name(center))
+    for _, row in df.iterrows():
+        obj = short_name(row["object"])
+        G.add_node(obj, title=obj)
+        G.add_edge(short_name(center), obj, title=short_name(row["predicate"]))
+    net = Network(height="600px", width="100%", directed=True)
+    net.from_nx(G)
+    net.barnes_hut()
+    return len(G), net.generate_html()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="k-hop neighbourhood extraction / rendering benchmark")
+    ap.add_argument("inputs", nargs="+")
+    ap.add_argument("--entity", action="append", default=[], help="local name or IRI")
+    ap.add_argument("--hops", type=int, default=2)
+    ap.add_argument("--max-degree", type=int, default=25)
+    ap.add_argument("--html", help="write the last rendered page here")
+    args = ap.parse_args(argv)
+
+    from kg_store import EmbeddedBackend
+    backend = EmbeddedBackend(args.inputs)
+    skip = (RDF_TYPE, "http://example.org/culturaldifference#type")
+    html = None
+    for name in args.entity or ["Sindhi_Culture"]:
+        iri = name if "://" in name else "http://example.org/culturaldifference#" + name
+        queries = []
+
+        def select(q):
+            t_q = time.perf_counter()
+            df = backend.select(q)
+            queries.append((len(df), time.perf_counter() - t_q))
+            return df
+
+        t = time.perf_counter()
+        nb = neighborhood(select, iri, args.hops, args.max_degree, skip)
+        t_fetch = time.perf_counter() - t
+        nb.layout()
+        t_layout = time.perf_counter() - t - t_fetch
+        html = nb.html()
+        t_total = time.perf_counter() - t
+        t_query = sum(sec for _, sec in queries)
+        print(f"{name}: {sum(n for n, _ in queries):,} rows -> {len(nb):,} nodes / {len(nb.edges):,} edges "
+              f"(hops {args.hops}, cap {args.max_degree})")
+        print("  queries " + " + ".join(f"{sec * 1000:.0f}" for _, sec in queries) + " ms, "
+              f"sample {(t_fetch - t_query) * 1000:.0f} ms, layout {t_layout * 1000:.0f} ms, "
+              f"html {(t_total - t_fetch - t_layout) * 1000:.0f} ms, total {t_total * 1000:.0f} ms; "
+              f"cached render {_timed_html(nb) * 1000:.0f} ms")
+        t = time.perf_counter()
+        n_old, _ = _old_view(backend.select, iri)
+        print(f"  before: 1 hop, {n_old} nodes, {(time.perf_counter() - t) * 1000:.0f} ms")
+    if args.html and html:
+        with open(args.html, "w", encoding="utf-8") as f:
+            f.write(html)
+    return 0
+
+
+def _timed_html(nb):
+    t = time.perf_counter()
+    nb.html()
+    return time.perf_counter() - t
+
+
+if __name__ == "__main__":
+    sys.exit(main())
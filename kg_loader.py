@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# kg_loader.py
+"""
+Streaming bulk loader: entities_extracted.csv / triples.csv -> triple store
+
+    python kg_loader.py entities_extracted.csv
+    python kg_loader.py triples.csv --batch-size 20000
+    python kg_loader.py entities_extracted.csv --out entities.nt   # no server
+
+- triples.csv is read in chunks (pandas chunksize) and turned into
+  N-Triples lazily
+- entity CSVs (entities.csv / entities_extracted.csv) go through the same
+  resolution as the Phase 2 triple builder, so the loaded subjects are the
+  canonical cluster URIs, not one per row; it takes two streaming passes:
+  the first counts distinct spellings per label and resolves them to a
+  key -> URI map, the second streams the mentions through that map for
+  ex:mentionedIn (only the distinct spellings and entity / page pairs are
+  held, never the mentions)
+- pushes fixed-size N-Triples batches to the Fuseki graph store (/data)
+  from a sender thread; the bounded queue between reader and sender is the
+  backpressure, so memory stays flat whatever the CSV size
+- after every acknowledged batch the number of CSV rows done is written to
+  a checkpoint file with the CSV's size / mtime and the --fuzzy threshold;
+  re-running the same command resumes from there, a changed CSV or
+  threshold is refused (--restart starts over)
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from kg_client import FusekiClient
+from triples_builder import build_resolved_triples, mention_keys, resolve_spellings, ONTOLOGY
+
+FUSEKI_BASE = os.environ.get("FUSEKI_BASE", "http://localhost:3030/culture_difference")
+
+PREFIXES = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "ex": ONTOLOGY,
+}
+
+
+# ---------------- N-Triples terms ----------------
+_IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+_LIT_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"}
+_LIT_UNSAFE = re.compile(r'[\\"\n\r]')
+
+
+def nt_iri(iri):
+    return "<" + _IRI_UNSAFE.sub(lambda m: "%%%02X" % ord(m.group()), iri) + ">"
+
+
+def nt_literal(text):
+    return '"' + _LIT_UNSAFE.sub(lambda m: _LIT_ESCAPES[m.group()], text) + '"'
+
+
+def nt_term(value):
+    """triples.csv cell -> N-Triples term ("quoted" literal, prefix:name or IRI)."""
+    value = str(value)
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return nt_literal(value[1:-1])
+    prefix, sep, local = value.partition(":")
+    if sep and prefix in PREFIXES:
+        return nt_iri(PREFIXES[prefix] + local)
+    return nt_iri(value)
+
+
+# ---------------- row -> triples (lazy) ----------------
+def triple_rows(chunk):
+    for s, p, o in zip(chunk["subject"], chunk["predicate"], chunk["object"]):
+        yield [f"{nt_term(s)} {nt_term(p)} {nt_term(o)} ."]
+
+
+def resolved_frames(path, header, chunksize=10000, fuzzy_threshold=None):
+    """Entity CSV -> frames of resolved triples, in two passes over the file.
+
+    Entity triples (type, label, altLabels) come first, then one
+    ex:mentionedIn per distinct entity / source page pair in file order.
+    """
+    label = "entity_label" if "entity_label" in header else "label"
+
+    def chunks(cols):
+        for chunk in pd.read_csv(path, usecols=cols, chunksize=chunksize):
+            yield chunk.rename(columns={"label": "entity_label"})
+
+    spellings = Counter()
+    for chunk in chunks(["entity_text", label]):
+        text, labels, key = mention_keys(chunk)
+        spellings.update(zip(labels, key, text))
+    entities, uris = resolve_spellings(spellings, fuzzy_threshold)
+    yield build_resolved_triples(entities)
+    if "source_url" not in header:
+        return
+    seen = set()
+    for chunk in chunks(["entity_text", label, "source_url"]):
+        text, labels, key = mention_keys(chunk)
+        src = pd.DataFrame({"subject": [uris[lk] for lk in zip(labels, key)],
+                            "source_url": chunk["source_url"].to_numpy()}).dropna().drop_duplicates()
+        pairs = [pair for pair in zip(src["subject"], src["source_url"].map(str)) if pair not in seen]
+        seen.update(pairs)
+        yield pd.DataFrame(pairs, columns=["subject", "object"]).assign(predicate="ex:mentionedIn")
+
+
+def resolved_chunks(path, header, chunksize=10000, start_row=0, fuzzy_threshold=None):
+    """Entity CSV -> chunks of resolved triples (subject/predicate/object), skipping start_row triples.
+
+    With an entity CSV a "row" is one resolved triple, so checkpoints count those.
+    """
+    skip = start_row
+    for frame in resolved_frames(path, header, chunksize, fuzzy_threshold):
+        if skip >= len(frame):
+            skip -= len(frame)
+            continue
+        frame, skip = frame.iloc[skip:], 0
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+
+
+def iter_rows(path, chunksize=10000, start_row=0, fuzzy_threshold=None):
+    """Yield the N-Triples lines of each CSV row, skipping rows already loaded."""
+    header = pd.read_csv(path, nrows=0).columns
+    if {"subject", "predicate", "object"}.issubset(header):
+        reader = pd.read_csv(path, chunksize=chunksize, skiprows=range(1, start_row + 1))
+    elif "entity_text" in header:
+        reader = resolved_chunks(path, header, chunksize, start_row, fuzzy_threshold)
+    else:
+        raise ValueError(f"{path}: expected subject/predicate/object or entity_text columns")
+    for chunk in reader:
+        yield from triple_rows(chunk)
+
+
+def iter_batches(rows, batch_size, start_row=0):
+    """Group row lines into batches of >= batch_size triples, cut at row boundaries.
+
+    Yields (rows_done_after_batch, lines).
+    """
+    buf = []
+    done = start_row
+    for lines in rows:
+        buf.extend(lines)
+        done += 1
+        if len(buf) >= batch_size:
+            yield done, buf
+            buf = []
+    if buf:
+        yield done, buf
+
+
+# ---------------- checkpoints ----------------
+def source_params(source, fuzzy_threshold=None):
+    """What a checkpoint's row count is only valid for: the CSV as it was and the resolution settings."""
+    st = os.stat(source)
+    return {"size": st.st_size, "mtime": st.st_mtime, "fuzzy": fuzzy_threshold}
+
+
+def read_checkpoint(path, source, params=None):
+    """-> (rows_done, triples_done); ValueError if it was written for another CSV version or --fuzzy."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            ck = json.load(f)
+    except (OSError, ValueError):
+        return 0, 0
+    if ck.get("source") != os.path.abspath(source):
+        return 0, 0
+    if params is not None and ck.get("params") != params:
+        raise ValueError(f"checkpoint {path} was written for {ck.get('params')}, not {params}; "
+                         f"rerun with --restart")
+    return int(ck.get("rows_done", 0)), int(ck.get("triples_done", 0))
+
+
+def write_checkpoint(path, source, rows_done, triples_done, params=None):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(source), "params": params, "rows_done": rows_done,
+                   "triples_done": triples_done, "ts": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+    os.replace(tmp, path)
+
+
+# ---------------- sinks ----------------
+class GraphStoreSink:
+    """POST N-Triples batches to a SPARQL graph store endpoint over a FusekiClient connection.
+
+    The client sends each POST once (retries=0): load() retries a failed
+    batch itself, with a longer backoff, and only advances the checkpoint
+    once a batch is stored. Re-posting ground triples is harmless, which is
+    why the loader may retry what the app's client treats as non-idempotent.
+    """
+
+    def __init__(self, endpoint, timeout=120):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.client = FusekiClient(endpoint, pool_size=1, retries=0, timeout=timeout)
+
+    def send(self, lines):
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+        # the endpoint is the graph store URL itself (it may carry ?graph=...), not a dataset base
+        self.client.request("data_post", "POST", self.endpoint, data=body, ok=(200, 201, 204),
+                            headers={"Content-Type": "application/n-triples"})
+
+    def close(self):
+        self.client.close()
+
+
+class FileSink:
+    """Append batches to a local .nt file (dry runs, Admin import later)."""
+
+    def __init__(self, path):
+        self.f = open(path, "a", encoding="utf-8")
+
+    def send(self, lines):
+        self.f.write("\n".join(lines) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+# ---------------- loader ----------------
+def load(path, sink, batch_size=10000, chunksize=20000, queue_depth=4,
+         retries=5, checkpoint=None, log=print, fuzzy_threshold=None):
+    """Stream `path` into `sink`; returns (rows_done, triples_loaded_this_run, seconds)."""
+    checkpoint = checkpoint or path + ".ckpt"
+    params = source_params(path, fuzzy_threshold)
+    rows_done, triples_done = read_checkpoint(checkpoint, path, params)
+    if rows_done:
+        log(f"Resuming {path} after row {rows_done} ({triples_done} triples already loaded)")
+
+    batches = queue.Queue(maxsize=queue_depth)
+    failure = []
+    progress = {"rows": rows_done, "triples": triples_done}
+    t0 = time.perf_counter()
+
+    def sender():
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            rows_after, lines = item
+            for attempt in range(retries + 1):
+                try:
+                    sink.send(lines)
+                    break
+                except Exception as e:
+                    if attempt == retries:
+                        failure.append(e)
+                        return
+                    time.sleep(min(2 ** attempt * 0.5, 30))
+            progress["rows"] = rows_after
+            progress["triples"] += len(lines)
+            write_checkpoint(checkpoint, path, progress["rows"], progress["triples"], params)
+            new = progress["triples"] - triples_done
+            elapsed = time.perf_counter() - t0
+            log(f"  rows {progress['rows']:>9}  triples {progress['triples']:>10}  "
+                f"{new / elapsed if elapsed else 0:,.0f} triples/s")
+
+    def put(item):
+        # blocks while the sender is queue_depth batches behind; gives up once it has failed
+        while not failure:
+            try:
+                batches.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    worker = threading.Thread(target=sender, daemon=True)
+    worker.start()
+    rows = iter_rows(path, chunksize, rows_done, fuzzy_threshold)
+    for item in iter_batches(rows, batch_size, rows_done):
+        if not put(item):
+            break
+    put(None)  # end-of-stream sentinel, same failure check as the batches
+    worker.join()
+    elapsed = time.perf_counter() - t0
+    if failure:
+        raise RuntimeError(f"batch failed after {retries} retries at row {progress['rows']} "
+                           f"(checkpoint {checkpoint}): {failure[0]}")
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)  # finished: next run starts from the top
+    return progress["rows"], progress["triples"] - triples_done, elapsed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream entities/triples CSV into the triple store")
+    ap.add_argument("csv", help="entities_extracted.csv, entities.csv or triples.csv")
+    ap.add_argument("--endpoint", default=f"{FUSEKI_BASE}/data", help="graph store endpoint (default: %(default)s)")
+    ap.add_argument("--out", help="write N-Triples to this file instead of posting to the endpoint")
+    ap.add_argument("--batch-size", type=int, default=10000, help="triples per request")
+    ap.add_argument("--chunksize", type=int, default=20000, help="CSV rows read at a time")
+    ap.add_argument("--queue-depth", type=int, default=4, help="batches buffered ahead of the sender")
+    ap.add_argument("--retries", type=int, default=5)
+    ap.add_argument("--checkpoint", help="checkpoint file (default: <csv>.ckpt)")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    ap.add_argument("--fuzzy", type=int, help="entity CSVs: also merge near-identical spellings (e.g. 95)")
+    args = ap.parse_args(argv)
+
+    checkpoint = args.checkpoint or args.csv + ".ckpt"
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    sink = FileSink(args.out) if args.out else GraphStoreSink(args.endpoint)
+    try:
+        rows, triples, secs = load(args.csv, sink, args.batch_size, args.chunksize,
+                                   args.queue_depth, args.retries, checkpoint, fuzzy_threshold=args.fuzzy)
+    except RuntimeError as e:
+        print(f"Load interrupted: {e}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"Cannot load: {e}", file=sys.stderr)
+        return 1
+    finally:
+        sink.close()
+    print(f"Loaded {triples} triples ({rows} rows done) in {secs:.1f}s "
+          f"({triples / secs if secs else 0:,.0f} triples/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
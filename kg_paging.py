@@ -0,0 +1,130 @@
+# kg_paging.py
+"""
+Page-by-page SELECT execution for the SPARQL Explorer
+- the user's trailing LIMIT / OFFSET is split off and re-applied on top of
+  the page window, so "LIMIT 50" still returns at most 50 rows and a query
+  without LIMIT is never fetched in one piece; trailing comments and
+  whitespace are ignored when looking for it (strings, IRIs and comments
+  are scanned as tokens, as kg_cache.normalize_query does)
+- pages are only guaranteed disjoint when the query has an outer ORDER BY;
+  PagedQuery.ordered says whether it has one, so the page can warn
+- each page asks for one extra row to know whether another page exists
+- export_csv writes page after page into a file object (header once), so
+  the full result never sits in memory as one DataFrame
+- queries that are not SELECT (ASK / CONSTRUCT / DESCRIBE) are left alone
+"""
+
+import re
+
+from kg_cache import VERBATIM
+
+_TAIL = re.compile(r"(?:\s+(?:LIMIT|OFFSET)\s+\d+)+\s*$", re.I)
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)", re.I)
+_OFFSET = re.compile(r"\bOFFSET\s+(\d+)", re.I)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\b", re.I)
+_PROLOGUE = re.compile(r"^\s*(?:#[^\n]*\n|(?:PREFIX\s+\S*\s*<[^>]*>|BASE\s+<[^>]*>)\s*)*", re.I)
+
+
+def is_select(query):
+    return _PROLOGUE.sub("", query, count=1).lstrip().upper().startswith("SELECT")
+
+
+def _code(query):
+    """(query without trailing comments / whitespace, same text with strings, IRIs and comments blanked)."""
+    end, pos, blanked = 0, 0, []
+    for m in VERBATIM.finditer(query):
+        gap = query[pos:m.start()]
+        blanked.append(gap)
+        if gap.strip():
+            end = pos + len(gap.rstrip())
+        if not m.group().startswith("#"):
+            end = m.end()
+        blanked.append(" " * len(m.group()))
+        pos = m.end()
+    gap = query[pos:]
+    blanked.append(gap)
+    if gap.strip():
+        end = pos + len(gap.rstrip())
+    return query[:end], "".join(blanked)[:end]
+
+
+def split_limit(query):
+    """'... LIMIT 50 OFFSET 10 # note' -> ('...', 50, 10); missing parts are None / 0."""
+    query, code = _code(query)
+    m = _TAIL.search(code)
+    if not m:
+        return query.rstrip(), None, 0
+    tail = m.group()
+    limit = _LIMIT.search(tail)
+    offset = _OFFSET.search(tail)
+    return (query[:m.start()].rstrip(),
+            int(limit.group(1)) if limit else None,
+            int(offset.group(1)) if offset else 0)
+
+
+def has_order_by(query):
+    """True when the outer query (after its last '}') has an ORDER BY."""
+    code = _code(query)[1]
+    return bool(_ORDER_BY.search(code, code.rfind("}") + 1))
+
+
+class PagedQuery:
+    """Cursor over a SELECT: fetch_page() returns the next DataFrame page.
+
+    select(query) -> DataFrame with every projected column (raises on error).
+    """
+
+    def __init__(self, query, select, page_size=500, max_rows=10000):
+        self.base, self.user_limit, self.user_offset = split_limit(query)
+        self.ordered = has_order_by(self.base)
+        self.select = select
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.fetched = 0
+        self.has_more = self.user_limit != 0
+
+    @property
+    def capped(self):
+        """True when more rows exist but max_rows stops further pages."""
+        return self.has_more and self.fetched >= self.max_rows
+
+    def _window(self):
+        want = self.page_size
+        if self.user_limit is not None:
+            want = min(want, self.user_limit - self.fetched)
+        return max(0, min(want, self.max_rows - self.fetched))
+
+    def fetch_page(self):
+        want = self._window()
+        if not self.has_more or want <= 0:
+            return None
+        offset = self.user_offset + self.fetched
+        df = self.select(f"{self.base}\nLIMIT {want + 1} OFFSET {offset}")
+        more = len(df) > want
+        df = df.iloc[:want]
+        self.fetched += len(df)
+        reached_user_limit = self.user_limit is not None and self.fetched >= self.user_limit
+        self.has_more = more and not reached_user_limit
+        return df
+
+    def pages(self):
+        while True:
+            df = self.fetch_page()
+            if df is None:
+                return
+            yield df
+            if df.empty or not self.has_more:
+                return
+
+
+def export_csv(query, select, fileobj, page_size=5000, max_rows=1000000):
+    """Stream every page of `query` into a text file object as CSV.
+
+    Returns (rows_written, capped); capped means max_rows cut the export short.
+    """
+    cursor = PagedQuery(query, select, page_size, max_rows)
+    rows = 0
+    for df in cursor.pages():
+        df.to_csv(fileobj, index=False, header=rows == 0)
+        rows += len(df)
+    return rows, cursor.capped
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# kg_profiler.py
+"""
+Query profiler and slow-query log for app.py
+
+    python kg_profiler.py query_log.jsonl            # p50 / p95 / p99 per query shape
+    python kg_profiler.py query_log.jsonl --slow 20  # the 20 slowest calls
+
+- one JSON line per SELECT / UPDATE: wall time, rows, bytes (response body
+  for Fuseki reads, request body for updates, null in process), cache hit /
+  miss / off, error, and the normalized query shape with its short hash
+- query_shape(): PREFIX lines and comments dropped, IRIs, literals, numbers
+  and capitalised prefixed names (individuals and classes in this ontology;
+  predicates are lowerCamel) replaced by ?, whitespace collapsed, so every
+  Analyze Entity lookup shares one shape whatever the entity; bulk
+  INSERT DATA collapses to one shape whatever its size
+- calls at or above slow_ms are also appended, with the query text (cut to
+  max_query_chars: a bulk INSERT DATA can be megabytes), to the slow-query log
+- lines are buffered and appended every flush_every calls / flush_secs
+  seconds outside the aggregation lock, so a cache hit costs no file I/O;
+  once a log passes max_log_bytes it is rotated to <path>.1
+- percentiles come from an in-memory window of the latest calls per shape;
+  the JSONL file is the durable record (summarize() reads it back)
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+_PREFIX = re.compile(r"^\s*(PREFIX|BASE)\b[^\n]*$", re.I | re.M)
+_COMMENT = re.compile(r"(?m)#[^\n<>\"']*$")
+_IRI = re.compile(r"<[^<>\s]*>")
+_STRING = re.compile(r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+_TAGGED = re.compile(r"\?(@[A-Za-z0-9-]+|\^\^\S+)")
+_INDIVIDUAL = re.compile(r"(?<![\w?$])([A-Za-z][\w-]*)?:[A-Z0-9][\w.-]*\w|(?<![\w?$]):[A-Z0-9]\w*")
+_NUMBER = re.compile(r"(?<![\w?$:.-])[+-]?\d+(\.\d+)?([eE][+-]?\d+)?\b")
+_WS = re.compile(r"\s+")
+# bulk INSERT DATA: n triples / n blocks are one shape whatever n is
+_TRIPLES = re.compile(r"(\? \? \? \.)(?: \? \? \? \.)+")
+_BLOCKS = re.compile(r"((?:INSERT|DELETE) DATA \{[^{}]*\})(?: ; (?:INSERT|DELETE) DATA \{[^{}]*\})+", re.I)
+
+
+def query_shape(q):
+    """SPARQL text -> normalized shape (constants replaced by ?)."""
+    s = _PREFIX.sub(" ", q)
+    s = _STRING.sub("?", s)
+    s = _IRI.sub("?", s)
+    s = _COMMENT.sub(" ", s)
+    s = _TAGGED.sub("?", s)
+    s = _INDIVIDUAL.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _WS.sub(" ", s).strip()
+    return _BLOCKS.sub(r"\1 ; ...", _TRIPLES.sub(r"\1 ...", s))
+
+
+def shape_id(shape):
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:10]
+
+
+def clip(text, limit):
+    """Cut text to limit characters, saying how much was dropped."""
+    if limit is None or len(text) <= limit:
+        return text
+    return f"{text[:limit]} ... [{len(text) - limit} more chars]"
+
+
+class QueryProfiler:
+    def __init__(self, path="query_log.jsonl", slow_path="slow_queries.jsonl", slow_ms=1000,
+                 window=2000, slow_keep=200, max_query_chars=4000, max_log_bytes=64 * 1024 * 1024,
+                 flush_every=100, flush_secs=2.0):
+        self.path = path
+        self.slow_path = slow_path
+        self.slow_ms = slow_ms
+        self.window = window
+        self.max_query_chars = max_query_chars
+        self.max_log_bytes = max_log_bytes
+        self.flush_every = flush_every
+        self.flush_secs = flush_secs
+        self._shapes = {}          # shape id -> {"shape", "kind", "ms": deque, counters}
+        self._slow = deque(maxlen=slow_keep)
+        self._lock = threading.Lock()
+        self._pending = {}         # log path -> JSON lines not yet written
+        self._flushed = time.time()
+        self._io_lock = threading.Lock()
+        self.started = time.time()
+        atexit.register(self.flush)
+
+    def record(self, kind, query, seconds, rows=None, nbytes=None, cache="off", error=None):
+        """Log one call; never raises (a full disk must not break the page)."""
+        shape = query_shape(query)
+        sid = shape_id(shape)
+        ms = seconds * 1000
+        entry = {"ts": time.strftime("%Y-%m-%d %H:%M:%S"), "kind": kind, "shape_id": sid,
+                 "ms": round(ms, 2), "rows": rows, "bytes": nbytes, "cache": cache,
+                 "ok": error is None, "error": str(error)[:300] if error is not None else None,
+                 "shape": shape[:500]}
+        slow = ms >= self.slow_ms
+        if slow:
+            slow_entry = dict(entry, query=clip(query, self.max_query_chars))
+        with self._lock:
+            agg = self._shapes.get(sid)
+            if agg is None:
+                agg = self._shapes[sid] = {"shape": shape, "kind": kind, "ms": deque(maxlen=self.window),
+                                           "calls": 0, "errors": 0, "hits": 0, "rows": 0, "bytes": 0}
+            agg["ms"].append(ms)
+            agg["calls"] += 1
+            agg["errors"] += error is not None
+            agg["hits"] += cache == "hit"
+            agg["rows"] += rows or 0
+            agg["bytes"] += nbytes or 0
+            if slow:
+                self._slow.append(slow_entry)
+            if self.path:
+                self._pending.setdefault(self.path, []).append(json.dumps(entry))
+            if slow and self.slow_path:
+                self._pending.setdefault(self.slow_path, []).append(json.dumps(slow_entry))
+            due = (sum(map(len, self._pending.values())) >= self.flush_every
+                   or time.time() - self._flushed >= self.flush_secs)
+        if due:
+            self.flush()
+        return entry
+
+    # ---- log files ----
+    def flush(self):
+        """Append the buffered lines; rotate a log to <path>.1 once it passes max_log_bytes."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.time()
+        with self._io_lock:
+            for path, lines in pending.items():
+                try:
+                    if self.max_log_bytes and os.path.exists(path) and os.path.getsize(path) >= self.max_log_bytes:
+                        os.replace(path, path + ".1")
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("\n".join(lines) + "\n")
+                except OSError:
+                    pass
+
+    def read_log(self):
+        """Current query log as bytes (flushed first); b"" when there is none yet."""
+        self.flush()
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except (OSError, TypeError):
+            return b""
+
+    def summary(self):
+        """DataFrame per shape: calls, errors, hit rate, p50 / p95 / p99 / max ms, rows and bytes per call."""
+        with self._lock:
+            items = [(sid, dict(a, ms=np.array(a["ms"]))) for sid, a in self._shapes.items()]
+        rows = []
+        for sid, a in items:
+            p50, p95, p99 = np.percentile(a["ms"], [50, 95, 99])
+            rows.append({"shape_id": sid, "kind": a["kind"], "calls": a["calls"], "errors": a["errors"],
+                         "hit_rate": a["hits"] / a["calls"], "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                         "max_ms": a["ms"].max(), "rows_per_call": a["rows"] / a["calls"],
+                         "bytes_per_call": a["bytes"] / a["calls"], "shape": a["shape"]})
+        df = pd.DataFrame(rows, columns=["shape_id", "kind", "calls", "errors", "hit_rate", "p50_ms", "p95_ms",
+                                         "p99_ms", "max_ms", "rows_per_call", "bytes_per_call", "shape"])
+        return df.sort_values("p95_ms", ascending=False, ignore_index=True)
+
+    def slow(self):
+        """Recent slow calls (newest first) with their full query text."""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        self.flush()
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
+            self.started = time.time()
+
+
+def summarize(path):
+    """Read a query log back -> the same per-shape table as QueryProfiler.summary()."""
+    df = pd.read_json(path, lines=True)
+    if df.empty:
+        return df
+    g = df.groupby("shape_id")
+    out = pd.DataFrame({
+        "kind": g["kind"].first(),
+        "calls": g.size(),
+        "errors": g["ok"].apply(lambda s: int((~s.astype(bool)).sum())),
+        "hit_rate": g["cache"].apply(lambda s: (s == "hit").mean()),
+        "p50_ms": g["ms"].quantile(0.50),
+        "p95_ms": g["ms"].quantile(0.95),
+        "p99_ms": g["ms"].quantile(0.99),
+        "max_ms": g["ms"].max(),
+        "rows_per_call": g["rows"].mean(),
+        "bytes_per_call": g["bytes"].mean(),
+        "shape": g["shape"].first(),
+    })
+    return out.sort_values("p95_ms", ascending=False).reset_index()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Summarize a query profiler log")
+    ap.add_argument("log", nargs="?", default="query_log.jsonl")
+    ap.add_argument("--slow", type=int, metavar="N", help="show the N slowest calls instead")
+    args = ap.parse_args(argv)
+    if args.slow:
+        df = pd.read_json(args.log, lines=True).nlargest(args.slow, "ms")
+        for row in df.itertuples():
+            print(f"{row.ms:10.1f} ms  {row.ts}  {row.kind:<6} rows={row.rows}  {row.shape[:100]}")
+        return 0
+    with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+        print(summarize(args.log).round(1).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
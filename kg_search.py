@@ -0,0 +1,147 @@
+# kg_search.py
+"""
+Entity search index for the sidebar Quick Search
+- one document per (entity, class) pair from `?entity a ?type`, searchable
+  by the entity's local name and its rdfs:label / :hasLabel literals
+- trigram postings answer substring queries (intersect, then verify);
+  1-2 character input falls back to a scan of the indexed names
+- results ranked: exact name > name prefix > token prefix > substring,
+  then shorter names first
+- built once per dataset generation, extended in place by insert_entity
+"""
+
+import re
+import threading
+from collections import defaultdict
+
+ENTITY_TYPES_Q = "SELECT ?entity ?type WHERE { ?entity a ?type }"
+ENTITY_LABELS_Q = """
+SELECT ?entity ?label WHERE {
+  ?entity a ?type .
+  { ?entity <http://www.w3.org/2000/01/rdf-schema#label> ?label }
+  UNION { ?entity :hasLabel ?label }
+}
+"""
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def local_name(iri):
+    return re.split(r"[#/]", iri)[-1] or iri
+
+
+def tokens(text):
+    return _TOKEN.findall(_CAMEL.sub(" ", text).lower())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class EntitySearchIndex:
+    def __init__(self):
+        self.generation = None
+        self._clear()
+        self._lock = threading.Lock()
+
+    def _clear(self):
+        self.docs = []                     # (entity, type, name, [keys])
+        self._doc_ids = {}                 # (entity, type) -> doc id
+        self._tokens = []                  # doc id -> word tokens of its keys
+        self._grams = defaultdict(set)     # trigram -> doc ids
+
+    def is_fresh(self, generation):
+        return self.generation == generation
+
+    def _add(self, entity, type_, labels=()):
+        doc_id = self._doc_ids.get((entity, type_))
+        new_keys = []
+        if doc_id is None:
+            doc_id = len(self.docs)
+            self._doc_ids[(entity, type_)] = doc_id
+            name = local_name(entity)
+            self.docs.append((entity, type_, name, []))
+            self._tokens.append(set())
+            new_keys.append(name)
+        keys = self.docs[doc_id][3]
+        for label in labels:
+            label = str(label)
+            if label and label.lower() not in keys and label not in new_keys:
+                new_keys.append(label)
+        # tokens from the original case, so camelCase / PascalCase names split into words
+        for key in new_keys:
+            self._tokens[doc_id].update(tokens(key))
+        new_keys = list(dict.fromkeys(key.lower() for key in new_keys))
+        keys.extend(new_keys)
+        for key in new_keys:
+            for g in trigrams(key):
+                self._grams[g].add(doc_id)
+
+    def build(self, select, generation):
+        """select(query) -> DataFrame; must raise on backend errors."""
+        types = select(ENTITY_TYPES_Q)
+        labels = select(ENTITY_LABELS_Q)
+        by_entity = defaultdict(list)
+        if not labels.empty:
+            for e, l in zip(labels["entity"], labels["label"]):
+                by_entity[e].append(l)
+        with self._lock:
+            self._clear()
+            if not types.empty:
+                for e, t in zip(types["entity"], types["type"]):
+                    self._add(e, t, by_entity.get(e, ()))
+            self.generation = generation
+
+    def add(self, entries, generation_before, generation_after):
+        """entries: (entity, type, labels); same staleness rule as DatasetStats.add_triples."""
+        with self._lock:
+            if self.generation != generation_before:
+                return
+            for entity, type_, labels in entries:
+                self._add(entity, type_, labels)
+            self.generation = generation_after
+
+    def clear(self, generation):
+        with self._lock:
+            self._clear()
+            self.generation = generation
+
+    def _candidates(self, q):
+        if len(q) >= 3:
+            grams = sorted(trigrams(q), key=lambda g: len(self._grams.get(g, ())))
+            if not grams or grams[0] not in self._grams:
+                return set()
+            found = set(self._grams[grams[0]])
+            for g in grams[1:]:
+                found &= self._grams.get(g, set())
+                if not found:
+                    break
+            return found
+        # too short for trigrams: plain scan, same matches as CONTAINS()
+        return {d for d, doc in enumerate(self.docs) if any(q in key for key in doc[3])}
+
+    def search(self, query, limit=20):
+        """Ranked [(entity, type, score)]; lower score = better match."""
+        q = query.strip().lower()
+        if not q:
+            return []
+        with self._lock:
+            hits = []
+            for doc_id in self._candidates(q):
+                entity, type_, name, keys = self.docs[doc_id]
+                words = self._tokens[doc_id]
+                lname = name.lower()
+                if lname == q:
+                    rank = 0
+                elif lname.startswith(q):
+                    rank = 1
+                elif any(tok.startswith(q) for tok in words):
+                    rank = 2
+                elif any(q in key for key in keys):
+                    rank = 3
+                else:
+                    continue  # trigram false positive
+                hits.append((rank, len(name), name, entity, type_))
+        hits.sort()
+        return [(entity, type_, rank) for rank, _, _, entity, type_ in hits[:limit]]
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# kg_similarity.py
+"""
+Precomputed entity similarity for the Analyze Entity page
+
+    python kg_similarity.py cultural_difference_properties.ttl culturaldifference_enriched.ttl --entity Punjabi_Culture
+
+- an entity's features are its (predicate, object) pairs with IRI objects;
+  two entities are as similar as the IDF-weighted Jaccard overlap of their
+  features (a shared :followsReligion :Islam counts far less than a shared
+  rare festival)
+- candidate pairs come from an inverted index feature -> entities; hub
+  features held by more than max_df entities (rdf:type ns2:PERSON, ...)
+  still weigh in the score but do not generate pairs, so the build never
+  goes quadratic in hub size (an entity whose features are all hubs has no
+  neighbours, whether it was scored at build time or after an insert)
+- the top-k neighbours of every entity are computed once per dataset
+  generation (pair overlaps accumulated with numpy), so similar() is a lookup
+- inserts: add() extends the features and marks the touched entities; their
+  lists are recomputed on the next lookup (IDF weights of untouched entities
+  drift until the next rebuild)
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+IRI_SCHEMES = ("http://", "https://", "urn:")
+FEATURES_Q = "SELECT ?s ?p ?o WHERE { ?s ?p ?o FILTER(isIRI(?s) && isIRI(?o)) }"
+
+
+class SimilarityIndex:
+    def __init__(self, top_k=25, max_df=200):
+        self.top_k = top_k
+        self.max_df = max_df
+        self.generation = None
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.entities = []          # id -> IRI
+        self._eids = {}
+        self.features = []          # id -> (p, o)
+        self._fids = {}
+        self._feats = []            # entity id -> set of feature ids
+        self._post = []             # feature id -> set of entity ids
+        self._top = {}              # entity id -> [(other id, score)]
+        self._dirty = set()
+        self.build_seconds = 0.0
+        self.pairs_scored = 0
+
+    def __len__(self):
+        return len(self.entities)
+
+    def is_fresh(self, generation):
+        return self.generation == generation
+
+    # ---- weights ----
+    def _idf(self, f):
+        return math.log((len(self.entities) + 1) / len(self._post[f]))
+
+    def _norm(self, e):
+        return sum(self._idf(f) for f in self._feats[e])
+
+    # ---- building ----
+    def _entity(self, iri):
+        eid = self._eids.get(iri)
+        if eid is None:
+            eid = self._eids[iri] = len(self.entities)
+            self.entities.append(iri)
+            self._feats.append(set())
+        return eid
+
+    def _feature(self, p, o):
+        fid = self._fids.get((p, o))
+        if fid is None:
+            fid = self._fids[(p, o)] = len(self.features)
+            self.features.append((p, o))
+            self._post.append(set())
+        return fid
+
+    def build(self, select, generation=None):
+        """select(query) -> DataFrame(s, p, o); raises on backend errors."""
+        df = select(FEATURES_Q)
+        with self._lock:
+            self._build_frame(df)
+            self.generation = generation
+        return self
+
+    def _build_frame(self, df):
+        t0 = time.perf_counter()
+        self._clear()
+        if df.empty:
+            return
+        e_codes, entities = pd.factorize(df["s"])
+        f_codes, features = pd.factorize(pd.MultiIndex.from_arrays([df["p"], df["o"]]))
+        pairs = np.unique(np.stack([f_codes, e_codes], axis=1), axis=0)  # sorted by feature
+        f_of, e_of = pairs[:, 0], pairs[:, 1]
+        n_ent, n_feat = len(entities), len(features)
+
+        self.entities = list(entities)
+        self._eids = {iri: i for i, iri in enumerate(self.entities)}
+        self.features = list(features)
+        self._fids = {f: i for i, f in enumerate(self.features)}
+        starts = np.searchsorted(f_of, np.arange(n_feat + 1))
+        e_list = e_of.tolist()
+        self._post = [set(e_list[starts[f]:starts[f + 1]]) for f in range(n_feat)]
+        self._feats = [set() for _ in range(n_ent)]
+        for f, e in zip(f_of.tolist(), e_list):
+            self._feats[e].add(f)
+
+        dfreq = np.diff(starts)
+        idf = np.log((n_ent + 1) / dfreq)
+        norm = np.bincount(e_of, weights=idf[f_of], minlength=n_ent)
+
+        # overlap of every candidate pair, one feature posting list at a time
+        a_parts, b_parts, w_parts = [], [], []
+        for f in np.nonzero((dfreq >= 2) & (dfreq <= self.max_df))[0]:
+            members = e_of[starts[f]:starts[f + 1]]
+            i, j = np.triu_indices(len(members), 1)
+            a_parts.append(members[i])
+            b_parts.append(members[j])
+            w_parts.append(np.full(len(i), idf[f]))
+        self._top = {}
+        self._dirty = set()
+        if a_parts:
+            a = np.concatenate(a_parts).astype(np.int64)
+            b = np.concatenate(b_parts).astype(np.int64)
+            lo, hi = np.minimum(a, b), np.maximum(a, b)
+            keys, inverse = np.unique(lo * n_ent + hi, return_inverse=True)
+            inter = np.bincount(inverse, weights=np.concatenate(w_parts))
+            a, b = keys // n_ent, keys % n_ent
+            score = inter / (norm[a] + norm[b] - inter)
+            self.pairs_scored = len(keys)
+            # both directions, best first per entity, cut at top_k
+            src = np.concatenate([a, b])
+            dst = np.concatenate([b, a])
+            sc = np.concatenate([score, score])
+            order = np.lexsort((dst, -sc, src))
+            src, dst, sc = src[order], dst[order], sc[order]
+            first = np.searchsorted(src, src, "left")
+            keep = (np.arange(len(src)) - first) < self.top_k
+            src, dst, sc = src[keep].tolist(), dst[keep].tolist(), sc[keep].tolist()
+            for s, d, x in zip(src, dst, sc):
+                self._top.setdefault(s, []).append((d, x))
+        self.build_seconds = time.perf_counter() - t0
+
+    # ---- scoring one entity (dirty / unseen) ----
+    def _score(self, e):
+        feats = self._feats[e]
+        inter = defaultdict(float)
+        # same candidate rule as _build_frame: hub features weigh in the score but pair no one
+        for f in feats:
+            post = self._post[f]
+            if len(post) < 2 or len(post) > self.max_df:
+                continue
+            w = self._idf(f)
+            for o in post:
+                if o != e:
+                    inter[o] += w
+        norm_e = self._norm(e)
+        scored = [(o, x / (norm_e + self._norm(o) - x)) for o, x in inter.items()]
+        scored.sort(key=lambda t: (-t[1], t[0]))
+        return scored[:self.top_k]
+
+    # ---- queries ----
+    def similar(self, entity, k=10):
+        """[(other IRI, score 0-1, shared (p, o) features)] best first; [] if unknown."""
+        with self._lock:
+            e = self._eids.get(entity)
+            if e is None:
+                return []
+            if e in self._dirty:
+                self._top[e] = self._score(e)
+                self._dirty.discard(e)
+            out = []
+            for o, score in self._top.get(e, ())[:k]:
+                shared = sorted(self._feats[e] & self._feats[o], key=lambda f: len(self._post[f]))
+                out.append((self.entities[o], float(score), [self.features[f] for f in shared]))
+            return out
+
+    def add(self, triples, generation_before, generation_after):
+        """(s, p, o) IRIs just inserted; same staleness rule as DatasetStats.add_triples."""
+        with self._lock:
+            if self.generation != generation_before:
+                return
+            for s, p, o in triples:
+                if not o.startswith(IRI_SCHEMES):
+                    continue  # literal values are not features
+                e = self._entity(s)
+                f = self._feature(p, o)
+                if f in self._feats[e]:
+                    continue
+                self._feats[e].add(f)
+                self._post[f].add(e)
+                self._dirty.add(e)
+                if len(self._post[f]) <= self.max_df:
+                    # entities sharing the new feature may now rank e higher
+                    self._dirty.update(self._post[f])
+            self.generation = generation_after
+
+    def clear(self, generation):
+        with self._lock:
+            self._clear()
+            self.generation = generation
+
+
+# ---------------- offline check / benchmark ----------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Entity similarity index over RDF files")
+    ap.add_argument("inputs", nargs="+")
+    ap.add_argument("--entity", action="append", default=[], help="local name or IRI to look up")
+    ap.add_argument("--top-k", type=int, default=25)
+    ap.add_argument("--max-df", type=int, default=200)
+    args = ap.parse_args(argv)
+
+    from kg_store import EmbeddedBackend
+    backend = EmbeddedBackend(args.inputs)
+    t = time.perf_counter()
+    idx = SimilarityIndex(args.top_k, args.max_df).build(backend.select)
+    print(f"{len(idx):,} entities, {len(idx.features):,} features: {idx.pairs_scored:,} pairs scored, "
+          f"built in {time.perf_counter() - t:.2f}s ({idx.build_seconds:.2f}s after the query)")
+    for name in args.entity:
+        iri = name if "://" in name else "http://example.org/culturaldifference#" + name
+        t = time.perf_counter()
+        hits = idx.similar(iri, 10)
+        print(f"\n{name}: {len(hits)} similar ({(time.perf_counter() - t) * 1e6:.0f} us)")
+        for other, score, shared in hits:
+            print(f"  {score:5.3f}  {other.rsplit('#', 1)[-1].rsplit('/', 1)[-1]:<40} "
+                  f"{len(shared)} shared, e.g. {shared[0][0].rsplit('#', 1)[-1]} {shared[0][1].rsplit('#', 1)[-1]}"
+                  if shared else f"  {score:5.3f}  {other}")
+        # the query the page used to run
+        q = ("SELECT ?other ?p WHERE { <%s> ?p ?obj . ?other ?p ?obj . FILTER(?other != <%s>) } LIMIT 50"
+             % (iri, iri))
+        t = time.perf_counter()
+        backend.select(q)
+        print(f"  (self-join query: {(time.perf_counter() - t) * 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# kg_snapshot.py
+"""
+Binary dataset snapshots: term dictionary + integer triple array
+
+    python kg_snapshot.py convert cultural_difference_properties.ttl culturaldifference_enriched.ttl -o kg.kgsnap
+    python kg_snapshot.py convert triples.csv -o phase1.kgsnap --compress
+    python kg_snapshot.py info kg.kgsnap
+    python kg_snapshot.py push kg.kgsnap                   # -> Fuseki /data in N-Triples batches
+    python kg_snapshot.py bench culturaldifference_enriched.ttl
+
+- every distinct term is stored once: kind (IRI / blank node / plain,
+  language-tagged or typed literal), lexical form and datatype / language;
+  triples are (s, p, o) uint32 ids, deduplicated and sorted by s, p, o
+- file = magic, JSON header, then 8-byte aligned raw sections, so an
+  uncompressed snapshot is memory-mapped and opening it costs no parsing;
+  --compress stores zlib sections instead (smaller, decompressed on open)
+- sources: any RDF file rdflib reads (.ttl, .nt, .rdf, ...) and the
+  Phase 1 triples.csv (prefix:name IRIs and "quoted" literals)
+- Snapshot.load_into(backend) fills the embedded store from the integer
+  arrays (each term built once), or posts N-Triples batches to Fuseki;
+  EmbeddedBackend.load() accepts .kgsnap files directly
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"KGSNAP01"
+VERSION = 1
+SUFFIX = ".kgsnap"
+
+IRI, BNODE, PLAIN, LANG, TYPED = range(5)
+KIND_NAMES = ("iri", "bnode", "literal", "lang-literal", "typed-literal")
+
+
+# ---------------- building ----------------
+class TermTable:
+    """Interning table: term -> id, in first-seen order."""
+
+    def __init__(self):
+        self.ids = {}
+        self.kinds = []
+        self.lex = []
+        self.extra = []      # datatype term id (TYPED), language index (LANG), else -1
+        self.langs = {}
+        self.namespaces = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _add(self, kind, lex, extra=-1):
+        key = (kind, lex, extra)
+        tid = self.ids.get(key)
+        if tid is None:
+            tid = self.ids[key] = len(self.kinds)
+            self.kinds.append(kind)
+            self.lex.append(lex)
+            self.extra.append(extra)
+        return tid
+
+    def iri(self, value):
+        return self._add(IRI, value)
+
+    def bnode(self, label):
+        return self._add(BNODE, label)
+
+    def literal(self, value, lang=None, datatype=None):
+        if lang:
+            return self._add(LANG, value, self.langs.setdefault(lang, len(self.langs)))
+        if datatype:
+            return self._add(TYPED, value, self.iri(datatype))
+        return self._add(PLAIN, value)
+
+    def rdflib_term(self, term):
+        name = type(term).__name__
+        if name == "URIRef":
+            return self.iri(str(term))
+        if name == "BNode":
+            return self.bnode(str(term))
+        if name == "Literal":
+            return self.literal(str(term), term.language,
+                                str(term.datatype) if term.datatype is not None else None)
+        raise ValueError(f"unsupported term {term!r}")
+
+
+def add_rdf_file(table, path, format=None):
+    """Parse an RDF file with rdflib -> (n, 3) id array."""
+    from rdflib import Graph
+    from rdflib.util import guess_format
+    builtin = set(Graph().namespaces())
+    g = Graph()
+    g.parse(path, format=format or guess_format(path) or "turtle")
+    for prefix, ns in g.namespaces():
+        # only the file's own prefixes, not rdflib's default bindings
+        if (prefix, ns) not in builtin and str(ns) not in table.namespaces.values():
+            table.namespaces.setdefault(prefix, str(ns))
+    ids = {}
+    out = np.empty((len(g), 3), dtype=np.uint32)
+    for i, triple in enumerate(g):
+        for j, term in enumerate(triple):
+            tid = ids.get(term)
+            if tid is None:
+                tid = ids[term] = table.rdflib_term(term)
+            out[i, j] = tid
+    return out
+
+
+def add_triples_csv(table, path, chunksize=200000):
+    """Phase 1 triples.csv (subject, predicate, object) -> (n, 3) id array.
+
+    Cells are decoded once per distinct value (pd.factorize), not per row.
+    """
+    from kg_loader import PREFIXES
+    for prefix, ns in PREFIXES.items():
+        table.namespaces.setdefault(prefix, ns)
+    parts = []
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize):
+        cells = pd.concat([chunk["subject"], chunk["predicate"], chunk["object"]], ignore_index=True)
+        codes, uniques = pd.factorize(cells)
+        local = np.empty(len(uniques), dtype=np.uint32)
+        for k, value in enumerate(uniques):
+            if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+                local[k] = table.literal(value[1:-1])
+                continue
+            prefix, sep, name = value.partition(":")
+            local[k] = table.iri(PREFIXES[prefix] + name if sep and prefix in PREFIXES else value)
+        parts.append(local[codes].reshape(3, -1).T)
+    return np.concatenate(parts) if parts else np.empty((0, 3), dtype=np.uint32)
+
+
+def add_source(table, path):
+    if path.endswith(".csv"):
+        return add_triples_csv(table, path)
+    return add_rdf_file(table, path)
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def write(path, table, triples, compress=False, source=()):
+    """Write a snapshot file; triples are deduplicated and sorted (s, p, o)."""
+    triples = np.asarray(triples, dtype=np.uint32).reshape(-1, 3)
+    if len(triples):
+        triples = np.unique(triples, axis=0)
+    encoded = [s.encode("utf-8") for s in table.lex]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    sections = {
+        "kinds": np.asarray(table.kinds, dtype=np.uint8),
+        "extra": np.asarray(table.extra, dtype=np.int32),
+        "offsets": offsets,
+        "blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "triples": np.ascontiguousarray(triples),
+    }
+    payloads, meta, pos = [], {}, 0
+    for name, arr in sections.items():
+        raw = arr.tobytes()
+        data = zlib.compress(raw, 6) if compress else raw
+        meta[name] = {"offset": pos, "length": len(data), "raw_length": len(raw),
+                      "dtype": arr.dtype.str, "shape": list(arr.shape)}
+        payloads.append(data)
+        pos = _align(pos + len(data))
+    header = json.dumps({
+        "version": VERSION, "terms": len(table), "triples": int(len(triples)),
+        "compression": "zlib" if compress else None,
+        "langs": sorted(table.langs, key=table.langs.get),
+        "namespaces": table.namespaces, "sections": meta,
+        "sources": [os.path.basename(p) for p in source],
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }).encode("utf-8")
+    header += b" " * (_align(len(MAGIC) + 8 + len(header)) - len(MAGIC) - 8 - len(header))
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for data in payloads:
+            f.write(data)
+            f.write(b"\0" * (_align(len(data)) - len(data)))
+    return len(triples)
+
+
+def convert(paths, out, compress=False):
+    """RDF files / triples.csv -> snapshot; returns (terms, triples)."""
+    table = TermTable()
+    parts = [add_source(table, p) for p in paths]
+    triples = np.concatenate(parts) if parts else np.empty((0, 3), dtype=np.uint32)
+    n = write(out, table, triples, compress, paths)
+    return len(table), n
+
+
+# ---------------- reading ----------------
+class Snapshot:
+    """Opened snapshot; arrays are views into the mapped file when uncompressed."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a kg snapshot")
+        hlen = int(np.frombuffer(self._map, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._map[start:start + hlen]))
+        if self.header["version"] != VERSION:
+            self.close()
+            raise ValueError(f"{path}: snapshot version {self.header['version']} not supported")
+        base = start + hlen
+        compressed = self.header["compression"] == "zlib"
+        for name, m in self.header["sections"].items():
+            if compressed:
+                buf = zlib.decompress(self._map[base + m["offset"]:base + m["offset"] + m["length"]])
+                arr = np.frombuffer(buf, dtype=m["dtype"])
+            else:
+                count = m["raw_length"] // np.dtype(m["dtype"]).itemsize
+                arr = np.frombuffer(self._map, dtype=m["dtype"], count=count, offset=base + m["offset"])
+            setattr(self, name, arr.reshape(m["shape"]))
+        self.langs = self.header["langs"]
+        self.namespaces = self.header["namespaces"]
+        self._rdflib = None
+
+    def __len__(self):
+        return self.header["triples"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # drop array views before unmapping
+        for name in ("kinds", "extra", "offsets", "blob", "triples"):
+            self.__dict__.pop(name, None)
+        self._rdflib = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # a caller still holds a view; the map is released with it
+        self._file.close()
+
+    @property
+    def n_terms(self):
+        return self.header["terms"]
+
+    def lexical(self, tid):
+        a, b = int(self.offsets[tid]), int(self.offsets[tid + 1])
+        return self.blob[a:b].tobytes().decode("utf-8")
+
+    def lexicals(self):
+        """All lexical forms, decoded in one pass over the blob."""
+        blob = self.blob.tobytes()
+        offs = self.offsets.tolist()
+        return [blob[offs[i]:offs[i + 1]].decode("utf-8") for i in range(len(offs) - 1)]
+
+    def rdflib_terms(self):
+        """id -> rdflib term list (built once per term, cached)."""
+        if self._rdflib is None:
+            from rdflib import BNode, Literal, URIRef
+            lex, kinds, extra = self.lexicals(), self.kinds.tolist(), self.extra.tolist()
+            terms = [None] * len(lex)
+            for i, k in enumerate(kinds):
+                if k == IRI:
+                    terms[i] = URIRef(lex[i])
+                elif k == BNODE:
+                    terms[i] = BNode(lex[i])
+            for i, k in enumerate(kinds):
+                if k == PLAIN:
+                    terms[i] = Literal(lex[i])
+                elif k == LANG:
+                    terms[i] = Literal(lex[i], lang=self.langs[extra[i]])
+                elif k == TYPED:
+                    terms[i] = Literal(lex[i], datatype=terms[extra[i]])
+            self._rdflib = terms
+        return self._rdflib
+
+    def nt_terms(self):
+        """id -> N-Triples term string."""
+        from kg_loader import nt_iri, nt_literal
+        lex, kinds, extra = self.lexicals(), self.kinds.tolist(), self.extra.tolist()
+        out = [None] * len(lex)
+        for i, k in enumerate(kinds):
+            if k == IRI:
+                out[i] = nt_iri(lex[i])
+            elif k == BNODE:
+                out[i] = "_:" + lex[i]
+            elif k == PLAIN:
+                out[i] = nt_literal(lex[i])
+            elif k == LANG:
+                out[i] = nt_literal(lex[i]) + "@" + self.langs[extra[i]]
+            else:
+                out[i] = nt_literal(lex[i]) + "^^" + nt_iri(lex[extra[i]])
+        return out
+
+    def iter_ntriples(self, batch_size=50000):
+        """Yield N-Triples documents (bytes) of at most batch_size triples."""
+        nt = np.array(self.nt_terms(), dtype=object)
+        for start in range(0, len(self), batch_size):
+            block = self.triples[start:start + batch_size]
+            lines = nt[block[:, 0]] + " " + nt[block[:, 1]] + " " + nt[block[:, 2]] + " .\n"
+            yield "".join(lines).encode("utf-8")
+
+    def subject_rows(self, tid):
+        """Row range of subject `tid` in the sorted triple array (no index needed)."""
+        col = self.triples[:, 0]
+        return int(np.searchsorted(col, tid, "left")), int(np.searchsorted(col, tid, "right"))
+
+    # ---- loading ----
+    def load_into(self, backend, batch_size=50000, progress=None):
+        """Push every triple into a backend -> seconds.
+
+        Embedded: straight into the IndexedStore id indexes; anything else
+        (Fuseki): N-Triples batches through backend.import_data.
+        """
+        t = time.perf_counter()
+        store = getattr(backend, "store", None)
+        if hasattr(store, "add_ids"):
+            with backend._lock:
+                store.add_ids(self.rdflib_terms(), self.triples)
+                for prefix, ns in self.namespaces.items():
+                    store.bind(prefix, ns, override=False)
+        else:
+            done = 0
+            for body in self.iter_ntriples(batch_size):
+                backend.import_data(body, "application/n-triples")
+                done = min(len(self), done + batch_size)
+                if progress is not None:
+                    progress(done, len(self))
+        return time.perf_counter() - t
+
+
+def open_snapshot(path):
+    return Snapshot(path)
+
+
+# ---------------- benchmark ----------------
+def benchmark(paths, repeat=3, directory=None):
+    from kg_store import EmbeddedBackend
+
+    def best(fn):
+        secs = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            out = fn()
+            secs.append(time.perf_counter() - t)
+        return min(secs), out
+
+    base = directory or os.path.dirname(os.path.abspath(paths[0]))
+    plain, packed = os.path.join(base, "bench.kgsnap"), os.path.join(base, "bench.z.kgsnap")
+    try:
+        t = time.perf_counter()
+        terms, n = convert(paths, plain)
+        convert(paths, packed, compress=True)
+        print(f"{len(paths)} file(s): {n:,} triples, {terms:,} terms (converted in {time.perf_counter() - t:.1f}s)")
+        src = sum(os.path.getsize(p) for p in paths)
+        print(f"  size: source {src / 1e6:.2f} MB, snapshot {os.path.getsize(plain) / 1e6:.2f} MB, "
+              f"compressed {os.path.getsize(packed) / 1e6:.2f} MB")
+
+        parse, g = best(lambda: EmbeddedBackend(paths))
+        print(f"  rdflib parse -> embedded store   : {parse:6.3f}s  ({len(g.graph):,} triples)")
+        for label, p in (("snapshot -> embedded store", plain), ("compressed snapshot -> store", packed)):
+            secs, g2 = best(lambda: EmbeddedBackend([p]))
+            print(f"  {label:<32}: {secs:6.3f}s  x{parse / secs:.1f}  ({len(g2.graph):,} triples)")
+        secs, _ = best(lambda: sum(len(b) for b in Snapshot(plain).iter_ntriples()))
+        print(f"  snapshot -> N-Triples batches    : {secs:6.3f}s  (Fuseki push payload)")
+        secs, _ = best(lambda: Snapshot(plain).close())
+        print(f"  open (mmap, no decode)           : {secs * 1000:6.2f} ms")
+    finally:
+        for p in (plain, packed):
+            if os.path.exists(p):
+                os.remove(p)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Binary KG snapshots (term dictionary + int triples)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert", help="RDF files / triples.csv -> snapshot")
+    c.add_argument("inputs", nargs="+")
+    c.add_argument("-o", "--out", required=True)
+    c.add_argument("--compress", action="store_true", help="zlib sections (not memory-mappable)")
+    i = sub.add_parser("info", help="print a snapshot header")
+    i.add_argument("snapshot")
+    p = sub.add_parser("push", help="load a snapshot into Fuseki")
+    p.add_argument("snapshot")
+    p.add_argument("--fuseki", default=os.environ.get("FUSEKI_BASE", "http://localhost:3030/culture_difference"))
+    p.add_argument("--batch-size", type=int, default=50000)
+    b = sub.add_parser("bench", help="snapshot load vs Turtle parsing")
+    b.add_argument("inputs", nargs="+")
+    b.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "convert":
+        t = time.perf_counter()
+        terms, n = convert(args.inputs, args.out, args.compress)
+        print(f"{n:,} triples, {terms:,} terms -> {args.out} "
+              f"({os.path.getsize(args.out) / 1e6:.2f} MB, {time.perf_counter() - t:.1f}s)")
+    elif args.cmd == "info":
+        with Snapshot(args.snapshot) as snap:
+            h = dict(snap.header)
+            counts = np.bincount(snap.kinds, minlength=len(KIND_NAMES))
+            h["term_kinds"] = {KIND_NAMES[k]: int(c) for k, c in enumerate(counts)}
+            h.pop("sections")
+            print(json.dumps(h, indent=2))
+    elif args.cmd == "push":
+        from kg_store import FusekiBackend
+        with Snapshot(args.snapshot) as snap:
+            secs = snap.load_into(FusekiBackend(args.fuseki), args.batch_size,
+                                  progress=lambda done, total: print(f"  {done:,} / {total:,} triples"))
+            print(f"Loaded {len(snap):,} triples in {secs:.1f}s")
+    elif args.cmd == "bench":
+        benchmark(args.inputs, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
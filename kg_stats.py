@@ -0,0 +1,149 @@
+# kg_stats.py
+"""
+Dataset statistics index for the Dataset Overview page
+- triple count, per-predicate counts, per-class instance counts and the
+  number of distinct subjects (counted on the server: one row, not one per
+  subject)
+- built once from three aggregate queries (concurrently when a submit
+  function is given, each one timed), then kept current by the app's
+  insert / purge helpers instead of re-scanning the store on every render
+- novel_triples(): run before an insert, finds which triples and subjects
+  the store does not hold yet, so re-inserted triples are not counted twice
+"""
+
+import threading
+import time
+from collections import Counter
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+PREDICATE_COUNTS_Q = "SELECT ?p (COUNT(*) AS ?count) WHERE { ?s ?p ?o } GROUP BY ?p"
+CLASS_COUNTS_Q = "SELECT ?cls (COUNT(?s) AS ?count) WHERE { ?s a ?cls } GROUP BY ?cls"
+SUBJECTS_Q = "SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE { ?s ?p ?o }"
+BUILD_QUERIES = {"predicates": PREDICATE_COUNTS_Q, "classes": CLASS_COUNTS_Q, "subjects": SUBJECTS_Q}
+NOVEL_CHUNK = 500  # VALUES rows per existence query
+
+
+def _counter(df, key):
+    if df.empty:
+        return Counter()
+    return Counter(dict(zip(df[key], df["count"].astype(int))))
+
+
+def novel_triples(select, terms, chunk=NOVEL_CHUNK):
+    """(s, p, o) SPARQL terms about to be inserted -> (indices of the ones not
+    in the store yet, number of their subjects the store has no triple for).
+
+    Duplicates within `terms` count once. select(query) -> DataFrame.
+    """
+    first = {}
+    for i, t in enumerate(terms):
+        first.setdefault(tuple(t), i)
+    stored = set()
+    items = list(first.items())
+    for k in range(0, len(items), chunk):
+        rows = " ".join(f"({i} {s} {p} {o})" for (s, p, o), i in items[k:k + chunk])
+        df = select(f"SELECT ?i WHERE {{ VALUES (?i ?s ?p ?o) {{ {rows} }} ?s ?p ?o }}")
+        if not df.empty:
+            stored.update(int(i) for i in df["i"])
+    new = sorted(i for i in first.values() if i not in stored)
+    subjects = list(dict.fromkeys(terms[i][0] for i in new))
+    known = 0
+    for k in range(0, len(subjects), chunk):
+        rows = " ".join(subjects[k:k + chunk])
+        df = select(f"SELECT (COUNT(*) AS ?count) WHERE {{ VALUES ?s {{ {rows} }} FILTER EXISTS {{ ?s ?p ?o }} }}")
+        known += int(df["count"].iloc[0]) if not df.empty else 0
+    return new, len(subjects) - known
+
+
+class DatasetStats:
+    def __init__(self):
+        self.triple_count = 0
+        self.predicate_counts = Counter()
+        self.class_counts = Counter()
+        self.subject_count = 0
+        self.generation = None  # dataset generation the numbers describe
+        self.built_at = None
+        self.timings = {}       # query name -> seconds, from the last build
+        self.build_seconds = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self, generation):
+        return self.generation == generation
+
+    def build(self, select, generation, submit=None):
+        """select(query) -> DataFrame; must raise on backend errors.
+
+        submit(fn, *args) -> Future runs the three queries concurrently
+        (e.g. ThreadPoolExecutor.submit); without it they run in turn.
+        """
+        def timed(q):
+            t = time.perf_counter()
+            df = select(q)
+            return df, time.perf_counter() - t
+
+        t = time.perf_counter()
+        if submit is None:
+            results = {name: timed(q) for name, q in BUILD_QUERIES.items()}
+        else:
+            futures = {name: submit(timed, q) for name, q in BUILD_QUERIES.items()}
+            results = {name: f.result() for name, f in futures.items()}
+        preds = _counter(results["predicates"][0], "p")
+        classes = _counter(results["classes"][0], "cls")
+        subjects_df = results["subjects"][0]
+        subjects = int(subjects_df["count"].iloc[0]) if not subjects_df.empty else 0
+        with self._lock:
+            self.timings = {name: secs for name, (_, secs) in results.items()}
+            self.build_seconds = time.perf_counter() - t
+            self.predicate_counts = preds
+            self.class_counts = classes
+            self.subject_count = subjects
+            self.triple_count = sum(preds.values())
+            self.generation = generation
+            self.built_at = time.time()
+
+    def add_triples(self, triples, new_subjects, generation_before, generation_after):
+        """Account for (s, p, o) IRIs just inserted that the store did not hold
+        before, bringing `new_subjects` subjects (see novel_triples).
+
+        Only applied when the index described the dataset right before the
+        insert; otherwise it stays stale and the next read rebuilds it.
+        """
+        with self._lock:
+            if self.generation != generation_before:
+                return
+            for s, p, o in triples:
+                self.triple_count += 1
+                self.predicate_counts[p] += 1
+                if p == RDF_TYPE:
+                    self.class_counts[o] += 1
+            self.subject_count += new_subjects
+            self.generation = generation_after
+
+    def advance(self, generation_before, generation_after):
+        """The generation moved on for writes already passed to add_triples."""
+        self.add_triples((), 0, generation_before, generation_after)
+
+    def clear(self, generation):
+        """Dataset was purged."""
+        with self._lock:
+            self.triple_count = 0
+            self.predicate_counts = Counter()
+            self.class_counts = Counter()
+            self.subject_count = 0
+            self.generation = generation
+            self.built_at = time.time()
+
+    @property
+    def distinct_classes(self):
+        return len(self.class_counts)
+
+    @property
+    def distinct_subjects(self):
+        return self.subject_count
+
+    def top_predicates(self, n=10):
+        return self.predicate_counts.most_common(n)
+
+    def top_classes(self, n=12):
+        return self.class_counts.most_common(n)
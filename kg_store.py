@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# kg_store.py
+"""
+Triple store backends used by app.py
+- FusekiBackend: SPARQL over HTTP to an Apache Jena Fuseki dataset (default)
+- EmbeddedBackend: loads the TTL files (or kg_snapshot .kgsnap files) into
+  an in-process store with integer-ID SPO / POS / OSP indexes and answers
+  SPARQL through rdflib
+Both return SPARQL 1.1 JSON result dicts from query(), and DataFrames from
+select() (decoded column by column, see kg_results), so run_query /
+run_update do not care which one is active.
+
+    python kg_store.py data.ttl --purge     # load, check the indexes, purge, check again
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from rdflib import Graph
+from rdflib.store import Store
+from rdflib.util import guess_format
+
+from kg_client import FusekiClient
+from kg_results import from_rdflib, parse_tsv
+from kg_snapshot import SUFFIX as SNAPSHOT_SUFFIX, Snapshot
+
+# Content-Type header -> rdflib parser name (Admin import tab)
+RDF_FORMATS = {
+    "application/rdf+xml": "xml",
+    "text/turtle": "turtle",
+    "application/trig": "trig",
+    "application/n-triples": "nt",
+    "text/plain": "nt",
+}
+
+
+# ---------------- Indexed in-memory store ----------------
+class IndexedStore(Store):
+    """rdflib Store keeping every term as an int and three nested-dict indexes.
+
+    spo[s][p] -> {o}, pos[p][o] -> {s}, osp[o][s] -> {p}; any triple pattern
+    with at least one bound term is answered from the index whose leading
+    key is bound, so rdflib's SPARQL engine never scans the whole graph
+    unless the query itself asks for ?s ?p ?o.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration=configuration, identifier=identifier)
+        self._ids = {}      # term -> id
+        self._terms = []    # id -> term
+        self._spo = {}
+        self._pos = {}
+        self._osp = {}
+        self._size = 0
+        self._ns = {}       # prefix -> namespace
+        self._prefix = {}   # namespace -> prefix
+
+    # ---- term dictionary ----
+    def _intern(self, term):
+        tid = self._ids.get(term)
+        if tid is None:
+            tid = len(self._terms)
+            self._ids[term] = tid
+            self._terms.append(term)
+        return tid
+
+    def _lookup(self, term):
+        """Id of a bound pattern term; None for a wildcard, -1 if unknown."""
+        if term is None:
+            return None
+        return self._ids.get(term, -1)
+
+    # ---- Store API ----
+    def add(self, triple, context=None, quoted=False):
+        s, p, o = (self._intern(t) for t in triple)
+        objs = self._spo.setdefault(s, {}).setdefault(p, set())
+        if o in objs:
+            return
+        objs.add(o)
+        self._pos.setdefault(p, {}).setdefault(o, set()).add(s)
+        self._osp.setdefault(o, {}).setdefault(s, set()).add(p)
+        self._size += 1
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.add((s, p, o))
+
+    def add_ids(self, terms, triples):
+        """Bulk add: terms is an id -> term list, triples (s, p, o) rows of ids into it.
+
+        Each term is interned once instead of once per triple position
+        (kg_snapshot loads go through here).
+        """
+        local = [self._intern(t) for t in terms]
+        spo, pos, osp = self._spo, self._pos, self._osp
+        added = 0
+        for s, p, o in triples.tolist():
+            s, p, o = local[s], local[p], local[o]
+            objs = spo.setdefault(s, {}).setdefault(p, set())
+            if o in objs:
+                continue
+            objs.add(o)
+            pos.setdefault(p, {}).setdefault(o, set()).add(s)
+            osp.setdefault(o, {}).setdefault(s, set()).add(p)
+            added += 1
+        self._size += added
+
+    def _discard(self, s, p, o):
+        for index, a, b, c in ((self._spo, s, p, o), (self._pos, p, o, s), (self._osp, o, s, p)):
+            level = index[a]
+            leaf = level[b]
+            leaf.discard(c)
+            if not leaf:
+                del level[b]
+                if not level:
+                    del index[a]
+        self._size -= 1
+
+    def remove(self, triple_pattern, context=None):
+        # materialise first: the indexes are mutated while we delete
+        for s, p, o in list(self._match(*(self._lookup(t) for t in triple_pattern))):
+            self._discard(s, p, o)
+
+    def _match(self, s, p, o):
+        """Yield id triples matching a pattern of ids (None = wildcard).
+
+        Every level is iterated over a snapshot (tuple) of the live dict /
+        set, so a caller may remove triples while consuming the generator:
+        rdflib's DELETE WHERE deletes each solution as it is produced.
+        """
+        if -1 in (s, p, o):
+            return
+        if s is not None:
+            preds = self._spo.get(s, {})
+            if p is not None:
+                objs = preds.get(p, ())
+                if o is not None:
+                    if o in objs:
+                        yield s, p, o
+                else:
+                    for oo in tuple(objs):
+                        yield s, p, oo
+            elif o is not None:
+                for pp in tuple(self._osp.get(o, {}).get(s, ())):
+                    yield s, pp, o
+            else:
+                for pp, objs in tuple(preds.items()):
+                    for oo in tuple(objs):
+                        yield s, pp, oo
+        elif p is not None:
+            objs = self._pos.get(p, {})
+            if o is not None:
+                for ss in tuple(objs.get(o, ())):
+                    yield ss, p, o
+            else:
+                for oo, subjs in tuple(objs.items()):
+                    for ss in tuple(subjs):
+                        yield ss, p, oo
+        elif o is not None:
+            for ss, preds in tuple(self._osp.get(o, {}).items()):
+                for pp in tuple(preds):
+                    yield ss, pp, o
+        else:
+            for ss, preds in tuple(self._spo.items()):
+                for pp, objs in tuple(preds.items()):
+                    for oo in tuple(objs):
+                        yield ss, pp, oo
+
+    def check(self):
+        """Raise ValueError unless SPO, POS and OSP hold the same triples and _size counts them."""
+        spo = {(s, p, o) for s, preds in self._spo.items() for p, objs in preds.items() for o in objs}
+        pos = {(s, p, o) for p, objs in self._pos.items() for o, subjs in objs.items() for s in subjs}
+        osp = {(s, p, o) for o, subjs in self._osp.items() for s, preds in subjs.items() for p in preds}
+        if not spo == pos == osp or len(spo) != self._size:
+            raise ValueError(f"index mismatch: spo {len(spo)}, pos {len(pos)}, osp {len(osp)}, size {self._size}")
+        empty = [name for name, index in (("spo", self._spo), ("pos", self._pos), ("osp", self._osp))
+                 if any(not level or not all(level.values()) for level in index.values())]
+        if empty:
+            raise ValueError(f"empty levels left behind in {', '.join(empty)}")
+
+    def triples(self, triple_pattern, context=None):
+        terms = self._terms
+        for s, p, o in self._match(*(self._lookup(t) for t in triple_pattern)):
+            yield (terms[s], terms[p], terms[o]), iter(())
+
+    def __len__(self, context=None):
+        return self._size
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        if not override and (prefix in self._ns or namespace in self._prefix):
+            return
+        old = self._ns.get(prefix)
+        if old is not None:
+            self._prefix.pop(old, None)
+        self._ns[prefix] = namespace
+        self._prefix[namespace] = prefix
+
+    def namespace(self, prefix):
+        return self._ns.get(prefix)
+
+    def prefix(self, namespace):
+        return self._prefix.get(namespace)
+
+    def namespaces(self):
+        return iter(self._ns.items())
+
+
+# ---------------- Backends ----------------
+class FusekiBackend:
+    """Remote Fuseki dataset (query / update / data endpoints) over a pooled FusekiClient."""
+
+    name = "fuseki"
+    concurrent_reads = True   # the server runs independent queries in parallel
+
+    def __init__(self, base, pool_size=10, retries=3):
+        self.base = base
+        self.client = FusekiClient(base, pool_size=pool_size, retries=retries)
+        self.query_url = self.client.query_url
+        self.update_url = self.client.update_url
+        self.data_url = self.client.data_url
+
+    def query(self, q, timeout=60):
+        return self.client.query_json(q, timeout=timeout)
+
+    def select(self, q, timeout=60, typed=False, meta=False, numeric=()):
+        """SELECT -> DataFrame, fetched as TSV and decoded column-wise."""
+        return parse_tsv(self.client.query_tsv(q, timeout=timeout), typed=typed, meta=meta, numeric=numeric)
+
+    def update(self, q):
+        self.client.update(q)
+
+    def last_response_bytes(self):
+        """Bytes received for this thread's last SELECT."""
+        return self.client.last_bytes()
+
+    def export_data(self):
+        return self.client.get_data()
+
+    def export_to(self, fileobj, media_type="application/n-triples"):
+        """Stream the dump into a binary file object -> bytes written."""
+        return self.client.download_data(fileobj, accept=media_type)
+
+    def import_data(self, data, content_type):
+        self.client.post_data(data, content_type)
+
+
+class EmbeddedBackend:
+    """In-process graph over IndexedStore, loaded from local RDF files."""
+
+    name = "embedded"
+    concurrent_reads = False  # queries serialize on the store lock
+
+    def __init__(self, paths=()):
+        self.store = IndexedStore()
+        self.graph = Graph(store=self.store)
+        # SPARQL evaluation is read-mostly but updates mutate the indexes,
+        # so readers and writers from different Streamlit sessions serialize
+        self._lock = threading.RLock()
+        for path in paths:
+            self.load(path)
+
+    def load(self, path, format=None):
+        if path.endswith(SNAPSHOT_SUFFIX):
+            # binary snapshot: no parsing, terms built once from the dictionary
+            with Snapshot(path) as snap:
+                snap.load_into(self)
+            return
+        with self._lock:
+            self.graph.parse(path, format=format or guess_format(path) or "turtle")
+
+    def query(self, q, timeout=60):
+        with self._lock:
+            res = self.graph.query(q)
+            return json.loads(res.serialize(format="json"))
+
+    def select(self, q, timeout=60, typed=False, meta=False, numeric=()):
+        with self._lock:
+            return from_rdflib(self.graph.query(q), typed=typed, meta=meta, numeric=numeric)
+
+    def update(self, q):
+        with self._lock:
+            self.graph.update(q)
+
+    def last_response_bytes(self):
+        return None  # in process: nothing crosses the wire
+
+    def export_data(self):
+        with self._lock:
+            return self.graph.serialize(format="turtle")
+
+    def export_to(self, fileobj, media_type="application/n-triples"):
+        with self._lock:
+            self.graph.serialize(destination=fileobj, format=RDF_FORMATS.get(media_type, "turtle"),
+                                 encoding="utf-8")
+
+    def import_data(self, data, content_type):
+        fmt = RDF_FORMATS.get(content_type, "turtle")
+        with self._lock:
+            if hasattr(data, "read"):
+                self.graph.parse(source=data, format=fmt)
+            else:
+                self.graph.parse(data=data, format=fmt)
+
+
+def make_backend(kind, fuseki_base, data_files=(), pool_size=10, retries=3):
+    """Backend factory; anything other than 'embedded' means Fuseki."""
+    if (kind or "").lower() == "embedded":
+        return EmbeddedBackend([p for p in data_files if p])
+    return FusekiBackend(fuseki_base, pool_size=pool_size, retries=retries)
+
+
+# ---------------- offline check ----------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load RDF files into the embedded store and check its indexes")
+    ap.add_argument("inputs", nargs="+")
+    ap.add_argument("--purge", action="store_true", help="then run the Admin purge update and check again")
+    args = ap.parse_args(argv)
+    t = time.perf_counter()
+    backend = EmbeddedBackend(args.inputs)
+    backend.store.check()
+    print(f"{len(backend.store):,} triples loaded in {time.perf_counter() - t:.2f}s, indexes consistent")
+    if args.purge:
+        t = time.perf_counter()
+        backend.update("DELETE WHERE { ?s ?p ?o }")
+        backend.store.check()
+        if len(backend.store):
+            print(f"purge left {len(backend.store):,} triples")
+            return 1
+        print(f"purged in {time.perf_counter() - t:.2f}s, store empty and consistent")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# kg_terms.py
+"""
+Shared term dictionary: IRIs / literals <-> integer ids
+
+    python kg_terms.py triples.csv -o triples.terms      # build + report
+    python kg_terms.py --info triples.terms
+
+- TermDictionary: static, sorted and front-coded in blocks of 16 (the first
+  term of a block is stored whole, the others as shared-prefix length +
+  suffix), so the long namespace IRIs repeated by every term cost a few
+  bytes each; the file is memory-mapped, nothing is decoded up front
+- id(term) = binary search over the block heads + one block scan;
+  term(id) = one block decode; ids are the sorted order, so a column of
+  strings is encoded with one np.unique (its inverse is the id column)
+- the offset of each term's short name (local name after the last # or /,
+  IRIs only) is stored next to it: short(id) is a slice, not a re-split
+- TermIndex: process-wide, growable interning on top of an optional
+  TermDictionary for app-side result handling; short names are computed
+  once per distinct IRI and reused by every render (literals are returned
+  as they are and never interned: free-text values would grow it forever)
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import threading
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"KGTERMS1"
+BLOCK = 16
+
+
+def short_start(term):
+    """Index where the short name of an IRI starts (0 = whole term)."""
+    if "://" not in term and not term.startswith("urn:"):
+        return 0  # literals / prefixed names stay as they are
+    cut = max(term.rfind("#"), term.rfind("/")) + 1
+    return cut if cut < len(term) else 0
+
+
+def short_name(term):
+    """'http://example.org/culturaldifference#Punjabi' -> 'Punjabi'; non-IRIs unchanged."""
+    return term[short_start(term):]
+
+
+def _varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+class TermDictionary:
+    """Read-only sorted term dictionary over a front-coded buffer (file or bytes)."""
+
+    def __init__(self, buf, path=None):
+        self.path = path
+        self._buf = buf
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path or 'buffer'}: not a term dictionary")
+        hlen = int(np.frombuffer(buf, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(buf[start:start + hlen]))
+        base = start + hlen
+        sec = self.header["sections"]
+        self._count = self.header["count"]
+        self.block_size = self.header["block_size"]
+        self.offsets = np.frombuffer(buf, dtype=np.uint64, count=sec["offsets"]["count"],
+                                     offset=base + sec["offsets"]["offset"])
+        self.short_at = np.frombuffer(buf, dtype=np.uint32, count=self._count,
+                                      offset=base + sec["short"]["offset"])
+        self._data_start = base + sec["data"]["offset"]
+        self._data = memoryview(buf)[self._data_start:self._data_start + sec["data"]["length"]]
+        self._heads = {}
+
+    # ---- building ----
+    @staticmethod
+    def encode(terms, block_size=BLOCK):
+        """Sorted unique str terms -> dictionary file bytes."""
+        data = bytearray()
+        offsets = []
+        shorts = np.zeros(len(terms), dtype=np.uint32)
+        prev = b""
+        for i, term in enumerate(terms):
+            raw = term.encode("utf-8")
+            if i % block_size == 0:
+                offsets.append(len(data))
+                _varint(len(raw), data)
+                data += raw
+            else:
+                shared = _common_prefix(prev, raw)
+                _varint(shared, data)
+                _varint(len(raw) - shared, data)
+                data += raw[shared:]
+            shorts[i] = short_start(term)
+            prev = raw
+        offsets.append(len(data))
+        offsets = np.asarray(offsets, dtype=np.uint64)
+        sections, parts, pos = {}, [], 0
+        for name, payload, extra in (("offsets", offsets.tobytes(), {"count": len(offsets)}),
+                                     ("short", shorts.tobytes(), {}),
+                                     ("data", bytes(data), {})):
+            sections[name] = {"offset": pos, "length": len(payload), **extra}
+            parts.append(payload + b"\0" * (_align(len(payload)) - len(payload)))
+            pos += _align(len(payload))
+        header = json.dumps({"count": len(terms), "block_size": block_size,
+                             "sections": sections}).encode("utf-8")
+        header += b" " * (_align(len(MAGIC) + 8 + len(header)) - len(MAGIC) - 8 - len(header))
+        return MAGIC + np.uint64(len(header)).tobytes() + header + b"".join(parts)
+
+    @classmethod
+    def build(cls, terms, path=None, block_size=BLOCK):
+        """Any iterable of str -> dictionary (written to `path` and mapped, or in memory)."""
+        uniq = sorted(set(terms))
+        payload = cls.encode(uniq, block_size)
+        if path is None:
+            return cls(payload)
+        with open(path, "wb") as f:
+            f.write(payload)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buf, path)
+
+    # ---- decoding ----
+    def __len__(self):
+        return self._count
+
+    def _block(self, b):
+        """Decode every term of block b -> list of str."""
+        data = self._data
+        pos = int(self.offsets[b])
+        n, pos = _read_varint(data, pos)
+        prev = bytes(data[pos:pos + n])
+        pos += n
+        out = [prev]
+        for _ in range(min(self.block_size, self._count - b * self.block_size) - 1):
+            shared, pos = _read_varint(data, pos)
+            n, pos = _read_varint(data, pos)
+            prev = prev[:shared] + bytes(data[pos:pos + n])
+            pos += n
+            out.append(prev)
+        return [t.decode("utf-8") for t in out]
+
+    def _head(self, b):
+        head = self._heads.get(b)
+        if head is None:
+            data = self._data
+            n, pos = _read_varint(data, int(self.offsets[b]))
+            head = self._heads[b] = bytes(data[pos:pos + n]).decode("utf-8")
+        return head
+
+    def term(self, tid):
+        if not 0 <= tid < self._count:
+            raise IndexError(tid)
+        return self._block(tid // self.block_size)[tid % self.block_size]
+
+    def short(self, tid):
+        return self.term(tid)[int(self.short_at[tid]):]
+
+    def id(self, term):
+        """Id of `term`, -1 when it is not in the dictionary."""
+        lo, hi = 0, len(self.offsets) - 2
+        if hi < 0:
+            return -1
+        while lo < hi:  # last block whose head <= term
+            mid = (lo + hi + 1) // 2
+            if self._head(mid) <= term:
+                lo = mid
+            else:
+                hi = mid - 1
+        block = self._block(lo)
+        k = bisect_left(block, term)
+        return lo * self.block_size + int(k) if k < len(block) and block[k] == term else -1
+
+    def __iter__(self):
+        for b in range(len(self.offsets) - 1):
+            yield from self._block(b)
+
+    def terms(self, ids):
+        """ids -> list of str (each touched block decoded once)."""
+        cache, out = {}, []
+        for tid in ids:
+            b = int(tid) // self.block_size
+            block = cache.get(b)
+            if block is None:
+                block = cache[b] = self._block(b)
+            out.append(block[int(tid) % self.block_size])
+        return out
+
+    def ids(self, terms):
+        """Array of str -> int64 ids (-1 = unknown); one lookup per distinct term."""
+        values = pd.Series(terms, dtype=object)
+        codes, uniques = pd.factorize(values)
+        found = np.array([self.id(t) for t in uniques], dtype=np.int64)
+        return found[codes] if len(codes) else np.empty(0, dtype=np.int64)
+
+
+def encode_columns(frame, columns=("subject", "predicate", "object"), path=None):
+    """DataFrame of term strings -> (TermDictionary, (n, k) uint32 id array).
+
+    The dictionary is built from the distinct cells, so every cell encodes by
+    position (np.unique's inverse) without per-row lookups.
+    """
+    cells = np.concatenate([frame[c].astype(str).to_numpy(dtype=object) for c in columns])
+    uniq, inverse = np.unique(cells, return_inverse=True)
+    payload = TermDictionary.encode(uniq.tolist())
+    if path is None:
+        terms = TermDictionary(payload)
+    else:
+        with open(path, "wb") as f:
+            f.write(payload)
+        terms = TermDictionary.open(path)
+    ids = inverse.astype(np.uint32).reshape(len(columns), -1).T
+    return terms, np.ascontiguousarray(ids)
+
+
+class TermIndex:
+    """Thread-safe, growable term <-> id map with precomputed short names.
+
+    Ids below len(base) come from the (memory-mapped) base dictionary;
+    terms first seen at run time are appended after them.
+    """
+
+    def __init__(self, base=None):
+        self.base = base
+        self._offset = len(base) if base is not None else 0
+        self._ids = {}
+        self._terms = []
+        self._shorts = []
+        self._base_shorts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._offset + len(self._terms)
+
+    def _intern(self, term):
+        tid = self._ids.get(term)
+        if tid is None:
+            if self.base is not None:
+                tid = self.base.id(term)
+                if tid >= 0:
+                    self._ids[term] = tid
+                    return tid
+            tid = self._ids[term] = self._offset + len(self._terms)
+            self._terms.append(term)
+            self._shorts.append(short_name(term))
+        return tid
+
+    def encode(self, values):
+        """Column of str -> int64 ids (missing values -> -1); one intern per distinct value."""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        with self._lock:
+            table = np.array([self._intern(str(t)) for t in uniques], dtype=np.int64)
+        out = np.full(len(codes), -1, dtype=np.int64)
+        mask = codes >= 0
+        out[mask] = table[codes[mask]]
+        return out
+
+    def decode(self, ids):
+        base = self.base
+        return [self._terms[i - self._offset] if i >= self._offset else base.term(i) for i in ids]
+
+    def short(self, tid):
+        if tid >= self._offset:
+            return self._shorts[tid - self._offset]
+        name = self._base_shorts.get(tid)
+        if name is None:
+            name = self._base_shorts[tid] = self.base.short(tid)
+        return name
+
+    def short_names(self, values):
+        """Series of IRIs -> Series of short names (same index); non-IRIs unchanged, not interned."""
+        values = pd.Series(values)
+        codes, uniques = pd.factorize(values)
+        with self._lock:
+            names = [self.short(self._intern(t)) if short_start(t) else t for t in map(str, uniques)]
+        table = np.array(names + [None], dtype=object)
+        return pd.Series(table[codes], index=values.index, dtype=object)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build / inspect a prefix-compressed term dictionary")
+    ap.add_argument("source", help="triples.csv (subject, predicate, object) or, with --info, a .terms file")
+    ap.add_argument("-o", "--out", help="dictionary file (default: <source>.terms)")
+    ap.add_argument("--info", action="store_true")
+    args = ap.parse_args(argv)
+    if args.info:
+        terms = TermDictionary.open(args.source)
+        print(f"{len(terms):,} terms, block size {terms.block_size}, {os.path.getsize(args.source) / 1e6:.2f} MB")
+        for tid in (0, len(terms) // 2, len(terms) - 1):
+            if 0 <= tid < len(terms):
+                print(f"  {tid:>8}  {terms.term(tid)}  ->  {terms.short(tid)}")
+        return 0
+    df = pd.read_csv(args.source, dtype=str, keep_default_na=False)
+    out = args.out or os.path.splitext(args.source)[0] + ".terms"
+    terms, ids = encode_columns(df, path=out)
+    raw = sum(len(t.encode("utf-8")) for t in terms)
+    print(f"{len(df):,} triples, {len(terms):,} distinct terms: {raw / 1e6:.2f} MB of term text "
+          f"-> {os.path.getsize(out) / 1e6:.2f} MB dictionary ({out})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# kg_transfer.py
+"""
+Streaming RDF export / chunked import for the Admin page
+- export_to_file: the backend writes its dump straight into a temporary
+  file (optionally gzip-compressed) as N-Triples, Turtle or TriG; the dump
+  never exists as one string in the Streamlit process
+- iter_batches: splits N-Triples (line based) and Turtle (statement based,
+  @prefix / @base and SPARQL-style PREFIX / BASE directives repeated in
+  every batch) into batches of at most batch_size statements while reading
+  the input incrementally; a prefix or base redefined mid-file closes the
+  current batch, so earlier statements keep the meaning they were written with
+- import_batches: posts batch after batch with retries, reports progress
+  and stops at the first batch that keeps failing; re-running with
+  start_batch=<failed batch> resumes without re-sending earlier batches;
+  an on_batch hook sees every batch before it is sent (the app keeps its
+  statistics current from it instead of rebuilding them)
+- RDF/XML and TriG cannot be cut safely; they are sent as one streamed request
+- blank node labels are scoped to their batch (a _:b1 split across batches
+  becomes two nodes), as with any per-request load
+"""
+
+import gzip
+import os
+import re
+import tempfile
+import time
+
+EXPORT_FORMATS = {
+    # label -> (media type, file extension)
+    "N-Triples": ("application/n-triples", "nt"),
+    "Turtle": ("text/turtle", "ttl"),
+    "TriG": ("application/trig", "trig"),
+}
+SPLITTABLE = {
+    "application/n-triples": "nt",
+    "text/plain": "nt",
+    "text/turtle": "turtle",
+}
+
+
+# ---------------- export ----------------
+def export_to_file(backend, fmt="N-Triples", compress=False, directory=None):
+    """Dump the dataset into a temp file -> (path, bytes_on_disk)."""
+    media_type, ext = EXPORT_FORMATS[fmt]
+    suffix = f".{ext}.gz" if compress else f".{ext}"
+    fd, path = tempfile.mkstemp(prefix="kg_export_", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            if compress:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as out:
+                    backend.export_to(out, media_type)
+            else:
+                backend.export_to(raw, media_type)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, os.path.getsize(path)
+
+
+# ---------------- statement splitting ----------------
+# @prefix / @base end with '.', SPARQL-style PREFIX / BASE lines do not
+_DIRECTIVE = re.compile(r"(?i)@?(prefix|base)(?=[\s<])\s*([^\s:<]*:)?")
+_SPARQL_DIRECTIVE = re.compile(r"(?i)\s*(prefix|base)(?=[\s<])")
+_LEADING_COMMENTS = re.compile(r"(?:\s+|#[^\n]*)*")
+
+def _turtle_line_state(line, state):
+    """Scan one Turtle line; returns (state, ends_statement).
+
+    state is (in_long_string_quote or None); a statement ends when the last
+    significant character outside strings / IRIs / comments is '.'.
+    """
+    long_quote = state
+    i, n = 0, len(line)
+    last = ""
+    while i < n:
+        c = line[i]
+        if long_quote:
+            if c == "\\":
+                i += 2
+                continue
+            if line.startswith(long_quote, i):
+                i += 3
+                long_quote = None
+                last = '"'
+                continue
+            i += 1
+            continue
+        if c == "#":
+            break
+        if c in "\"'":
+            if line.startswith(c * 3, i):
+                long_quote = c * 3
+                i += 3
+                continue
+            i += 1
+            while i < n and line[i] != c:
+                i += 2 if line[i] == "\\" else 1
+            i += 1
+            last = c
+            continue
+        if c == "<":
+            end = line.find(">", i + 1)
+            if end > 0 and " " not in line[i + 1:end]:
+                i = end + 1
+                last = ">"
+                continue
+        if not c.isspace():
+            last = c
+        i += 1
+    return long_quote, (last == "." and long_quote is None)
+
+
+def _blank(text):
+    """Only whitespace and comments (what is left over between statements)."""
+    return _LEADING_COMMENTS.match(text).end() == len(text)
+
+
+def _directive_key(statement):
+    """'prefix ex:' / 'base' for a directive statement (leading comments skipped), else None."""
+    m = _DIRECTIVE.match(statement, _LEADING_COMMENTS.match(statement).end())
+    if m is None:
+        return None
+    kind = m.group(1).lower()
+    return f"prefix {m.group(2) or ''}" if kind == "prefix" else kind
+
+
+def iter_batches(stream, syntax, batch_size=50000):
+    """Yield (batch_bytes, statements, input_bytes_consumed) from a binary stream."""
+    if syntax == "nt":
+        buf, count, consumed = [], 0, 0
+        for line in stream:
+            consumed += len(line)
+            s = line.strip()
+            if not s or s.startswith(b"#"):
+                continue
+            buf.append(s)
+            count += 1
+            if count >= batch_size:
+                yield b"\n".join(buf) + b"\n", count, consumed
+                buf, count = [], 0
+        if buf:
+            yield b"\n".join(buf) + b"\n", count, consumed
+        return
+
+    header, stmt, buf = {}, [], []   # header: directive key -> directive line
+    count, consumed, state = 0, 0, None
+
+    def statements(line, state):
+        # -> (state, [complete statements]); a SPARQL PREFIX / BASE line is
+        # a whole statement on its own and ends anything left open before it
+        if state is None and _SPARQL_DIRECTIVE.match(line):
+            done = [] if _blank("".join(stmt)) else ["".join(stmt)]
+            stmt.clear()
+            return state, done + [line]
+        state, ends = _turtle_line_state(line, state)
+        stmt.append(line)
+        if not ends:
+            return state, []
+        text = "".join(stmt)
+        stmt.clear()
+        return state, [text]
+
+    for raw in stream:
+        consumed += len(raw)
+        state, texts = statements(raw.decode("utf-8"), state)
+        for text in texts:
+            key = _directive_key(text)
+            if key is not None:
+                line = text[_LEADING_COMMENTS.match(text).end():].strip() + "\n"
+                if buf and header.get(key, line) != line:
+                    # redefinition: send what was written under the old one first
+                    yield ("".join(header.values()) + "".join(buf)).encode("utf-8"), count, consumed
+                    buf, count = [], 0
+                header.pop(key, None)
+                header[key] = line
+                continue
+            buf.append(text)
+            count += 1
+            if count >= batch_size:
+                yield ("".join(header.values()) + "".join(buf)).encode("utf-8"), count, consumed
+                buf, count = [], 0
+    tail = "".join(stmt).strip()
+    if not _blank(tail):
+        buf.append(tail + "\n")
+        count += 1
+    if buf:
+        yield ("".join(header.values()) + "".join(buf)).encode("utf-8"), count, consumed
+
+
+def open_upload(fileobj, name=""):
+    """Binary stream over an upload; .gz files are decompressed on the fly."""
+    if name.endswith(".gz"):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return fileobj
+
+
+# ---------------- import ----------------
+def import_batches(backend, stream, content_type, batch_size=50000, start_batch=0,
+                   retries=3, total_bytes=None, progress=None, on_batch=None):
+    """Load `stream` batch by batch -> result dict.
+
+    result: batches (sent this run), statements, next_batch (resume point),
+    failed (None or error text), seconds.
+    progress(fraction_or_None, message) is called after every batch.
+    on_batch(data, media_type) is called before each split batch is sent and
+    may return a callable, called once that batch is stored.
+    """
+    syntax = SPLITTABLE.get(content_type)
+    t = time.perf_counter()
+    result = {"batches": 0, "statements": 0, "next_batch": start_batch, "failed": None, "seconds": 0.0}
+    if syntax is None:
+        # not splittable: one request, streamed from the file object
+        try:
+            backend.import_data(stream, content_type)
+            result["batches"] = 1
+            result["next_batch"] = start_batch + 1
+        except Exception as e:
+            result["failed"] = str(e)
+        result["seconds"] = time.perf_counter() - t
+        return result
+
+    batch_type = "application/n-triples" if syntax == "nt" else "text/turtle"
+    for index, (data, statements, consumed) in enumerate(iter_batches(stream, syntax, batch_size)):
+        if index < start_batch:
+            continue  # sent by an earlier run
+        stored = on_batch(data, batch_type) if on_batch is not None else None
+        for attempt in range(retries + 1):
+            try:
+                backend.import_data(data, batch_type)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    result["failed"] = f"batch {index}: {e}"
+                    result["seconds"] = time.perf_counter() - t
+                    return result
+                time.sleep(min(2 ** attempt * 0.5, 8))
+        if stored is not None:
+            stored()
+        result["batches"] += 1
+        result["statements"] += statements
+        result["next_batch"] = index + 1
+        if progress is not None:
+            frac = min(1.0, consumed / total_bytes) if total_bytes else None
+            progress(frac, f"batch {index + 1}: {result['statements']:,} statements")
+    result["seconds"] = time.perf_counter() - t
+    return result
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+# ner_crawl_spacy.py
+"""
+Phase 1 crawler + NER helpers (used by Mini_project_2_all_phases.py)
+- fetch_text_from_url: one streamed GET per URL (PDFs are detected from the
+  response headers, so the extra HEAD round trip is gone)
+- crawl: thread-pool crawler with a global concurrency limit, per-host
+  concurrency limits and per-host politeness delays instead of a global
+  sleep, sharing one keep-alive connection pool
+- fetch is pluggable (fetch(url, session) -> (text, content_type)) so the
+  crawler can be benchmarked against a local HTTP stand-in
+- extract_entities_stream: paragraphs stream from the crawler straight into
+  nlp.pipe (batch_size / n_process), with every pipeline component NER does
+  not need disabled and a rule-based sentencizer for context sentences; a
+  paragraph the pipeline fails on is retried alone, then recorded with its
+  source URL and skipped
+- IncrementalNER: remembers the entities of every paragraph by content hash,
+  runs spaCy only on new/changed paragraphs and reports the entity delta
+  (plus SPARQL DELETE DATA / INSERT DATA updates: the difference between
+  the resolved triples of the previous and the current state, so subjects
+  are the same cluster URIs the triple builder mints)
+
+    python ner_crawl_spacy.py --bench
+    python ner_crawl_spacy.py --bench-ner --model en_core_web_sm
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+import spacy
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from kg_loader import nt_term
+from triples_builder import build_resolved_triples, resolve_entities
+
+USER_AGENT = "Mozilla/5.0 (compatible; NER-bot/1.0)"
+
+
+def make_session(pool_size=16):
+    """requests session with a keep-alive pool large enough for the crawler."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def html_to_text(html):
+    """Visible article/body text of an HTML page."""
+    soup = BeautifulSoup(html, "html.parser")
+    # remove scripts/styles and nav/footer potential noise
+    for s in soup(["script","style","header","footer","nav","aside","form","noscript"]):
+        s.extract()
+    texts = []
+    # Prefer article/body tags
+    article = soup.find("article")
+    if article:
+        texts.append(article.get_text(separator=" ", strip=True))
+    body = soup.find("body")
+    if body:
+        texts.append(body.get_text(separator=" ", strip=True))
+    full = " ".join(t for t in texts if t)
+    # shorten repeating whitespace
+    full = re.sub(r"\s+", " ", full).strip()
+    return full[:500000]
+
+
+def fetch_text_from_url(url, session=None, timeout=12):
+    """Fetch visible text from a URL. Return (text, content_type). Skips PDFs for now."""
+    if url.lower().endswith(".pdf"):
+        return None, "pdf"
+    session = session or make_session(1)
+    try:
+        # stream: headers arrive first, a PDF body is never downloaded
+        with session.get(url, timeout=timeout, stream=True) as resp:
+            if resp.status_code != 200:
+                return None, f"error:{resp.status_code}"
+            ctype = resp.headers.get("content-type","")
+            if "pdf" in ctype.lower():
+                return None, "pdf"
+            html = resp.text
+        return html_to_text(html), ctype
+    except Exception as e:
+        return None, f"exception:{e}"
+
+
+class HostThrottle:
+    """Per-host concurrency limit plus a minimum delay between request starts."""
+
+    def __init__(self, per_host=2, delay=0.8):
+        self.delay = delay
+        self._slots = defaultdict(lambda: threading.Semaphore(per_host))
+        self._next_start = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def __call__(self, host):
+        with self._lock:
+            sem = self._slots[host]
+        with sem:
+            with self._lock:
+                start = max(time.monotonic(), self._next_start[host])
+                self._next_start[host] = start + self.delay
+            wait = start - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            yield
+
+
+def _interleave_hosts(urls):
+    """Round-robin URLs by host so one slow host cannot hog every worker."""
+    by_host = OrderedDict()
+    for url in urls:
+        by_host.setdefault(urlparse(url).netloc, []).append(url)
+    queues = list(by_host.values())
+    out = []
+    while queues:
+        for q in queues:
+            out.append(q.pop(0))
+        queues = [q for q in queues if q]
+    return out
+
+
+def crawl(urls, fetch=None, concurrency=8, per_host=2, delay=0.8, session=None, ordered=False):
+    """Fetch all urls concurrently; yields (url, text, content_type).
+
+    Results come back as they complete, or in input order with ordered=True
+    (fetching stays concurrent, only the yielding waits).
+    """
+    fetch = fetch or fetch_text_from_url
+    session = session or make_session(concurrency)
+    throttle = HostThrottle(per_host=per_host, delay=delay)
+
+    def task(url):
+        with throttle(urlparse(url).netloc):
+            return fetch(url, session)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(task, url): url for url in _interleave_hosts(urls)}
+        if ordered:
+            by_url = {url: fut for fut, url in futures.items()}
+            for url in urls:
+                text, ctype = by_url[url].result()
+                yield url, text, ctype
+        else:
+            for fut in as_completed(futures):
+                text, ctype = fut.result()
+                yield futures[fut], text, ctype
+
+
+# ---------------- NER ----------------
+def load_ner_pipeline(model="en_core_web_sm", use_parser=False):
+    """Load a spaCy pipeline running only what entity extraction needs.
+
+    Sentence boundaries (for context_sentence) come from the dependency
+    parser when use_parser=True, otherwise from the much cheaper rule-based
+    sentencizer. A shared tok2vec/transformer stays on only if a kept
+    component listens to it.
+    """
+    nlp = spacy.load(model)
+    keep = {"ner"} | ({"parser"} if use_parser else set())
+    for name in ("tok2vec", "transformer"):
+        if name in nlp.pipe_names:
+            listeners = set(getattr(nlp.get_pipe(name), "listening_components", []))
+            if keep & listeners:
+                keep.add(name)
+    nlp.select_pipes(disable=[n for n in nlp.pipe_names if n not in keep])
+    if not use_parser:
+        nlp.add_pipe("sentencizer", first=True)
+    return nlp
+
+
+def split_paragraphs(text):
+    # chunk long text into paragraphs to avoid spaCy memory spikes
+    return [p.strip() for p in re.split(r"\n{1,}|\.\s{2,}", text) if len(p.strip())>30]
+
+
+def iter_paragraphs(pages, errors=None):
+    """(url, text, ctype) from crawl() -> (paragraph, url), recording failed fetches."""
+    for url, text, ctype in pages:
+        if text is None:
+            if errors is not None:
+                errors.append((url, ctype))
+            continue
+        for para in split_paragraphs(text):
+            yield para, url
+
+
+class NerStats:
+    """Throughput counters for extract_entities_stream."""
+
+    def __init__(self):
+        self.docs = 0
+        self.ents = 0
+        self.seconds = 0.0
+
+    @property
+    def docs_per_sec(self):
+        return self.docs / self.seconds if self.seconds else 0.0
+
+    @property
+    def ents_per_sec(self):
+        return self.ents / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"NER: {self.docs} paragraphs, {self.ents} entities in {self.seconds:.1f}s "
+                f"({self.docs_per_sec:,.1f} docs/s, {self.ents_per_sec:,.1f} entities/s)")
+
+
+def _skip_failed_batch(proc_name, proc, docs, e):
+    # nlp.pipe error handler: drop the batch; extract_entities_stream retries its docs one by one
+    pass
+
+
+def _pipe_one(nlp, text):
+    """Run every pipeline component on one text, letting its exception through."""
+    doc = nlp.make_doc(text)
+    for _, proc in nlp.pipeline:
+        doc = proc(doc)
+    return doc
+
+
+def extract_entities_stream(nlp, items, keep_labels, batch_size=64, n_process=1, stats=None, errors=None):
+    """Run nlp.pipe over (paragraph, url) pairs and yield one row per kept entity.
+
+    A paragraph the pipeline fails on is skipped and recorded in `errors` as
+    (url, "ner_error:...") instead of ending the stream.
+    """
+    stats = stats if stats is not None else NerStats()
+    fed = deque()   # (index, paragraph, url) handed to nlp.pipe, not yet seen coming out
+
+    def numbered():
+        for i, (para, url) in enumerate(items):
+            fed.append((i, para, url))
+            yield para, i
+
+    def retry(para, url):
+        try:
+            return _pipe_one(nlp, para)
+        except Exception as e:
+            if errors is not None:
+                errors.append((url, f"ner_error:{e}"))
+            return None
+
+    def docs():
+        # docs come out in input order, so every index skipped belongs to a dropped batch
+        for doc, i in nlp.pipe(numbered(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+            while fed[0][0] < i:
+                _, para, url = fed.popleft()
+                yield retry(para, url), url
+            yield doc, fed.popleft()[2]
+        while fed:
+            _, para, url = fed.popleft()
+            yield retry(para, url), url
+
+    handler = nlp.default_error_handler
+    nlp.set_error_handler(_skip_failed_batch)
+    t = time.perf_counter()
+    try:
+        for doc, url in docs():
+            stats.docs += 1
+            if doc is None:
+                continue
+            for ent in doc.ents:
+                if ent.label_ in keep_labels:
+                    stats.ents += 1
+                    yield {
+                        "source_url": url,
+                        "entity_text": ent.text,
+                        "label": ent.label_,
+                        "start_char": ent.start_char,
+                        "end_char": ent.end_char,
+                        # capture sentence for context
+                        "context_sentence": ent.sent.text.strip() if ent.sent else "",
+                    }
+            stats.seconds = time.perf_counter() - t
+    finally:
+        nlp.set_error_handler(handler)
+
+
+ENTITY_FIELDS = ("entity_text", "label", "start_char", "end_char", "context_sentence")
+
+
+class IncrementalNER:
+    """Paragraph-hash keyed NER state (ner_state.json).
+
+    state["paragraphs"][sha1] -> entity tuples found in that paragraph
+    state["urls"][url]        -> paragraph hashes of the page, in order
+    """
+
+    def __init__(self, path="ner_state.json"):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.paragraphs = state.get("paragraphs", {})
+        self.urls = state.get("urls", {})
+        self.delta = []            # [{"op": "add"/"remove", "source_url", "entity_text", "label", "count"}]
+        self.added_entities = []   # (entity_text, label) now present that were not before
+        self.removed_entities = [] # (entity_text, label) no longer present anywhere
+        self.previous_rows = self.rows()  # entity rows before the last run()
+        self.processed = 0
+        self.reused = 0
+
+    @staticmethod
+    def para_hash(para):
+        return hashlib.sha1(para.encode("utf-8")).hexdigest()
+
+    def run(self, nlp, pages, keep_labels, batch_size=64, n_process=1, stats=None, errors=None):
+        """Update the state from crawl() output; returns all current entity rows."""
+        old_urls = self.urls
+        self.previous_rows = self.rows()
+        new_urls = {}
+        todo = {}
+        para_urls = {}
+        total = 0
+        for url, text, ctype in pages:
+            if text is None:
+                if errors is not None:
+                    errors.append((url, ctype))
+                # a failed fetch is not a deletion: keep what we had
+                if url in old_urls:
+                    new_urls[url] = old_urls[url]
+                continue
+            hashes = []
+            for para in split_paragraphs(text):
+                h = self.para_hash(para)
+                hashes.append(h)
+                total += 1
+                if h not in self.paragraphs and h not in todo:
+                    todo[h] = para
+                    para_urls[h] = url
+            new_urls[url] = hashes
+
+        # spaCy only sees new or changed paragraphs (the hash rides in the url slot)
+        found = {h: [] for h in todo}
+        failed = []
+        for row in extract_entities_stream(nlp, ((p, h) for h, p in todo.items()), keep_labels,
+                                           batch_size=batch_size, n_process=n_process, stats=stats,
+                                           errors=failed):
+            found[row["source_url"]].append([row[k] for k in ENTITY_FIELDS])
+        for h, issue in failed:
+            del found[h]  # not cached: the paragraph is retried on the next run
+            if errors is not None:
+                errors.append((para_urls[h], issue))
+        self.paragraphs.update(found)
+        self.processed = len(todo)
+        self.reused = total - len(todo)
+
+        self._diff(old_urls, new_urls)
+        self.urls = new_urls
+        live = {h for hashes in new_urls.values() for h in hashes}
+        self.paragraphs = {h: ents for h, ents in self.paragraphs.items() if h in live}
+        return self.rows()
+
+    def _counts(self, urls):
+        counts = Counter()
+        for url, hashes in urls.items():
+            for h in hashes:
+                for ent in self.paragraphs.get(h, ()):
+                    counts[(url, ent[0], ent[1])] += 1
+        return counts
+
+    def _diff(self, old_urls, new_urls):
+        old, new = self._counts(old_urls), self._counts(new_urls)
+        self.delta = (
+            [{"op": "add", "source_url": u, "entity_text": t, "label": l, "count": n}
+             for (u, t, l), n in (new - old).items()] +
+            [{"op": "remove", "source_url": u, "entity_text": t, "label": l, "count": n}
+             for (u, t, l), n in (old - new).items()]
+        )
+        old_ents = {(t, l) for _, t, l in old}
+        new_ents = {(t, l) for _, t, l in new}
+        self.added_entities = sorted(new_ents - old_ents)
+        self.removed_entities = sorted(old_ents - new_ents)
+
+    def rows(self):
+        out = []
+        for url, hashes in self.urls.items():
+            for h in hashes:
+                for ent in self.paragraphs.get(h, ()):
+                    out.append({"source_url": url, **dict(zip(ENTITY_FIELDS, ent))})
+        return out
+
+    @staticmethod
+    def resolved_triples(rows, fuzzy_threshold=None):
+        """Entity rows -> the Phase 2 resolved triples as (s, p, o) N-Triples terms, in order."""
+        df = pd.DataFrame(rows, columns=["source_url", *ENTITY_FIELDS]).rename(columns={"label": "entity_label"})
+        if df.empty:
+            return []
+        triples = build_resolved_triples(*resolve_entities(df, fuzzy_threshold))
+        return [tuple(map(nt_term, t)) for t in triples.itertuples(index=False)]
+
+    def sparql_updates(self, fuzzy_threshold=None):
+        """DELETE DATA / INSERT DATA turning the previous resolved triples into the current ones.
+
+        fuzzy_threshold must match the one the triple builder used.
+        """
+        old = self.resolved_triples(self.previous_rows, fuzzy_threshold)
+        new = self.resolved_triples(self.rows(), fuzzy_threshold)
+        old_set, new_set = set(old), set(new)
+
+        def block(triples):
+            return "\n".join(f"  {s} {p} {o} ." for s, p, o in triples)
+
+        ops = []
+        removed = [t for t in old if t not in new_set]
+        added = [t for t in new if t not in old_set]
+        if removed:
+            ops.append("DELETE DATA {\n" + block(removed) + "\n}")
+        if added:
+            ops.append("INSERT DATA {\n" + block(added) + "\n}")
+        return " ;\n".join(ops)
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"paragraphs": self.paragraphs, "urls": self.urls}, f)
+        os.replace(tmp, self.path)
+
+
+def benchmark_ner(model="en_core_web_sm", n_paragraphs=2000, batch_size=64, n_process=1,
+                  keep_labels=("PERSON","ORG","GPE","LOC","DATE","MONEY","NORP","LANGUAGE")):
+    """Per-paragraph nlp(text) with the full pipeline vs extract_entities_stream."""
+    words = ["Punjabi", "Sindhi", "Balochi", "Pashto", "Karachi", "Lahore", "Quetta", "Basant",
+             "Eid", "Urdu", "Punjab University", "Dawn", "1947", "Maira Masood"]
+    paras = [f"In {words[i % 14]} the {words[(i * 3) % 14]} community met {words[(i * 5) % 14]} "
+             f"representatives on {i % 28 + 1} March. They spoke {words[(i * 7) % 14]} with "
+             f"{words[(i * 11) % 14]} guests." for i in range(n_paragraphs)]
+    keep_labels = set(keep_labels)
+
+    full = spacy.load(model)
+    t = time.perf_counter()
+    loop_ents = 0
+    for para in paras:
+        loop_ents += sum(1 for ent in full(para).ents if ent.label_ in keep_labels)
+    loop = time.perf_counter() - t
+
+    stats = NerStats()
+    nlp = load_ner_pipeline(model)
+    for _ in extract_entities_stream(nlp, ((p, "bench") for p in paras), keep_labels,
+                                     batch_size=batch_size, n_process=n_process, stats=stats):
+        pass
+    print(f"{n_paragraphs} paragraphs, model {model}")
+    print(f"  nlp(text) loop, full pipeline : {n_paragraphs / loop:8,.1f} docs/s  {loop_ents / loop:8,.1f} entities/s")
+    print(f"  nlp.pipe, NER-only pipeline   : {stats.docs_per_sec:8,.1f} docs/s  {stats.ents_per_sec:8,.1f} entities/s"
+          f"  (batch_size={batch_size}, n_process={n_process})")
+
+
+# ---------------- benchmark against a local stand-in ----------------
+def _stand_in_servers(n_hosts, latency):
+    """Start n local HTTP servers (= n hosts) that answer after `latency` seconds."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    page = ("<html><body><article>" + "Lahore and Karachi celebrate Basant. " * 200 +
+            "</article></body></html>").encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, body):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            if body:
+                self.wfile.write(page)
+
+        def do_GET(self):
+            self._reply(True)
+
+        def do_HEAD(self):
+            self._reply(False)
+
+        def log_message(self, *args):
+            pass
+
+    servers = []
+    for _ in range(n_hosts):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+    return servers
+
+
+def _sequential_baseline(urls, delay):
+    """The original loop: HEAD + GET per URL, fixed sleep in between."""
+    for url in urls:
+        try:
+            requests.head(url, allow_redirects=True, timeout=8)
+        except Exception:
+            pass
+        resp = requests.get(url, timeout=12, headers={"User-Agent": USER_AGENT})
+        html_to_text(resp.text)
+        time.sleep(delay)
+
+
+def benchmark(n_urls=38, n_hosts=6, latency=0.15, delay=0.8, concurrency=8, per_host=2):
+    servers = _stand_in_servers(n_hosts, latency)
+    urls = [f"http://127.0.0.1:{servers[i % n_hosts].server_port}/page/{i}" for i in range(n_urls)]
+    try:
+        t = time.perf_counter()
+        _sequential_baseline(urls, delay)
+        seq = time.perf_counter() - t
+        t = time.perf_counter()
+        done = sum(1 for _ in crawl(urls, concurrency=concurrency, per_host=per_host, delay=delay))
+        par = time.perf_counter() - t
+    finally:
+        for srv in servers:
+            srv.shutdown()
+    print(f"{n_urls} URLs on {n_hosts} hosts, {latency * 1000:.0f} ms latency, {delay}s politeness delay")
+    print(f"  sequential HEAD+GET+sleep : {seq:6.2f}s  ({n_urls / seq:.1f} pages/s)")
+    print(f"  concurrent crawl          : {par:6.2f}s  ({done / par:.1f} pages/s)  x{seq / par:.1f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Phase 1 crawler benchmark")
+    ap.add_argument("--bench", action="store_true", help="benchmark against local stand-in servers")
+    ap.add_argument("--bench-ner", action="store_true", help="benchmark nlp.pipe against the per-paragraph loop")
+    ap.add_argument("--model", default="en_core_web_sm")
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--n-process", type=int, default=1)
+    ap.add_argument("--urls", type=int, default=38)
+    ap.add_argument("--hosts", type=int, default=6)
+    ap.add_argument("--latency", type=float, default=0.15)
+    ap.add_argument("--delay", type=float, default=0.8)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--per-host", type=int, default=2)
+    args = ap.parse_args()
+    if args.bench:
+        benchmark(args.urls, args.hosts, args.latency, args.delay, args.concurrency, args.per_host)
+    elif args.bench_ner:
+        benchmark_ner(args.model, batch_size=args.batch_size, n_process=args.n_process)
+    else:
+        ap.print_help()
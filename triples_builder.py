@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# triples_builder.py
+"""
+Vectorized Phase 1 triple builder (entities DataFrame -> triples.csv / triples.ttl)
+
+Same triples in the same order as the original iterrows() loop, and a
+byte-identical triples.csv, but slugs are computed with pandas string ops
+over the whole column and both files are written with a single bulk write.
+triples.ttl differs only where a text contains quotes, backslashes or line
+breaks: those literals are now escaped (the loop wrote them raw, which is
+not valid Turtle).
+
+resolve_entities / build_resolved_triples: optional resolution stage that
+clusters mentions per label (case, punctuation, token order, possessive 's
+ignored; near-identical spellings merged when a fuzzy threshold is given)
+and mints one subject per cluster. Mention provenance (source URL, offsets,
+context sentence) goes to a mentions table instead of per-row subjects.
+
+write_term_ids: the same triples as integer tuples over a shared,
+prefix-compressed term dictionary (kg_terms), which the app also loads
+for its short names.
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from kg_dedup import FuzzyIndex, normalize
+from kg_terms import encode_columns
+
+RESOURCE = "http://example.org/resource/"
+ONTOLOGY = "http://example.org/ontology/"
+
+TTL_HEADER = (
+    '@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .\n'
+    '@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n'
+    '@prefix ex: <http://example.org/ontology/> .\n\n'
+)
+# predicates whose object is written as-is (already a quoted literal)
+LITERAL_PREDICATES = ("rdfs:label", "ex:hasText", "ex:altLabel")
+# mention columns carried from entities.csv into the mentions table
+PROVENANCE_COLUMNS = ("source_url", "start_char", "end_char", "context_sentence")
+
+_SLUG = re.compile(r'[^a-zA-Z0-9_]')
+_POSSESSIVE = re.compile(r"['\u2019]s\b")
+
+
+def make_uri(s):
+    slug = _SLUG.sub('_', s.strip())[:120]
+    return f"{RESOURCE}{slug}"
+
+
+def make_uris(values):
+    """make_uri over a whole Series of str."""
+    # object dtype keeps Python's str.strip / re semantics for every value
+    values = values.astype(object)
+    return RESOURCE + values.str.strip().str.replace(_SLUG, '_', regex=True).str.slice(0, 120)
+
+
+def _as_str(col):
+    # str(cell) like the row loop: missing values become "nan"
+    return col.astype(object).where(col.notna(), "nan").map(str)
+
+
+def build_triples(entities_df):
+    """4 triples per entity row, interleaved like the row loop -> DataFrame(subject, predicate, object)."""
+    n = len(entities_df)
+    ent = _as_str(entities_df['entity_text']).str.strip().reset_index(drop=True)
+    if 'entity_label' in entities_df:
+        label = _as_str(entities_df['entity_label']).str.strip().reset_index(drop=True)
+    else:
+        label = pd.Series(['UNKNOWN'] * n, dtype=object)
+    row_ids = pd.Series(np.arange(n)).astype(str).astype(object)
+
+    subj = make_uris(ent + "_" + row_ids).to_numpy()
+    quoted = ('"' + ent + '"').to_numpy()
+
+    subjects = np.repeat(subj, 4)
+    predicates = np.tile(np.array(["rdf:type", "rdfs:label", "ex:hasText", "ex:canonicalURI"], dtype=object), n)
+    objects = np.empty(4 * n, dtype=object)
+    objects[0::4] = (ONTOLOGY + label).to_numpy()
+    objects[1::4] = quoted
+    objects[2::4] = quoted
+    objects[3::4] = make_uris(ent).to_numpy()
+    return pd.DataFrame({'subject': subjects, 'predicate': predicates, 'object': objects})
+
+
+# ---------------- entity resolution ----------------
+def canonical_key(text):
+    """Resolution key: 'The Punjab's' / 'punjab' -> 'punjab'."""
+    words = normalize(_POSSESSIVE.sub("", text)).split()
+    return " ".join(w for w in words if w != "the") or text.strip().lower()
+
+
+def mention_keys(entities_df):
+    """Stripped text, label and resolution key of every mention -> three aligned Series."""
+    text = _as_str(entities_df['entity_text']).str.strip().reset_index(drop=True)
+    if 'entity_label' in entities_df:
+        label = _as_str(entities_df['entity_label']).str.strip().reset_index(drop=True)
+    else:
+        label = pd.Series(['UNKNOWN'] * len(text), dtype=object)
+    return text, label, text.map(canonical_key)
+
+
+def resolve_spellings(spellings, fuzzy_threshold=None):
+    """Counter of (label, key, text) in first-seen order -> (entities, {(label, key): uri}).
+
+    Only distinct spellings are needed, so callers can count them chunk by
+    chunk (kg_loader) instead of holding every mention.
+    """
+    if fuzzy_threshold:
+        # merge keys whose spellings are near-identical within the same label
+        merged = {}
+        pairs = ((k, l) for (l, k, _), n in spellings.items() for _ in range(n))
+        for c in FuzzyIndex().build(pairs).clusters(fuzzy_threshold):
+            for k, _, _ in c["members"]:
+                merged[(k, c["group"])] = c["representative"]
+        resolved = Counter()
+        for (l, k, t), n in spellings.items():
+            resolved[(l, merged.get((k, l), k), t)] += n
+    else:
+        merged, resolved = {}, spellings
+
+    clusters = {}
+    for (l, k, t), n in resolved.items():
+        clusters.setdefault((l, k), []).append((t, n))
+    rows = []
+    for (l, k), variants in clusters.items():
+        variants.sort(key=lambda v: (-v[1], len(v[0]), v[0]))
+        rows.append((l, k, variants[0][0], [t for t, _ in variants[1:]], sum(n for _, n in variants)))
+    # biggest cluster keeps the plain make_uri(text); a slug already taken
+    # (same text under another label, or punctuation-only differences) gets a suffix
+    rows.sort(key=lambda r: (-r[4], r[0], r[1]))
+    uris, taken = {}, set()
+    for l, k, canonical, _, _ in rows:
+        uri = make_uri(canonical)
+        if uri in taken:
+            uri = make_uri(f"{canonical}_{l}")
+        suffix = 2
+        while uri in taken:
+            uri = make_uri(f"{canonical}_{l}_{suffix}")
+            suffix += 1
+        taken.add(uri)
+        uris[(l, k)] = uri
+    entities = pd.DataFrame([(uris[(l, k)], l, c, v, n) for l, k, c, v, n in rows],
+                            columns=['uri', 'label', 'canonical', 'variants', 'mentions'])
+    # every key seen, fuzzy-merged ones included
+    uris.update({(l, k): uris[(l, merged.get((k, l), k))] for l, k, _ in spellings})
+    return entities, uris
+
+
+def resolve_entities(entities_df, fuzzy_threshold=None):
+    """Cluster mentions per label -> (entities, mentions) DataFrames.
+
+    entities: uri, label, canonical (most frequent spelling), variants, mentions
+    mentions: one row per input row with its entity uri and any provenance columns
+    """
+    text, label, key = mention_keys(entities_df)
+    entities, uris = resolve_spellings(Counter(zip(label, key, text)), fuzzy_threshold)
+    mentions = pd.DataFrame({'uri': [uris[lk] for lk in zip(label, key)],
+                             'entity_text': text, 'label': label})
+    for col in PROVENANCE_COLUMNS:
+        if col in entities_df:
+            mentions[col] = entities_df[col].reset_index(drop=True)
+    return entities, mentions
+
+
+def build_resolved_triples(entities, mentions=None):
+    """One subject per resolved entity -> DataFrame(subject, predicate, object).
+
+    rdf:type + rdfs:label per entity, ex:altLabel per other spelling and
+    ex:mentionedIn per distinct source page (when mentions carry source_url).
+    """
+    n = len(entities)
+    parts = [
+        pd.DataFrame({'subject': entities['uri'], 'predicate': ['rdf:type'] * n,
+                      'object': ONTOLOGY + entities['label']}),
+        pd.DataFrame({'subject': entities['uri'], 'predicate': ['rdfs:label'] * n,
+                      'object': '"' + entities['canonical'] + '"'}),
+    ]
+    alt = entities[['uri', 'variants']].explode('variants').dropna()
+    parts.append(pd.DataFrame({'subject': alt['uri'], 'predicate': 'ex:altLabel',
+                               'object': '"' + alt['variants'] + '"'}))
+    if mentions is not None and 'source_url' in mentions:
+        src = mentions[['uri', 'source_url']].dropna().drop_duplicates()
+        parts.append(pd.DataFrame({'subject': src['uri'], 'predicate': 'ex:mentionedIn',
+                                   'object': src['source_url'].map(str)}))
+    triples = pd.concat(parts, ignore_index=True)
+    # group each subject's triples together, entities in resolution order
+    order = pd.Series(np.arange(n), index=entities['uri'])
+    triples['_entity'] = triples['subject'].map(order)
+    triples = triples.sort_values('_entity', kind='stable').drop(columns='_entity')
+    return triples.reset_index(drop=True)
+
+
+def resolution_report(n_rows, entities, triples):
+    before = 4 * n_rows  # build_triples: 4 triples per row
+    return (f"{n_rows} mentions -> {len(entities)} entities; "
+            f"{before} -> {len(triples)} triples ({1 - len(triples) / before:.1%} fewer)"
+            if before else "no mentions")
+
+
+def write_triples_csv(triples, path):
+    # csv.writer defaults: minimal quoting, \r\n line endings
+    triples.to_csv(path, index=False, encoding='utf-8', lineterminator='\r\n')
+
+
+def write_term_ids(triples, terms_path, ids_path):
+    """Shared term dictionary (kg_terms) + (n, 3) uint32 id triples (.npy) -> n terms."""
+    terms, ids = encode_columns(triples, path=terms_path)
+    np.save(ids_path, ids)
+    return len(terms)
+
+
+def write_triples_ttl(triples, path):
+    from kg_loader import nt_literal  # kg_loader imports this module
+    subj = '<' + triples['subject'] + '>'
+    is_literal = triples['predicate'].isin(LITERAL_PREDICATES)
+    # quotes, backslashes and line breaks inside the text are escaped
+    literals = triples['object'][is_literal].str.slice(1, -1).map(nt_literal)
+    obj = ('<' + triples['object'] + '>').where(~is_literal, literals)
+    lines = subj + ' ' + triples['predicate'] + ' ' + obj + ' .\n'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(TTL_HEADER + ''.join(lines.tolist()))